@@ -1,4 +1,4 @@
-from django.db.models.signals import m2m_changed, pre_delete
+from django.db.models.signals import m2m_changed, pre_delete, post_save, post_delete
 from django.dispatch import receiver
 
 from django.contrib.auth import get_user_model
@@ -22,3 +22,14 @@ def delete_hd_wallet(sender, instance, **kwargs):
     for hd_wallet in hd_wallets:
         if hd_wallet.user.count() <= 1:
             hd_wallet.delete()
+
+
+# reset cached user and its wallets
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Импорт при вызове: модуль сигналов загружается вместе с приложениями Django, в том числе в manage.py без
+    # переменных окружения бота, а настройки бота читаются при импорте config_data.config
+    from services.user_repository import user_repository
+
+    user_repository.invalidate_user(instance)
@@ -53,6 +53,24 @@ class TransactionAdmin(CommonAdmin):
     get_wallet.short_description = 'wallets: sender | recipient'
 
     def get_amount(self, obj):
+        if obj.value is not None:
+            return f'{obj.value:_}'
         amount = obj.pre_balances - obj.post_balances
         return f'{amount:_}'
     get_amount.short_description = 'Amount'
+
+
+@admin.register(models.BlockCursor)
+class BlockCursorAdmin(CommonAdmin):
+    list_display = ['blockchain', 'block_number', 'modified']
+    list_filter = ['blockchain']
+    ordering = ['blockchain']
+
+
+@admin.register(models.PendingTransfer)
+class PendingTransferAdmin(CommonAdmin):
+    list_display = ['transaction_id', 'blockchain', 'transfer_status', 'amount', 'created']
+    list_filter = ['blockchain', 'transfer_status']
+    search_fields = ['transaction_id', 'sender', 'recipient']
+    date_hierarchy = 'created'
+    ordering = ['-created']
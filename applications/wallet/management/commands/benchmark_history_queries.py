@@ -0,0 +1,127 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import Q
+
+from applications.wallet.models import Blockchain, Transaction, Wallet, WalletTransaction
+
+
+class Command(BaseCommand):
+    help = ('Seeds wallets and transactions in a rolled back database transaction and prints the query plans '
+            'and timings of the wallet and transaction history queries')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, default=1000, help='Number of seeded wallets')
+        parser.add_argument('--transactions', type=int, default=1_000_000, help='Number of seeded transactions')
+        parser.add_argument('--hot-share', type=float, default=0.1,
+                            help='Share of the transactions sent by the busiest wallet')
+        parser.add_argument('--page-size', type=int, default=10, help='Number of transactions in a history page')
+        parser.add_argument('--repeat', type=int, default=20, help='Number of runs of every query')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Number of rows in a bulk insert')
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded data instead of rolling it back')
+
+    def handle(self, *args, **options):
+        with db_transaction.atomic():
+            hot_wallet, wallets = self.seed(options)
+            self.benchmark(hot_wallet, wallets, options)
+            if not options['keep']:
+                # Тестовые данные не попадают в базу данных
+                db_transaction.set_rollback(True)
+
+    def seed(self, options):
+        started_at = time.perf_counter()
+        prefix = f'bench{int(time.time())}'
+        Wallet.objects.bulk_create(
+            [Wallet(wallet_address=f'{prefix}w{i}', blockchain=Blockchain.SOLANA) for i in range(options['wallets'])],
+            batch_size=options['batch_size'],
+        )
+        wallets = list(Wallet.objects.filter(wallet_address__startswith=prefix).order_by('id'))
+        hot_wallet = wallets[0]
+
+        rng = random.Random(0)
+        transaction_time = 1_700_000_000
+        for batch_start in range(0, options['transactions'], options['batch_size']):
+            batch_stop = min(batch_start + options['batch_size'], options['transactions'])
+            transactions = []
+            participants = []
+            for i in range(batch_start, batch_stop):
+                # Несколько транзакций в одну секунду проверяют второй ключ сортировки (id)
+                transaction_time += rng.randint(0, 2)
+                sender = hot_wallet if rng.random() < options['hot_share'] else rng.choice(wallets)
+                recipient = rng.choice(wallets)
+                transactions.append(Transaction(
+                    transaction_id=f'{prefix}t{i}',
+                    sender=sender.wallet_address,
+                    recipient=recipient.wallet_address,
+                    transaction_time=transaction_time,
+                    slot=i,
+                ))
+                participants.append({sender.id, recipient.id})
+
+            Transaction.objects.bulk_create(transactions, batch_size=options['batch_size'])
+            transaction_ids = dict(
+                Transaction.objects.filter(transaction_id__in=[tr.transaction_id for tr in transactions])
+                .values_list('transaction_id', 'id')
+            )
+            WalletTransaction.objects.bulk_create(
+                [
+                    WalletTransaction(transaction_id=transaction_ids[tr.transaction_id], wallet_id=wallet_id,
+                                      transaction_time=tr.transaction_time)
+                    for tr, wallet_ids in zip(transactions, participants)
+                    for wallet_id in wallet_ids
+                ],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(f'Seeded {batch_stop} transactions', ending='\r')
+            self.stdout.flush()
+
+        hot_count = WalletTransaction.objects.filter(wallet=hot_wallet).count()
+        self.stdout.write(f'Seeded {len(wallets)} wallets and {options["transactions"]} transactions '
+                          f'in {time.perf_counter() - started_at:.1f} s, the busiest wallet has {hot_count}')
+        return hot_wallet, wallets
+
+    def benchmark(self, hot_wallet, wallets, options):
+        page_size = options['page_size']
+        sample_transaction = Transaction.objects.filter(sender=hot_wallet.wallet_address).order_by('id')[
+            options['transactions'] // 20
+        ]
+
+        # Последняя запись первой страницы - курсор для следующей страницы
+        last_link = (
+            WalletTransaction.objects.filter(wallet=hot_wallet)
+            .order_by('-transaction_time', '-transaction_id')[page_size - 1]
+        )
+
+        queries = {
+            'Wallet by address': Wallet.objects.filter(wallet_address=wallets[-1].wallet_address),
+            'Transaction by signature': Transaction.objects.filter(transaction_id=sample_transaction.transaction_id),
+            'Transactions by sender': Transaction.objects.filter(sender=hot_wallet.wallet_address)[:page_size],
+            'Transactions by recipient': Transaction.objects.filter(recipient=hot_wallet.wallet_address)[:page_size],
+            # Прежний способ: соединение с таблицей транзакций и сортировка всей истории кошелька
+            'History page through Transaction.transaction_time': (
+                hot_wallet.transactions.order_by('-transaction_time')[:page_size]
+            ),
+            'History first page through the link index': (
+                WalletTransaction.objects.filter(wallet=hot_wallet).select_related('transaction')
+                .order_by('-transaction_time', '-transaction_id')[:page_size]
+            ),
+            'History next page through the link index': (
+                WalletTransaction.objects.filter(wallet=hot_wallet, transaction_time__lte=last_link.transaction_time).filter(
+                    Q(transaction_time__lt=last_link.transaction_time)
+                    | Q(transaction_time=last_link.transaction_time, transaction_id__lt=last_link.transaction_id)
+                ).select_related('transaction').order_by('-transaction_time', '-transaction_id')[:page_size]
+            ),
+        }
+
+        for title, queryset in queries.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started_at = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started_at) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(f'median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms\n')
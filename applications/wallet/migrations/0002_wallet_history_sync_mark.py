@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='last_signature',
+            field=models.CharField(blank=True, help_text='High-water mark of the history sync: only newer transactions are fetched from the blockchain', max_length=200, verbose_name='Last synced transaction signature'),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='last_slot',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Last synced transaction slot'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-17 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_wallet_history_sync_mark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('modified', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('status', models.CharField(choices=[('draft', 'Черновик'), ('published', 'Опубликовано')], default='published', max_length=50, verbose_name='Статус')),
+                ('blockchain', models.CharField(choices=[('solana', 'Solana'), ('bsc', 'Binance Smart Chain'), ('bnb', 'Binance Chain'), ('ton', 'Telegram Open Network')], max_length=20, unique=True, verbose_name='Blockchain')),
+                ('block_number', models.PositiveBigIntegerField(help_text='The scanner resumes from the next block after a restart', verbose_name='Last scanned block')),
+            ],
+            options={
+                'verbose_name': 'block cursor',
+                'verbose_name_plural': 'block cursors',
+                'ordering': ['blockchain'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='value',
+            field=models.DecimalField(blank=True, decimal_places=0, help_text='Transferred amount in the smallest units of the blockchain (wei for BSC)', max_digits=40, null=True, verbose_name='Value'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_transaction_time(apps, schema_editor):
+    # Заполняем время транзакции в существующих связях одним запросом UPDATE. Неизвестное время заменяется нулем,
+    # чтобы ключ постраничного вывода (transaction_time, transaction) не содержал NULL
+    Transaction = apps.get_model('wallet', 'Transaction')
+    WalletTransaction = apps.get_model('wallet', 'WalletTransaction')
+    WalletTransaction.objects.update(
+        transaction_time=Coalesce(
+            Subquery(Transaction.objects.filter(pk=OuterRef('transaction_id')).values('transaction_time')[:1]),
+            Value(0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0003_block_cursor_transaction_value'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='recipient',
+            field=models.CharField(blank=True, db_index=True, max_length=200, verbose_name='Recipient'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='sender',
+            field=models.CharField(blank=True, db_index=True, max_length=200, verbose_name='Sender'),
+        ),
+        # Таблица wallet_transaction_wallet уже создана автоматической связью многие-ко-многим вместе с
+        # уникальным индексом (transaction_id, wallet_id): меняется только состояние моделей
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='WalletTransaction',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_links', to='wallet.transaction', verbose_name='Transaction')),
+                        ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_links', to='wallet.wallet', verbose_name='Wallet')),
+                    ],
+                    options={
+                        'verbose_name': 'wallet transaction',
+                        'verbose_name_plural': 'wallet transactions',
+                        'db_table': 'wallet_transaction_wallet',
+                        'unique_together': {('transaction', 'wallet')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='transaction',
+                    name='wallet',
+                    field=models.ManyToManyField(related_name='transactions', through='wallet.WalletTransaction', to='wallet.wallet', verbose_name='Wallet'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='transaction_time',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Copy of Transaction.transaction_time, so the wallet history is read from one index without a join', null=True, verbose_name='Transaction time'),
+        ),
+        migrations.RunPython(copy_transaction_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'transaction_time', 'transaction'], name='wallet_tx_history_idx'),
+        ),
+    ]
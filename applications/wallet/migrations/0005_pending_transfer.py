@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0004_wallet_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingTransfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('modified', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('status', models.CharField(choices=[('draft', 'Черновик'), ('published', 'Опубликовано')], default='published', max_length=50, verbose_name='Статус')),
+                ('blockchain', models.CharField(choices=[('solana', 'Solana'), ('bsc', 'Binance Smart Chain'), ('bnb', 'Binance Chain'), ('ton', 'Telegram Open Network')], max_length=20, verbose_name='Blockchain')),
+                ('transaction_id', models.CharField(help_text='Solana transaction signature or BSC transaction hash', max_length=200, unique=True, verbose_name='Transaction id')),
+                ('chat_id', models.BigIntegerField(help_text='Chat notified about the result of the transfer', verbose_name='Telegram chat id')),
+                ('sender', models.CharField(max_length=200, verbose_name='Sender')),
+                ('recipient', models.CharField(max_length=200, verbose_name='Recipient')),
+                ('amount', models.CharField(help_text='Transferred amount as shown to the user', max_length=100, verbose_name='Amount')),
+                ('raw_transaction', models.TextField(help_text='Hex of the signed wire transaction, broadcast again if the process stopped before sending it', verbose_name='Signed transaction')),
+                ('recent_blockhash', models.CharField(blank=True, max_length=100, verbose_name='Recent blockhash')),
+                ('last_valid_block_height', models.PositiveBigIntegerField(blank=True, help_text='Solana block height after which the transaction can no longer be included', null=True, verbose_name='Last valid block height')),
+                ('nonce', models.PositiveBigIntegerField(blank=True, help_text='BSC account nonce of the transaction', null=True, verbose_name='Nonce')),
+                ('transfer_status', models.CharField(choices=[('signed', 'Signed'), ('submitted', 'Submitted'), ('confirmed', 'Confirmed'), ('failed', 'Failed'), ('expired', 'Expired')], db_index=True, default='signed', max_length=20, verbose_name='Transfer status')),
+            ],
+            options={
+                'verbose_name': 'pending transfer',
+                'verbose_name_plural': 'pending transfers',
+                'ordering': ['created'],
+            },
+        ),
+    ]
@@ -107,6 +107,19 @@ class Wallet(Common):
         blank=True,
     )
 
+    last_signature = models.CharField(
+        verbose_name='Last synced transaction signature',
+        help_text='High-water mark of the history sync: only newer transactions are fetched from the blockchain',
+        max_length=200,
+        blank=True,
+    )
+
+    last_slot = models.PositiveBigIntegerField(
+        verbose_name='Last synced transaction slot',
+        blank=True,
+        null=True,
+    )
+
     class Meta:
         ordering = ['created']
         verbose_name = 'wallet'
@@ -123,6 +136,7 @@ class Transaction(Common):
     wallet = models.ManyToManyField(
         verbose_name='Wallet',
         to=Wallet,
+        through='WalletTransaction',
         related_name='transactions',
     )
 
@@ -136,12 +150,14 @@ class Transaction(Common):
         verbose_name='Sender',
         max_length=200,
         blank=True,
+        db_index=True,
     )
 
     recipient = models.CharField(
         verbose_name='Recipient',
         max_length=200,
         blank=True,
+        db_index=True,
     )
 
     pre_balances = models.PositiveBigIntegerField(
@@ -168,6 +184,15 @@ class Transaction(Common):
         null=True,
     )
 
+    value = models.DecimalField(
+        verbose_name='Value',
+        help_text='Transferred amount in the smallest units of the blockchain (wei for BSC)',
+        max_digits=40,
+        decimal_places=0,
+        blank=True,
+        null=True,
+    )
+
     transaction_status = models.CharField(
         verbose_name='Transaction status',
         max_length=200,
@@ -187,3 +212,156 @@ class Transaction(Common):
 
     def __str__(self):
         return f'id: {self.transaction_id[:4]}...{self.transaction_id[-4:]}, time: {self.transaction_time}, slot: {self.slot}'
+
+
+class WalletTransaction(models.Model):
+    """
+    Link between a wallet and its transaction
+    """
+    transaction = models.ForeignKey(
+        verbose_name='Transaction',
+        to=Transaction,
+        on_delete=models.CASCADE,
+        related_name='wallet_links',
+    )
+
+    wallet = models.ForeignKey(
+        verbose_name='Wallet',
+        to=Wallet,
+        on_delete=models.CASCADE,
+        related_name='transaction_links',
+    )
+
+    transaction_time = models.PositiveBigIntegerField(
+        verbose_name='Transaction time',
+        help_text='Copy of Transaction.transaction_time, so the wallet history is read from one index without a join',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        # Таблица автоматической связи многие-ко-многим сохраняется, добавляется только время транзакции
+        db_table = 'wallet_transaction_wallet'
+        unique_together = [('transaction', 'wallet')]
+        indexes = [
+            # История кошелька по времени: (transaction_time, transaction) - ключ постраничного вывода
+            models.Index(fields=['wallet', 'transaction_time', 'transaction'], name='wallet_tx_history_idx'),
+        ]
+        verbose_name = 'wallet transaction'
+        verbose_name_plural = 'wallet transactions'
+
+    def __str__(self):
+        return f'{self.wallet_id}: {self.transaction_id}'
+
+
+class PendingTransfer(Common):
+    """
+    Transfer outbox: a signed transfer transaction and its confirmation status
+    """
+
+    class TransferStatus(models.TextChoices):
+        SIGNED = 'signed', 'Signed'
+        SUBMITTED = 'submitted', 'Submitted'
+        CONFIRMED = 'confirmed', 'Confirmed'
+        FAILED = 'failed', 'Failed'
+        EXPIRED = 'expired', 'Expired'
+
+    blockchain = models.CharField(
+        verbose_name='Blockchain',
+        choices=Blockchain.choices,
+        max_length=20,
+    )
+
+    transaction_id = models.CharField(
+        verbose_name='Transaction id',
+        help_text='Solana transaction signature or BSC transaction hash',
+        max_length=200,
+        unique=True,
+    )
+
+    chat_id = models.BigIntegerField(
+        verbose_name='Telegram chat id',
+        help_text='Chat notified about the result of the transfer',
+    )
+
+    sender = models.CharField(
+        verbose_name='Sender',
+        max_length=200,
+    )
+
+    recipient = models.CharField(
+        verbose_name='Recipient',
+        max_length=200,
+    )
+
+    amount = models.CharField(
+        verbose_name='Amount',
+        help_text='Transferred amount as shown to the user',
+        max_length=100,
+    )
+
+    raw_transaction = models.TextField(
+        verbose_name='Signed transaction',
+        help_text='Hex of the signed wire transaction, broadcast again if the process stopped before sending it',
+    )
+
+    recent_blockhash = models.CharField(
+        verbose_name='Recent blockhash',
+        max_length=100,
+        blank=True,
+    )
+
+    last_valid_block_height = models.PositiveBigIntegerField(
+        verbose_name='Last valid block height',
+        help_text='Solana block height after which the transaction can no longer be included',
+        blank=True,
+        null=True,
+    )
+
+    nonce = models.PositiveBigIntegerField(
+        verbose_name='Nonce',
+        help_text='BSC account nonce of the transaction',
+        blank=True,
+        null=True,
+    )
+
+    transfer_status = models.CharField(
+        verbose_name='Transfer status',
+        choices=TransferStatus.choices,
+        default=TransferStatus.SIGNED,
+        max_length=20,
+        db_index=True,
+    )
+
+    class Meta:
+        ordering = ['created']
+        verbose_name = 'pending transfer'
+        verbose_name_plural = 'pending transfers'
+
+    def __str__(self):
+        return f'{self.blockchain}: {self.transaction_id[:4]}...{self.transaction_id[-4:]}, {self.transfer_status}'
+
+
+class BlockCursor(Common):
+    """
+    Block scanner cursor
+    """
+    blockchain = models.CharField(
+        verbose_name='Blockchain',
+        choices=Blockchain.choices,
+        max_length=20,
+        unique=True,
+    )
+
+    block_number = models.PositiveBigIntegerField(
+        verbose_name='Last scanned block',
+        help_text='The scanner resumes from the next block after a restart',
+    )
+
+    class Meta:
+        ordering = ['blockchain']
+        verbose_name = 'block cursor'
+        verbose_name_plural = 'block cursors'
+
+    def __str__(self):
+        return f'{self.blockchain}: {self.block_number}'
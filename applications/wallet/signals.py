@@ -1,4 +1,4 @@
-from django.db.models.signals import m2m_changed, pre_delete
+from django.db.models.signals import m2m_changed, pre_delete, post_save, post_delete
 from django.dispatch import receiver
 
 from applications.wallet.models import Wallet
@@ -11,3 +11,31 @@ def delete_transaction(sender, instance, **kwargs):
     for tr in transactions:
         if tr.wallet.count() <= 1:
             tr.delete()
+
+
+# reset cached wallet lists containing the wallet
+@receiver(post_save, sender=Wallet)
+@receiver(post_delete, sender=Wallet)
+def invalidate_wallet_cache(sender, instance, **kwargs):
+    # Импорт при вызове: настройки бота не нужны при загрузке приложений Django (см. applications/account/signals.py)
+    from services.user_repository import user_repository
+
+    user_repository.invalidate_wallets([instance.pk])
+
+
+# reset cached wallet lists of users who got or lost a wallet
+@receiver(m2m_changed, sender=Wallet.user.through)
+def invalidate_wallet_owners_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    from services.user_repository import user_repository, user_tag, wallet_tag
+
+    if reverse:
+        # Изменены кошельки пользователя (user.wallets)
+        user_repository.invalidate([user_tag(instance.pk)])
+    elif pk_set is None:
+        # Очищены владельцы кошелька (wallet.user.clear())
+        user_repository.invalidate([wallet_tag(instance.pk)])
+    else:
+        # Изменены владельцы кошелька (wallet.user)
+        user_repository.invalidate([wallet_tag(instance.pk), *(user_tag(user_id) for user_id in pk_set)])
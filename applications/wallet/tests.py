@@ -1,3 +1,682 @@
-from django.test import TestCase
+import asyncio
+import base64
+import importlib
+import json
+import math
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Set
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import websockets
+from aiohttp import web
+from django.apps import apps
+from django.test import SimpleTestCase, TestCase
+from solana.rpc.async_api import AsyncClient
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.transaction import Transaction as SoldersTransaction
+
+from config_data.config import (BSC_GAS_LIMIT_MARGIN, BSC_TRANSFER_GAS, LAMPORT_TO_SOL_RATIO,
+                                SOLANA_MULTIPLE_ACCOUNTS_LIMIT)
+from external_services.binance_smart_chain.gas_oracle import GasOracle
+from external_services.cache import BalanceCache, TransactionHistoryCache, balance_cache
+from external_services import json_rpc
+from external_services.json_rpc import build_json_rpc_request, call_with_batch_fallback, send_json_rpc_batch
+from external_services.solana.blockhash_provider import BlockhashProvider
+from external_services.solana.solana import batch_transfer, get_multiple_sol_balances, sign_transfer, solana_router
+from external_services.solana.subscriptions import AccountSubscriptionManager
+from services.confirmation_tracker import TRANSFER_EXPIRED, ConfirmationTracker, TrackedTransfer
+from services.history_indexer import HistoryIndexer
+from services.history_sync import HISTORY_NEWER, HISTORY_OLDER, get_transaction_page, save_transactions
+
+from applications.wallet.models import Blockchain, Transaction, Wallet, WalletTransaction
+
+copy_transaction_time = importlib.import_module(
+    'applications.wallet.migrations.0004_wallet_transaction_indexes'
+).copy_transaction_time
+
+
+class FakeSolanaRpc:
+    """
+        Local JSON-RPC server standing in for a Solana node.
+
+        Answers getMultipleAccounts from the lamports of the known accounts, unknown accounts do not exist on chain.
+        Every getLatestBlockhash call returns a new blockhash, as if a slot had passed. Sent transactions are accepted
+        without being executed. Every received request is recorded.
+
+        Attributes:
+            accounts (Dict[str, int]): The lamports by account address.
+            requests (List[Dict[str, Any]]): The received JSON-RPC requests.
+            url (str): The URL of the server, set when it is started.
+    """
+
+    def __init__(self, accounts: Optional[Dict[str, int]] = None) -> None:
+        self.accounts = accounts or {}
+        self.requests: List[Dict[str, Any]] = []
+        self.url = ''
+        self._runner: Optional[web.AppRunner] = None
+
+    async def __aenter__(self) -> 'FakeSolanaRpc':
+        app = web.Application()
+        app.router.add_post('/', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        # Порт 0 - свободный порт выбирает система
+        host, port = self._runner.addresses[0][:2]
+        self.url = f'http://{host}:{port}'
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests.append(body)
+        if body['method'] == 'getMultipleAccounts':
+            result = {'context': {'slot': 1}, 'value': [self._account(address) for address in body['params'][0]]}
+        elif body['method'] == 'getLatestBlockhash':
+            result = {'context': {'slot': 1},
+                      'value': {'blockhash': str(Hash.new_unique()), 'lastValidBlockHeight': 150}}
+        elif body['method'] == 'getBlockHeight':
+            result = 1
+        elif body['method'] == 'sendTransaction':
+            result = str(SoldersTransaction.from_bytes(base64.b64decode(body['params'][0])).signatures[0])
+        else:
+            return web.json_response({'jsonrpc': '2.0', 'id': body['id'],
+                                      'error': {'code': -32601, 'message': 'Method not found'}})
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': result})
+
+    def _account(self, address: str) -> Optional[Dict[str, Any]]:
+        if address not in self.accounts:
+            return None
+        return {'lamports': self.accounts[address], 'owner': '11111111111111111111111111111111',
+                'data': ['', 'base64'], 'executable': False, 'rentEpoch': 0, 'space': 0}
+
+
+def new_addresses(count: int) -> List[str]:
+    return [str(Keypair().pubkey()) for _ in range(count)]
+
+
+class GetMultipleSolBalancesTests(SimpleTestCase):
+
+    async def get_balances(self, rpc: FakeSolanaRpc, wallet_addresses: List[str]) -> List[float]:
+        client = AsyncClient(rpc.url)
+        try:
+            return await get_multiple_sol_balances(wallet_addresses, client)
+        finally:
+            await client.close()
+
+    async def test_chunks_at_multiple_accounts_limit(self):
+        wallet_addresses = new_addresses(2 * SOLANA_MULTIPLE_ACCOUNTS_LIMIT + 1)
+        async with FakeSolanaRpc() as rpc:
+            await self.get_balances(rpc, wallet_addresses)
+
+        chunk_sizes = sorted((len(request['params'][0]) for request in rpc.requests), reverse=True)
+        self.assertEqual(chunk_sizes, [SOLANA_MULTIPLE_ACCOUNTS_LIMIT, SOLANA_MULTIPLE_ACCOUNTS_LIMIT, 1])
+        requested = [address for request in rpc.requests for address in request['params'][0]]
+        self.assertCountEqual(requested, wallet_addresses)
+
+    async def test_balances_follow_address_order(self):
+        wallet_addresses = new_addresses(SOLANA_MULTIPLE_ACCOUNTS_LIMIT + 20)
+        accounts = {address: (i + 1) * LAMPORT_TO_SOL_RATIO // 10 for i, address in enumerate(wallet_addresses)}
+        async with FakeSolanaRpc(accounts) as rpc:
+            balances = await self.get_balances(rpc, wallet_addresses)
+
+        self.assertEqual(balances, [(i + 1) / 10 for i in range(len(wallet_addresses))])
+
+    async def test_missing_accounts_have_zero_balance(self):
+        funded, missing = new_addresses(2)
+        async with FakeSolanaRpc({funded: 3 * LAMPORT_TO_SOL_RATIO}) as rpc:
+            balances = await self.get_balances(rpc, [missing, funded, missing])
+
+        self.assertEqual(balances, [0, 3, 0])
+
+    async def test_no_addresses_make_no_requests(self):
+        async with FakeSolanaRpc() as rpc:
+            balances = await self.get_balances(rpc, [])
+
+        self.assertEqual(balances, [])
+        self.assertEqual(rpc.requests, [])
+
+
+class IdenticalTransferTests(SimpleTestCase):
+
+    def setUp(self):
+        self.sender_keypair = Keypair()
+        self.sender_private_key = bytes(self.sender_keypair)[:32].hex()
+        self.sender, self.recipient = str(self.sender_keypair.pubkey()), new_addresses(1)[0]
+
+    async def run_with_node(self, test):
+        async with FakeSolanaRpc() as rpc:
+            client = AsyncClient(rpc.url)
+
+            async def call(fn, client_=None, **kwargs):
+                return await fn(client)
+
+            try:
+                with mock.patch.object(solana_router, 'call', call), \
+                        mock.patch('external_services.solana.solana.blockhash_provider',
+                                   BlockhashProvider(solana_router)):
+                    await test(rpc)
+            finally:
+                await client.close()
+
+    async def test_identical_transfers_get_different_signatures(self):
+        async def test(rpc):
+            first = await sign_transfer(self.sender, self.sender_private_key, self.recipient, 0.5)
+            second = await sign_transfer(self.sender, self.sender_private_key, self.recipient, 0.5)
+
+            self.assertNotEqual(first.transaction_id, second.transaction_id)
+            self.assertNotEqual(first.recent_blockhash, second.recent_blockhash)
+
+        await self.run_with_node(test)
+
+    async def test_identical_batch_groups_get_different_signatures(self):
+        async def test(rpc):
+            payouts = [(self.recipient, 0.001)] * 200
+            first = await batch_transfer(self.sender, self.sender_private_key, payouts)
+            second = await batch_transfer(self.sender, self.sender_private_key, payouts)
+
+            signatures = [batch.transaction_id for batch in first + second]
+            self.assertGreater(len(first), 1)
+            self.assertEqual(len(signatures), len(set(signatures)))
+            self.assertTrue(all(batch.error is None for batch in first + second))
+
+        await self.run_with_node(test)
+
+
+class FakeBatchNode:
+    """
+        Local HTTP server standing in for JSON-RPC nodes that answer batch requests with the HTTP status in the path.
+
+        A request to /200 gets a result for every call of the batch, other paths get an error with their status.
+    """
+
+    def __init__(self) -> None:
+        self.base_url = ''
+        self._runner: Optional[web.AppRunner] = None
+
+    async def __aenter__(self) -> 'FakeBatchNode':
+        app = web.Application()
+        app.router.add_post('/{status}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', 0).start()
+        host, port = self._runner.addresses[0][:2]
+        self.base_url = f'http://{host}:{port}'
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        status = int(request.match_info['status'])
+        if status != 200:
+            return web.json_response({'error': 'rejected'}, status=status)
+        return web.json_response([{'jsonrpc': '2.0', 'id': item['id'], 'result': True}
+                                  for item in await request.json()])
+
+
+class BatchFallbackTests(SimpleTestCase):
+
+    def setUp(self):
+        self.modes = []
+
+    async def run_with_nodes(self, test):
+        async with FakeBatchNode() as node, httpx.AsyncClient() as session:
+            async def call(status):
+                url = f'{node.base_url}/{status}'
+
+                async def batched():
+                    self.modes.append('batch')
+                    return await send_json_rpc_batch(url, [build_json_rpc_request(0, 'getHealth', [])], session)
+
+                async def single():
+                    self.modes.append('single')
+                    return 'single'
+
+                return await call_with_batch_fallback(url, batched, single)
+
+            with mock.patch.object(json_rpc, 'batch_unsupported_urls', set()):
+                await test(call)
+
+    async def test_rejecting_node_gets_single_requests_only(self):
+        async def test(call):
+            self.assertEqual(await call(405), 'single')
+            self.assertEqual(await call(405), 'single')
+
+            self.assertEqual(self.modes, ['batch', 'single', 'single'])
+
+        await self.run_with_nodes(test)
+
+    async def test_rejection_by_one_node_keeps_batches_for_the_others(self):
+        async def test(call):
+            await call(413)
+
+            self.assertEqual((await call(200))[0]['result'], True)
+
+        await self.run_with_nodes(test)
+
+    async def test_client_error_does_not_disable_batches(self):
+        async def test(call):
+            with self.assertRaises(httpx.HTTPStatusError):
+                await call(401)
+
+            self.assertEqual(json_rpc.batch_unsupported_urls, set())
+
+        await self.run_with_nodes(test)
+
+
+class HistoryIndexerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.indexer = HistoryIndexer(workers=1, rate_limit=1000)
+        # is_indexed учитывает только работающий индексатор
+        self.indexer._task = mock.Mock(done=mock.Mock(return_value=False))
+
+    async def run_pass(self, during_sync=None):
+        async def sync_wallet_history(wallet_address):
+            if during_sync is not None:
+                during_sync()
+            return 0
+
+        with mock.patch('services.history_indexer.get_wallet_addresses', mock.AsyncMock(return_value=['A', 'B'])), \
+                mock.patch('services.history_indexer.sync_wallet_history', sync_wallet_history):
+            await self.indexer.run_pass()
+
+    async def test_synced_wallets_are_indexed(self):
+        await self.run_pass()
+
+        self.assertTrue(self.indexer.is_indexed('A'))
+        self.assertTrue(self.indexer.is_indexed('B'))
+
+    async def test_mark_stale_makes_the_handler_sync(self):
+        await self.run_pass()
+        self.indexer.mark_stale('A', 'not-stored')
+
+        self.assertFalse(self.indexer.is_indexed('A'))
+        self.assertTrue(self.indexer.is_indexed('B'))
+
+    async def test_change_during_sync_keeps_the_wallet_stale(self):
+        await self.run_pass(during_sync=lambda: self.indexer.mark_stale('A'))
+
+        self.assertFalse(self.indexer.is_indexed('A'))
+        await self.run_pass()
+        self.assertTrue(self.indexer.is_indexed('A'))
+
+
+class ConfirmationTrackerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tracker = ConfirmationTracker(timeout=180)
+        self.results = {}
+
+    def track_bsc_transfer(self, transaction_id, submitted_at):
+        self.tracker.track(TrackedTransfer(
+            blockchain='bsc', transaction_id=transaction_id, chat_id=1, sender_address='A', recipient_address='B',
+            amount='1', submitted_at=submitted_at,
+        ))
+
+    async def poll(self, known_transactions):
+        async def notifier(transfer, result):
+            self.results[transfer.transaction_id] = result
+
+        async def get_known_transactions(transaction_hashes):
+            return [transaction_hash in known_transactions for transaction_hash in transaction_hashes]
+
+        self.tracker._notifier = notifier
+        with mock.patch('services.confirmation_tracker.get_receipt_statuses',
+                        mock.AsyncMock(side_effect=lambda hashes: [None] * len(hashes))), \
+                mock.patch('services.confirmation_tracker.get_known_transactions', get_known_transactions), \
+                mock.patch('services.confirmation_tracker.save_transfer_result', mock.AsyncMock()):
+            await self.tracker.poll()
+
+    async def test_transfer_in_mempool_is_not_expired(self):
+        self.track_bsc_transfer('0xpending', submitted_at=time.time() - 600)
+        self.track_bsc_transfer('0xdropped', submitted_at=time.time() - 600)
+        await self.poll(known_transactions={'0xpending'})
+
+        self.assertEqual(self.results, {'0xdropped': TRANSFER_EXPIRED})
+        self.assertEqual(self.tracker.pending_count, 1)
+
+    async def test_transfer_within_timeout_is_not_expired(self):
+        self.track_bsc_transfer('0xdropped', submitted_at=time.time())
+        await self.poll(known_transactions=set())
+
+        self.assertEqual(self.results, {})
+
+
+class GasOracleTests(SimpleTestCase):
+
+    CONTRACT = '0x' + '11' * 20
+    ACCOUNT = '0x' + '22' * 20
+
+    def setUp(self):
+        self.estimates = []
+
+        async def get_code(address):
+            return b'\x60\x80' if address.lower() == self.CONTRACT else b''
+
+        async def estimate_gas(transaction):
+            self.estimates.append(transaction)
+            # Для проверки ключа оценка зависит от суммы перевода
+            return 30000 + transaction['value']
+
+        node_client = SimpleNamespace(eth=SimpleNamespace(get_code=get_code, estimate_gas=estimate_gas))
+
+        async def call(fn, client=None):
+            return await fn(node_client)
+
+        self.oracle = GasOracle(SimpleNamespace(call=call))
+
+    async def test_address_without_code_is_not_estimated(self):
+        gas = await self.oracle.transfer_gas(self.ACCOUNT, self.ACCOUNT, 1)
+
+        self.assertEqual(gas, BSC_TRANSFER_GAS)
+        self.assertEqual(self.estimates, [])
+
+    async def test_contract_estimates_are_not_shared_between_transfers(self):
+        first, second = await asyncio.gather(
+            self.oracle.transfer_gas(self.ACCOUNT, self.CONTRACT, 0),
+            self.oracle.transfer_gas(self.ACCOUNT, self.CONTRACT, 10000),
+        )
+
+        self.assertEqual(first, int(30000 * BSC_GAS_LIMIT_MARGIN))
+        self.assertEqual(second, int(40000 * BSC_GAS_LIMIT_MARGIN))
+        self.assertEqual(len(self.estimates), 2)
+
+
+class BalanceCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = BalanceCache(ttl=60, stale_ttl=300)
+        self.release_fetch = asyncio.Event()
+        self.balances = {'A': 1.0}
+
+        async def fetch(wallet_addresses):
+            # Запрос начинается со старым балансом и завершается, когда тест его отпустит
+            balances = [self.balances[wallet_address] for wallet_address in wallet_addresses]
+            await self.release_fetch.wait()
+            return balances
+
+        self.cache.register_fetcher('solana', fetch)
+
+    async def test_fetch_caches_the_balance(self):
+        self.release_fetch.set()
+
+        self.assertEqual(await self.cache.get_balance('solana', 'A'), 1.0)
+        self.balances['A'] = 2.0
+        self.assertEqual(await self.cache.get_balance('solana', 'A'), 1.0)
+
+    async def test_fetch_started_before_invalidate_is_not_cached(self):
+        fetch = asyncio.create_task(self.cache.get_balance('solana', 'A'))
+        await asyncio.sleep(0)
+        # Перевод завершился, пока запрос баланса был в полете
+        self.balances['A'] = 2.0
+        self.cache.invalidate('solana', 'A')
+        self.release_fetch.set()
+
+        self.assertEqual(await fetch, 1.0)
+        self.assertEqual(await self.cache.get_balance('solana', 'A'), 2.0)
+
+    async def test_fetch_does_not_overwrite_a_newer_set(self):
+        fetch = asyncio.create_task(self.cache.get_balance('solana', 'A'))
+        await asyncio.sleep(0)
+        self.cache.set('solana', 'A', 3.0)
+        self.release_fetch.set()
+        await fetch
+
+        self.assertEqual(await self.cache.get_balance('solana', 'A'), 3.0)
+
+
+class TransactionHistoryCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = TransactionHistoryCache(ttl=60)
+        self.release_read = asyncio.Event()
+        self.version = 1
+        self.reads = 0
+
+    async def read_page(self):
+        # Чтение начинается с прежней историей и завершается, когда тест его отпустит
+        self.reads += 1
+        page = SimpleNamespace(transactions=[], version=self.version)
+        await self.release_read.wait()
+        return page
+
+    async def get_page(self, wallet_address='A'):
+        return await self.cache.get_page(wallet_address, ('o', None, 10), self.read_page)
+
+    async def test_repeat_view_is_served_from_memory(self):
+        self.release_read.set()
+        await self.get_page()
+        await self.get_page()
+
+        self.assertEqual(self.reads, 1)
+        self.assertEqual(self.cache.stats()['hit_rate'], 0.5)
+
+    async def test_invalidate_drops_only_the_pages_of_the_wallet(self):
+        self.release_read.set()
+        await self.get_page('A')
+        await self.get_page('B')
+        self.version = 2
+        self.cache.invalidate('A')
+
+        self.assertEqual((await self.get_page('A')).version, 2)
+        self.assertEqual((await self.get_page('B')).version, 1)
+
+    async def test_read_started_before_invalidate_is_not_cached(self):
+        read = asyncio.create_task(self.get_page())
+        await asyncio.sleep(0)
+        # Новые транзакции кошелька сохранены, пока страница читалась
+        self.version = 2
+        self.cache.invalidate('A')
+        self.release_read.set()
+
+        self.assertEqual((await read).version, 1)
+        self.assertEqual((await self.get_page()).version, 2)
+
+
+class FakeSolanaWebSocket:
+    """
+        Local WebSocket server standing in for the PubSub endpoint of a Solana node.
+
+        Confirms accountSubscribe requests with increasing subscription ids, except for the rejected addresses, which
+        get an error. Notifications are pushed with notify().
+
+        Attributes:
+            rejected (Set[str]): The addresses whose subscription fails.
+            subscriptions (Dict[str, int]): The subscription ids by address.
+            url (str): The URL of the server, set when it is started.
+    """
+
+    def __init__(self, rejected: Optional[Set[str]] = None) -> None:
+        self.rejected = rejected or set()
+        self.subscriptions: Dict[str, int] = {}
+        self.url = ''
+        self._server = None
+        self._connection = None
+
+    async def __aenter__(self) -> 'FakeSolanaWebSocket':
+        self._server = await websockets.serve(self._handle, '127.0.0.1', 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        self.url = f'ws://{host}:{port}'
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, connection) -> None:
+        self._connection = connection
+        async for raw_message in connection:
+            message = json.loads(raw_message)
+            if message['method'] != 'accountSubscribe':
+                continue
+            wallet_address = message['params'][0]
+            if wallet_address in self.rejected:
+                response = {'jsonrpc': '2.0', 'id': message['id'],
+                            'error': {'code': -32602, 'message': 'Invalid param'}}
+            else:
+                self.subscriptions[wallet_address] = len(self.subscriptions) + 1
+                response = {'jsonrpc': '2.0', 'id': message['id'], 'result': self.subscriptions[wallet_address]}
+            await connection.send(json.dumps(response))
+
+    async def notify(self, wallet_address: str, lamports: int, slot: int) -> None:
+        await self._connection.send(json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'accountNotification',
+            'params': {
+                'subscription': self.subscriptions[wallet_address],
+                'result': {'context': {'slot': slot}, 'value': {'lamports': lamports}},
+            },
+        }))
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 5) -> None:
+    async def poll() -> None:
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+class AccountSubscriptionManagerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.funded, self.rejected = new_addresses(2)
+
+    def tearDown(self):
+        balance_cache.invalidate('solana', self.funded, self.rejected)
+
+    def cached_balance(self, wallet_address: str):
+        # (баланс, момент, до которого он актуален) или None
+        return balance_cache._cache.get(('solana', wallet_address))
+
+    async def run_manager(self, test):
+        accounts = {self.funded: LAMPORT_TO_SOL_RATIO, self.rejected: 2 * LAMPORT_TO_SOL_RATIO}
+        async with FakeSolanaRpc(accounts) as rpc, FakeSolanaWebSocket(rejected={self.rejected}) as node:
+            client = AsyncClient(rpc.url)
+
+            async def call(fn, client_=None, **kwargs):
+                return await fn(client)
+
+            manager = AccountSubscriptionManager(ws_url=node.url)
+            await manager.sync_tracked([self.funded, self.rejected])
+            try:
+                with mock.patch('external_services.solana.subscriptions.solana_router.call', call):
+                    manager.start()
+                    # Начальные балансы запрошены по HTTP, ответы на обе подписки получены
+                    await wait_until(lambda: rpc.requests and not manager._pending and manager.is_connected)
+                    await wait_until(lambda: self.cached_balance(self.funded) is not None)
+                    await test(manager, node)
+            finally:
+                await manager.stop()
+                await client.close()
+
+    async def test_notification_keeps_a_confirmed_balance_fresh(self):
+        async def test(manager, node):
+            self.assertTrue(manager.is_subscribed(self.funded))
+            await node.notify(self.funded, 5 * LAMPORT_TO_SOL_RATIO, slot=10)
+            await wait_until(lambda: self.cached_balance(self.funded)[0] == 5)
+
+            self.assertEqual(self.cached_balance(self.funded)[1], math.inf)
+
+        await self.run_manager(test)
+
+    async def test_failed_subscription_does_not_keep_the_balance_fresh(self):
+        async def test(manager, node):
+            self.assertFalse(manager.is_subscribed(self.rejected))
+            cached = self.cached_balance(self.rejected)
+
+            self.assertTrue(cached is None or cached[1] != math.inf)
+
+        await self.run_manager(test)
+
+    async def test_disconnect_invalidates_the_balances(self):
+        async def test(manager, node):
+            await manager.stop()
+
+            self.assertIsNone(self.cached_balance(self.funded))
+            self.assertFalse(manager.is_connected)
+
+        await self.run_manager(test)
+
+
+def solana_transaction(transaction_id: str, sender: str, recipient: str, block_time: Optional[int]) -> SimpleNamespace:
+    # Транзакция в том виде, в котором ее возвращает клиент Solana, с полями, которые читает parse_transaction
+    return SimpleNamespace(to_json=lambda: json.dumps({
+        'slot': 1,
+        'blockTime': block_time,
+        'transaction': {'signatures': [transaction_id], 'message': {'accountKeys': [sender, recipient]}},
+        'meta': {'status': {'Ok': None}, 'err': None, 'preBalances': [1], 'postBalances': [1]},
+    }))
+
+
+class WalletHistoryDatabaseTests(TestCase):
+    """
+        Functions of services.history_sync running against the test database.
+
+        The decorated functions are called through __wrapped__: the pool threads of database_sync_to_async have their
+        own connections and do not see the uncommitted data of the test transaction.
+    """
+
+    def setUp(self):
+        self.wallet = Wallet.objects.create(wallet_address='A', blockchain=Blockchain.SOLANA)
+
+    def save(self, *transactions):
+        return save_transactions.__wrapped__([solana_transaction(*transaction) for transaction in transactions])
+
+    def get_page(self, direction, cursor):
+        page = get_transaction_page.__wrapped__(self.wallet.pk, direction, cursor, 2)
+        return [transaction.transaction_id for transaction in page.transactions], page
+
+    def test_pages_do_not_skip_transactions_with_equal_time(self):
+        times = [90, 100, 100, 100, 100, 110]
+        self.save(*[(f'tx{i}', 'A', 'B', transaction_time) for i, transaction_time in enumerate(times)])
+
+        # К более старым: страницы начинаются и заканчиваются внутри группы с одинаковым временем
+        pages = []
+        page = self.get_page(HISTORY_OLDER, None)
+        pages.append(page[0])
+        while page[1].older_cursor is not None:
+            page = self.get_page(HISTORY_OLDER, page[1].older_cursor)
+            pages.append(page[0])
+        self.assertEqual(pages, [['tx5', 'tx4'], ['tx3', 'tx2'], ['tx1', 'tx0']])
+
+        # Обратно к более новым: те же страницы в обратном порядке
+        newer_pages = []
+        while page[1].newer_cursor is not None:
+            page = self.get_page(HISTORY_NEWER, page[1].newer_cursor)
+            newer_pages.append(page[0])
+        self.assertEqual(newer_pages, [['tx3', 'tx2'], ['tx5', 'tx4']])
+
+    def test_stored_transaction_is_linked_to_a_new_wallet(self):
+        self.save(('tx', 'A', 'B', 100))
+        Wallet.objects.create(wallet_address='B', blockchain=Blockchain.SOLANA)
+
+        with mock.patch('services.history_sync.transaction_history_cache') as history_cache, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.save(('tx', 'A', 'B', 100)), 1)
+
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(
+            set(WalletTransaction.objects.values_list('wallet__wallet_address', 'transaction_time')),
+            {('A', 100), ('B', 100)},
+        )
+        self.assertEqual(set(history_cache.invalidate.call_args.args), {'A', 'B'})
+
+    def test_migration_copies_transaction_time_to_links(self):
+        self.save(('dated', 'A', 'B', 100), ('undated', 'A', 'B', None))
+        WalletTransaction.objects.update(transaction_time=None)
+
+        copy_transaction_time(apps, None)
+
+        self.assertEqual(
+            dict(WalletTransaction.objects.values_list('transaction__transaction_id', 'transaction_time')),
+            {'dated': 100, 'undated': 0},
+        )
@@ -1,6 +1,7 @@
 # solana_wallet_telegram_bot/bot.py
 
 import asyncio
+import functools
 import traceback
 
 from aiogram import Bot, Dispatcher
@@ -16,7 +17,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'web.settings')
 django.setup()
 ####################
 
-from config_data.config import config
+from applications.wallet.models import Blockchain
+from config_data.config import config, CURRENT_BLOCKCHAIN
 from database.database import init_database
 from handlers import (
     user_handlers,
@@ -29,7 +31,18 @@ from handlers import (
     back_button_handler,
     delete_wallet_handlers,
 )
+from external_services.binance_smart_chain.bsc import bsc_router
+from external_services.solana.solana import blockhash_provider, solana_router
+from external_services.solana.subscriptions import account_subscription_manager
+from external_services.transport import rpc_transport
 from logger_config import logger
+from services.bsc_block_scanner import bsc_block_scanner
+from services.confirmation_tracker import confirmation_tracker
+from services.history_indexer import history_indexer
+from services.history_sync import get_wallet_addresses
+from services.transfer_outbox import recover_pending_transfers
+from utils.crypto_executor import crypto_executor
+from utils.db_executor import db_executor
 
 
 async def main() -> None:
@@ -74,7 +87,50 @@ async def main() -> None:
 
     # Пропускаем накопившиеся апдейты и запускаем polling
     await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+
+    # Открываем общий пул соединений с RPC-узлами
+    await rpc_transport.startup()
+
+    # Запускаем фоновую проверку доступности и задержки RPC-узлов текущего блокчейна
+    rpc_router = solana_router if CURRENT_BLOCKCHAIN == 'solana' else bsc_router
+    rpc_router.start()
+
+    if CURRENT_BLOCKCHAIN == 'solana':
+        # Подписываемся на изменения балансов кошельков Solana через WebSocket
+        account_subscription_manager.start(address_loader=lambda: get_wallet_addresses(Blockchain.SOLANA),
+                                           on_account_change=history_indexer.mark_stale)
+        # Запускаем фоновую загрузку истории транзакций кошельков
+        history_indexer.start()
+        # Запускаем фоновое обновление блокхэша, которым подписываются переводы
+        blockhash_provider.start()
+    elif CURRENT_BLOCKCHAIN == 'bsc':
+        # Запускаем сканер блоков, который сохраняет транзакции кошельков BSC
+        bsc_block_scanner.start()
+
+    # Запускаем отслеживание подтверждений отправленных переводов с уведомлением пользователей
+    confirmation_tracker.start(notifier=functools.partial(transfer_handlers.notify_transfer_result, bot))
+    try:
+        # Возобновляем переводы, которые не были завершены до перезапуска
+        try:
+            await recover_pending_transfers()
+        except Exception as e:
+            # Незавершенные переводы останутся в PendingTransfer до следующего запуска - бот продолжает работу
+            detailed_error_traceback = traceback.format_exc()
+            logger.error(f"Failed to recover pending transfers: {e}\n{detailed_error_traceback}")
+        await dp.start_polling(bot)
+    finally:
+        await confirmation_tracker.stop()
+        await history_indexer.stop()
+        await blockhash_provider.stop()
+        await bsc_block_scanner.stop()
+        await account_subscription_manager.stop()
+        await rpc_router.stop()
+        # Закрываем соединения с RPC-узлами
+        await rpc_transport.shutdown()
+        # Останавливаем пул вычислений с ключами
+        crypto_executor.shutdown(wait=False)
+        # Дожидаемся завершения запросов к базе данных
+        db_executor.shutdown()
 
 
 if __name__ == '__main__':
@@ -11,17 +11,61 @@ CURRENT_BLOCKCHAIN = 'bsc'
 SOLANA_NODE_URL = "https://api.testnet.solana.com"
 # SOLANA_NODE_URL = "https://api.devnet.solana.com"
 
-# Testnet
-# https://data-seed-prebsc-1-s1.bnbchain.org:8545
-# https://data-seed-prebsc-2-s1.bnbchain.org:8545
-# https://data-seed-prebsc-1-s2.bnbchain.org:8545
-# https://data-seed-prebsc-2-s2.bnbchain.org:8545
-# https://data-seed-prebsc-1-s3.bnbchain.org:8545
-# https://data-seed-prebsc-2-s3.bnbchain.org:8545
-BINANCE_NODE_URL = 'https://data-seed-prebsc-2-s2.bnbchain.org:8545'
-
-# Например, установить таймаут на чтение ответа 120 секунд, таймаут на соединение 20 секунд
-timeout_settings = Timeout(read=120.0, connect=20.0, write=None, pool=None)
+# WebSocket-адрес узла Solana для подписок на изменения аккаунтов
+SOLANA_WS_URL = "wss://api.testnet.solana.com"
+# SOLANA_WS_URL = "wss://api.devnet.solana.com"
+
+# Начальная и максимальная пауза перед переподключением к WebSocket узла Solana (в секундах)
+SOLANA_WS_RECONNECT_DELAY = 1
+SOLANA_WS_MAX_RECONNECT_DELAY = 60
+
+# Интервал сверки списка отслеживаемых кошельков с базой данных (в секундах)
+SOLANA_WS_RESYNC_INTERVAL = 60
+
+# Список узлов Solana, между которыми распределяются запросы. Первый узел - основной.
+SOLANA_NODE_URLS = [
+    SOLANA_NODE_URL,
+]
+
+# Testnet. Список узлов BSC, между которыми распределяются запросы. Первый узел - основной.
+BINANCE_NODE_URLS = [
+    'https://data-seed-prebsc-2-s2.bnbchain.org:8545',
+    'https://data-seed-prebsc-1-s1.bnbchain.org:8545',
+    'https://data-seed-prebsc-2-s1.bnbchain.org:8545',
+    'https://data-seed-prebsc-1-s2.bnbchain.org:8545',
+    'https://data-seed-prebsc-1-s3.bnbchain.org:8545',
+    'https://data-seed-prebsc-2-s3.bnbchain.org:8545',
+]
+BINANCE_NODE_URL = BINANCE_NODE_URLS[0]
+
+# Интервал фоновой проверки доступности и задержки RPC-узлов (в секундах)
+RPC_PROBE_INTERVAL = 30
+
+# Таймаут проверки доступности RPC-узла (в секундах)
+RPC_PROBE_TIMEOUT = 5
+
+# Таймаут запроса на чтение к RPC-узлу, после которого запрос повторяется на следующем узле (в секундах)
+RPC_READ_TIMEOUT = 10
+
+# Коэффициент сглаживания экспоненциального скользящего среднего задержки RPC-узла (0 < alpha <= 1)
+RPC_LATENCY_EWMA_ALPHA = 0.3
+
+# Например, установить таймаут на чтение ответа 120 секунд, таймаут на соединение 20 секунд.
+# Таймаут ожидания свободного соединения в пуле ограничен, чтобы при перегрузке запросы не висели бесконечно.
+timeout_settings = Timeout(read=120.0, connect=20.0, write=None, pool=30.0)
+
+# Максимальное количество одновременно открытых соединений с RPC-узлами (общий пул для Solana и BSC)
+RPC_MAX_CONNECTIONS = 100
+
+# Максимальное количество простаивающих keep-alive соединений, которые сохраняются в пуле
+RPC_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Время жизни простаивающего keep-alive соединения (в секундах)
+RPC_KEEPALIVE_EXPIRY = 30.0
+
+# Использовать HTTP/2 для запросов к RPC-узлам. Пакета h2 нет в requirements.txt, поэтому по умолчанию выключено:
+# для включения установите httpx[http2] и задайте True
+RPC_HTTP2 = False
 
 # Константа для определения соотношения между лампортами и SOL. 1 SOL = 10^9 лампортов.
 LAMPORT_TO_SOL_RATIO = 10 ** 9
@@ -35,13 +79,173 @@ PRIVATE_KEY_HEX_LENGTH = 64
 # Константа для определения длины двоичного представления приватного ключа в байтах.
 PRIVATE_KEY_BINARY_LENGTH = 32
 
-# Константа, определяющая длительность существования кеша для истории транзакций (в секундах).
-# Здесь установлено значение 3600 секунд (1 час).
-TRANSACTION_HISTORY_CACHE_DURATION = 3600
+# Время, в течение которого закэшированный баланс кошелька считается актуальным (в секундах)
+BALANCE_CACHE_TTL = 15
+
+# Время, в течение которого устаревший баланс еще показывается пользователю, пока он обновляется в фоне (в секундах)
+BALANCE_CACHE_STALE_TTL = 300
+
+# Максимальное количество балансов кошельков в кеше
+BALANCE_CACHE_MAX_ENTRIES = 10000
 
 # Константа для определения максимального количества транзакций в истории
 TRANSACTION_LIMIT = 5
 
+# Количество транзакций на одной странице истории кошелька в Telegram
+HISTORY_PAGE_SIZE = 10
+
+# Время жизни закэшированной страницы истории транзакций, прочитанной из базы данных (в секундах). Страницы кошелька
+# сбрасываются при сохранении его новых транзакций, переводах и уведомлениях подписки
+TRANSACTION_HISTORY_PAGE_CACHE_DURATION = 3600
+
+# Время жизни закэшированной первой (самой свежей) страницы истории (в секундах). В нее попадают новые транзакции,
+# сохраненные другим процессом, поэтому она хранится меньше
+TRANSACTION_HISTORY_HEAD_CACHE_DURATION = 60
+
+# Максимальное количество страниц истории транзакций в кеше
+TRANSACTION_HISTORY_CACHE_MAX_ENTRIES = 1000
+
+# Приблизительный лимит памяти кеша истории транзакций (в байтах)
+TRANSACTION_HISTORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Количество последних транзакций, загружаемых из блокчейна при первой синхронизации истории кошелька
+TRANSACTION_BACKFILL_LIMIT = 100
+
+# Количество параллельных воркеров фонового индексатора истории транзакций
+HISTORY_INDEXER_WORKERS = 3
+
+# Пауза между полными проходами фонового индексатора по всем кошелькам (в секундах)
+HISTORY_INDEXER_INTERVAL = 60
+
+# Максимальное количество синхронизаций кошельков в секунду (ограничение нагрузки на публичные RPC-узлы)
+HISTORY_INDEXER_RATE_LIMIT = 2
+
+# Максимальное количество подписей в одном запросе getSignaturesForAddress (ограничение RPC-узлов Solana)
+SOLANA_SIGNATURES_PAGE_LIMIT = 1000
+
+# Максимальное количество адресов в одном запросе getMultipleAccounts (ограничение RPC-узлов Solana)
+SOLANA_MULTIPLE_ACCOUNTS_LIMIT = 100
+
+# Максимальное количество вызовов getTransaction в одном пакетном (batch) JSON-RPC запросе к узлу Solana
+SOLANA_TRANSACTION_BATCH_SIZE = 25
+
+# Максимальное количество одновременно выполняемых запросов к узлу Solana
+SOLANA_MAX_CONCURRENT_REQUESTS = 5
+
+# Максимальное количество вызовов в одном пакетном (batch) JSON-RPC запросе к узлу BSC
+BSC_BATCH_SIZE = 50
+
+# Максимальное количество одновременно выполняемых запросов к узлу BSC
+BSC_MAX_CONCURRENT_REQUESTS = 5
+
+# Количество вызовов eth_getBlockByNumber в одном пакетном запросе к узлу BSC (полные блоки занимают много места)
+BSC_BLOCK_BATCH_SIZE = 10
+
+# Глубина подтверждения блока BSC: сканер обрабатывает только блоки, которые глубже этого числа блоков от вершины цепи,
+# поэтому реорганизация цепи не приводит к сохранению транзакций из отброшенных блоков
+BSC_CONFIRMATIONS = 15
+
+# Среднее время между блоками BSC (в секундах), пауза сканера после того, как он догнал вершину цепи
+BSC_BLOCK_TIME = 3
+
+# Максимальное количество блоков, обрабатываемых сканером за один проход
+BSC_SCAN_MAX_BLOCKS_PER_PASS = 200
+
+# Интервал полной перезагрузки индекса адресов BSC из базы данных (в секундах). Между перезагрузками перед каждым
+# проходом догружаются только новые кошельки, полная перезагрузка убирает из индекса удаленные
+BSC_SCANNER_ADDRESS_REFRESH_INTERVAL = 60
+
+# Время жизни закэшированной цены газа BSC (в секундах): цена, полученная из eth_gasPrice и eth_feeHistory, общая для
+# всех переводов в течение этого времени
+BSC_GAS_PRICE_TTL = 10
+
+# Количество последних блоков и процентиль вознаграждения валидатора в запросе eth_feeHistory
+BSC_FEE_HISTORY_BLOCKS = 20
+BSC_FEE_HISTORY_PERCENTILE = 50
+
+# Лимит газа простого перевода BNB на адрес без кода контракта
+BSC_TRANSFER_GAS = 21000
+
+# Запас лимита газа для перевода на адрес контракта, оценка eth_estimateGas умножается на это число
+BSC_GAS_LIMIT_MARGIN = 1.2
+
+# Время жизни закэшированных наличия кода контракта у получателя и оценки газа перевода на контракт (в секундах)
+# и максимальное количество записей в каждом из кэшей
+BSC_GAS_ESTIMATE_TTL = 3600
+BSC_GAS_ESTIMATE_MAX_ENTRIES = 10000
+
+# Тип пула для вычислений с мнемоническими фразами и ключами: 'thread' (потоки) или 'process' (процессы)
+CRYPTO_EXECUTOR_KIND = 'thread'
+
+# Количество потоков или процессов в пуле вычислений с ключами
+CRYPTO_EXECUTOR_WORKERS = 4
+
+# Время выполнения задачи пула вычислений с ключами (в секундах), после которого она записывается в лог как медленная
+CRYPTO_EXECUTOR_SLOW_JOB = 1.0
+
+# Шаблоны путей деривации BIP-44 кошельков Solana и BSC, {index} - номер аккаунта
+SOLANA_DERIVATION_PATH_TEMPLATE = "m/44'/501'/0'/{index}'"
+BSC_DERIVATION_PATH_TEMPLATE = "m/44'/60'/0'/0/{index}"
+
+# Количество путей деривации, перебираемых при поиске пути кошелька по мнемонической фразе
+DERIVATION_DISCOVERY_MAX_INDEX = 100
+
+# Количество путей деривации в одной задаче пула вычислений при поиске пути кошелька
+DERIVATION_DISCOVERY_CHUNK_SIZE = 10
+
+# Gap limit BIP-44: восстановление аккаунтов из мнемонической фразы останавливается после стольких подряд
+# неиспользованных адресов
+HD_GAP_LIMIT = 20
+
+# Максимальное количество адресов, проверяемых при восстановлении аккаунтов из мнемонической фразы
+HD_SCAN_MAX_ACCOUNTS = 1000
+
+# Время жизни записи кэша пользователей и их кошельков (в секундах). Записи сбрасываются сигналами моделей при
+# изменении данных, TTL лишь ограничивает срок жизни записи, если изменение прошло мимо сигналов. Сигналы срабатывают
+# только в процессе бота: изменения из админки Django (отдельный процесс runserver) бот увидит лишь по истечении TTL
+USER_CACHE_TTL = 600
+
+# Максимальное количество записей в кэше пользователей и их кошельков
+USER_CACHE_MAX_ENTRIES = 10000
+
+# Количество потоков пула, в котором выполняются запросы к базе данных через Django ORM
+DB_EXECUTOR_WORKERS = 8
+
+# Максимальное количество подписей в одном запросе getSignatureStatuses (ограничение RPC-узлов Solana)
+SOLANA_SIGNATURE_STATUSES_LIMIT = 256
+
+# Интервал опроса статусов отправленных переводов (в секундах)
+CONFIRMATION_POLL_INTERVAL = 1
+
+# Время ожидания подтверждения перевода (в секундах), после которого пользователь получает сообщение о неизвестном
+# результате перевода
+CONFIRMATION_TIMEOUT = 180
+
+# Интервал фонового обновления последнего блокхэша Solana и высоты блока (в секундах). Блокхэш действителен около
+# 150 блоков (примерно минуту), поэтому перевод, подписанный закэшированным блокхэшем, успевает попасть в блок
+SOLANA_BLOCKHASH_REFRESH_INTERVAL = 5
+
+# Возраст закэшированного блокхэша (в секундах), после которого перевод запрашивает новый блокхэш сам - например, если
+# фоновое обновление не запущено или узлы недоступны
+SOLANA_BLOCKHASH_MAX_AGE = 20
+
+# Максимальный размер сериализованной транзакции Solana в байтах (размер пакета IPv6 за вычетом заголовков)
+SOLANA_PACKET_DATA_SIZE = 1232
+
+# Время, в течение которого помнятся подписи подписанных переводов Solana (в секундах). Одинаковые переводы, подписанные
+# одним блокхэшем, получают одинаковую подпись, поэтому повторная подпись переводится на более новый блокхэш.
+# Блокхэш не выдается для новых переводов дольше времени своей действительности
+SOLANA_RECENT_SIGNATURES_TTL = 90
+
+# Максимальное количество запоминаемых подписей переводов Solana
+SOLANA_RECENT_SIGNATURES_MAX_ENTRIES = 10000
+
+# Среднее время слота Solana (в секундах): пауза перед повторным запросом блокхэша, если узел вернул прежний
+SOLANA_SLOT_TIME = 0.4
+
+# Количество попыток получить блокхэш новее заданного
+SOLANA_FRESH_BLOCKHASH_ATTEMPTS = 10
+
 
 class Settings(BaseSettings):
     """
@@ -1,18 +1,52 @@
 import time
 import traceback
-from typing import Tuple, Dict, List, Optional, Any
+from typing import Awaitable, Callable, Tuple, Dict, List, NamedTuple, Optional, Any
 
 import asyncio
 from web3 import Web3, AsyncWeb3
-# from web3.exceptions import TransactionNotFound
+from web3.exceptions import TransactionNotFound
 from eth_account import Account
 
-from config_data.config import (BINANCE_NODE_URL, WEI_TO_BNB_RATIO, PRIVATE_KEY_HEX_LENGTH,
-                                PRIVATE_KEY_BINARY_LENGTH, timeout_settings)
+from config_data.config import (BINANCE_NODE_URLS, WEI_TO_BNB_RATIO, PRIVATE_KEY_HEX_LENGTH,
+                                PRIVATE_KEY_BINARY_LENGTH, BSC_BATCH_SIZE, BSC_MAX_CONCURRENT_REQUESTS, BSC_BLOCK_BATCH_SIZE,
+                                timeout_settings)
+from external_services.binance_smart_chain.gas_oracle import GasOracle
+from external_services.binance_smart_chain.nonce_manager import NonceManager
+from external_services.cache import balance_cache, transaction_history_cache
+from external_services.json_rpc import build_json_rpc_request, call_with_batch_fallback, send_json_rpc_batch
+from external_services.rpc_router import RpcNode, RpcRouter, is_connection_error
+from external_services.single_flight import rpc_single_flight
+from external_services.transport import rpc_transport
 from logger_config import logger
+from utils.batching import chunked
+from utils.crypto_executor import crypto_executor
+from utils.key_derivation import generate_bsc_wallet
 
 w3 = AsyncWeb3()
-bsc_client = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(BINANCE_NODE_URL))
+
+
+async def probe_bsc_node(client: AsyncWeb3) -> bool:
+    # Узел считается исправным, если отвечает номером последнего блока
+    return await client.eth.block_number > 0
+
+
+# Маршрутизатор запросов между узлами BSC. Провайдеры получают общую сессию aiohttp с пулом keep-alive соединений
+# при запуске бота.
+bsc_router = RpcRouter(
+    "BSC",
+    [RpcNode(url, AsyncWeb3(rpc_transport.attach_web3_provider(AsyncWeb3.AsyncHTTPProvider(url))))
+     for url in BINANCE_NODE_URLS],
+    probe_bsc_node,
+)
+
+# Клиент основного узла сети
+bsc_client = bsc_router.primary_client
+
+# Локальное распределение nonce переводов по отправителям
+bsc_nonce_manager = NonceManager(bsc_router)
+
+# Закэшированные цена газа и лимиты газа переводов
+bsc_gas_oracle = GasOracle(bsc_router)
 
 
 async def create_bsc_wallet() -> Tuple[str, str, str]:
@@ -27,22 +61,11 @@ async def create_bsc_wallet() -> Tuple[str, str, str]:
     """
     try:
         bsc_derivation_path = "m/44'/60'/0'/0/0"
-        # The use of the Mnemonic features of Account is disabled by default until its API stabilizes.
-        # To use these features, please enable them by running `Account.enable_unaudited_hdwallet_features()` and try again.
-        Account.enable_unaudited_hdwallet_features()
-        #TODO: BNB 24-word mnemonic and derivation path: https://docs.bnbchain.org/docs/learn/genesis/
-        # we use 12-word
-        acct, mnemonic = Account.create_with_mnemonic(
-            passphrase='',
-            num_words=12,
-            language='english',
-            account_path=bsc_derivation_path,
-        )
+        # Генерация мнемонической фразы и вывод ключа выполняются в пуле, чтобы не блокировать цикл событий
+        wallet_address, private_key, mnemonic = await crypto_executor.run(generate_bsc_wallet, bsc_derivation_path)
 
         print(f'new mnemonic: {mnemonic}')
-        private_key = w3.to_hex(acct.key)
         print(f'new private_key: {private_key}')
-        wallet_address = acct.address
         print(f'new address: {wallet_address}')
         print('**********')
 
@@ -76,13 +99,13 @@ def is_valid_bsc_wallet_address(address: str) -> bool:
         return False
 
 
-async def get_bnb_balance(wallet_addresses, client):
+async def get_bnb_balance(wallet_addresses, client=None):
     """
         Asynchronously retrieves the BNB balance for the specified wallet addresses.
 
         Args:
             wallet_addresses (Union[str, List[str]]): The wallet address or a list of wallet addresses.
-            client: The BSC client.
+            client: The BSC client. Defaults to the fastest healthy node of bsc_router.
 
         Returns:
             Union[float, List[float]]: The BNB balance or a list of BNB balances corresponding to the wallet addresses.
@@ -90,7 +113,12 @@ async def get_bnb_balance(wallet_addresses, client):
     try:
         # Если передан одиночный адрес кошелька
         if isinstance(wallet_addresses, str):
-            balance = await client.eth.get_balance(w3.to_checksum_address(wallet_addresses))
+            checksum_address = w3.to_checksum_address(wallet_addresses)
+            # Одновременные запросы баланса одного адреса объединяются в один запрос к узлу
+            balance = await rpc_single_flight.do(
+                ("eth_getBalance", checksum_address),
+                lambda: bsc_router.call(lambda node_client: node_client.eth.get_balance(checksum_address), client),
+            )
             # Преобразование wei в BNB
             bnb_balance = balance / WEI_TO_BNB_RATIO
             logger.debug(
@@ -99,13 +127,14 @@ async def get_bnb_balance(wallet_addresses, client):
             return bnb_balance
         # Если передан список адресов кошельков
         elif isinstance(wallet_addresses, list):
-            bnb_balances = []
-            for address in wallet_addresses:
-                balance = await client.eth.get_balance(w3.to_checksum_address(address))
-                # Преобразование wei в BNB
-                bnb_balance = balance / WEI_TO_BNB_RATIO
-                bnb_balances.append(bnb_balance)
-            return bnb_balances
+            # Балансы всех адресов запрашиваются пакетными JSON-RPC запросами.
+            # Результат общий для объединенных запросов, поэтому каждому вызывающему возвращаем копию списка.
+            return list(await rpc_single_flight.do(
+                ("eth_getBalance", tuple(wallet_addresses)),
+                lambda: bsc_router.call(
+                    lambda node_client: get_multiple_bnb_balances(wallet_addresses, node_client), client
+                ),
+            ))
         else:
             raise ValueError(
                 "Invalid type for wallet_addresses. Expected str or list[str]."
@@ -118,6 +147,366 @@ async def get_bnb_balance(wallet_addresses, client):
             f"Failed to get BNB balance: {error}\n{detailed_error_traceback}")
 
 
+async def get_multiple_bnb_balances(wallet_addresses: List[str], client: AsyncWeb3) -> List[float]:
+    """
+        Asynchronously retrieves the BNB balances for a list of wallet addresses.
+
+        All eth_getBalance calls are packed into JSON-RPC batch requests of BSC_BATCH_SIZE calls each, and at most
+        BSC_MAX_CONCURRENT_REQUESTS batches are in flight at once. If the node rejects batch requests, the balances
+        are requested one by one with the same concurrency limit.
+
+        Args:
+            wallet_addresses (List[str]): The list of wallet addresses.
+            client (AsyncWeb3): The BSC client.
+
+        Returns:
+            List[float]: The BNB balances in the same order as the input wallet addresses.
+    """
+    if not wallet_addresses:
+        return []
+
+    checksum_addresses = [w3.to_checksum_address(address) for address in wallet_addresses]
+    semaphore = asyncio.Semaphore(BSC_MAX_CONCURRENT_REQUESTS)
+
+    wei_balances = await call_with_batch_fallback(
+        client.provider.endpoint_uri,
+        lambda: get_wei_balances_batched(checksum_addresses, client, semaphore),
+        lambda: get_wei_balances_concurrently(checksum_addresses, client, semaphore),
+    )
+
+    # Преобразование wei в BNB
+    return [balance / WEI_TO_BNB_RATIO for balance in wei_balances]
+
+
+async def get_wei_balances_batched(checksum_addresses: List[str], client: AsyncWeb3,
+                                   semaphore: asyncio.Semaphore) -> List[int]:
+    """
+        Retrieves wei balances with JSON-RPC batch requests of eth_getBalance calls.
+
+        If the node answers some calls of a batch with an error, the balances of that batch are requested again
+        with single requests.
+
+        Args:
+            checksum_addresses (List[str]): The list of checksum wallet addresses.
+            client (AsyncWeb3): The BSC client, its provider URL is used for the batch requests.
+            semaphore (asyncio.Semaphore): The semaphore limiting the number of concurrent batch requests.
+
+        Returns:
+            List[int]: The wei balances in the same order as the input addresses.
+
+        Raises:
+            JsonRpcBatchError: If the node rejects batch requests.
+    """
+    node_url = client.provider.endpoint_uri
+
+    async def fetch_chunk(chunk: List[str]) -> List[int]:
+        requests = [build_json_rpc_request(i, "eth_getBalance", [address, "latest"]) for i, address in enumerate(chunk)]
+        async with semaphore:
+            responses = await send_json_rpc_batch(node_url, requests)
+        errors = [response["error"] for response in responses if "error" in response]
+        if errors:
+            logger.warning(f"eth_getBalance failed in batch, retrying with single requests: {errors[0]}")
+            return await get_wei_balances_concurrently(chunk, client, semaphore)
+        # Значения баланса приходят в виде hex-строк
+        return [int(response["result"], 16) for response in responses]
+
+    chunk_results = await asyncio.gather(*[fetch_chunk(chunk) for chunk in chunked(checksum_addresses, BSC_BATCH_SIZE)])
+    return [balance for chunk_result in chunk_results for balance in chunk_result]
+
+
+async def get_wei_balances_concurrently(checksum_addresses: List[str], client: AsyncWeb3,
+                                        semaphore: asyncio.Semaphore) -> List[int]:
+    """
+        Retrieves wei balances with single eth_getBalance requests executed concurrently.
+
+        Args:
+            checksum_addresses (List[str]): The list of checksum wallet addresses.
+            client (AsyncWeb3): The BSC client.
+            semaphore (asyncio.Semaphore): The semaphore limiting the number of concurrent requests.
+
+        Returns:
+            List[int]: The wei balances in the same order as the input addresses.
+    """
+    async def fetch_balance(address: str) -> int:
+        async with semaphore:
+            return await client.eth.get_balance(address)
+
+    return list(await asyncio.gather(*[fetch_balance(address) for address in checksum_addresses]))
+
+
+async def get_transaction_counts(wallet_addresses: List[str], client: Optional[AsyncWeb3] = None) -> List[int]:
+    """
+        Retrieves the number of transactions sent from each wallet (the account nonce).
+
+        The eth_getTransactionCount calls are packed into JSON-RPC batch requests of BSC_BATCH_SIZE calls, at most
+        BSC_MAX_CONCURRENT_REQUESTS requests are in flight at once. If the node rejects batch requests, the counts
+        are requested one by one with the same concurrency limit.
+
+        Args:
+            wallet_addresses (List[str]): The wallet addresses.
+            client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of bsc_router.
+
+        Returns:
+            List[int]: The transaction counts in the same order as the addresses.
+    """
+    if not wallet_addresses:
+        return []
+
+    checksum_addresses = [w3.to_checksum_address(address) for address in wallet_addresses]
+    semaphore = asyncio.Semaphore(BSC_MAX_CONCURRENT_REQUESTS)
+
+    async def fetch_batched(node_client: AsyncWeb3) -> List[int]:
+        node_url = node_client.provider.endpoint_uri
+
+        async def fetch_chunk(chunk: List[str]) -> List[int]:
+            requests = [build_json_rpc_request(i, "eth_getTransactionCount", [address, "latest"])
+                        for i, address in enumerate(chunk)]
+            async with semaphore:
+                responses = await send_json_rpc_batch(node_url, requests)
+            errors = [response["error"] for response in responses if "error" in response]
+            if errors:
+                raise Exception(f"eth_getTransactionCount failed in batch: {errors[0]}")
+            return [int(response["result"], 16) for response in responses]
+
+        chunk_results = await asyncio.gather(*[
+            fetch_chunk(chunk) for chunk in chunked(checksum_addresses, BSC_BATCH_SIZE)
+        ])
+        return [count for chunk_result in chunk_results for count in chunk_result]
+
+    async def fetch_concurrently(node_client: AsyncWeb3) -> List[int]:
+        async def fetch_count(address: str) -> int:
+            async with semaphore:
+                return await node_client.eth.get_transaction_count(address)
+
+        return list(await asyncio.gather(*[fetch_count(address) for address in checksum_addresses]))
+
+    return await bsc_router.call(
+        lambda node_client: call_with_batch_fallback(node_client.provider.endpoint_uri,
+                                                     lambda: fetch_batched(node_client),
+                                                     lambda: fetch_concurrently(node_client)),
+        client,
+    )
+
+
+async def get_receipt_statuses(transaction_hashes: List[str], client: Optional[AsyncWeb3] = None
+                               ) -> List[Optional[bool]]:
+    """
+        Retrieves the execution statuses of transactions from their receipts.
+
+        The eth_getTransactionReceipt calls are packed into JSON-RPC batch requests of BSC_BATCH_SIZE calls, at most
+        BSC_MAX_CONCURRENT_REQUESTS requests are in flight at once. If the node rejects batch requests, the receipts
+        are requested one by one with the same concurrency limit.
+
+        Args:
+            transaction_hashes (List[str]): The transaction hashes.
+            client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of bsc_router.
+
+        Returns:
+            List[Optional[bool]]: In the same order as the hashes: True for executed transactions, False for
+                reverted ones and None for transactions that are not in a block yet.
+    """
+    if not transaction_hashes:
+        return []
+
+    semaphore = asyncio.Semaphore(BSC_MAX_CONCURRENT_REQUESTS)
+
+    async def fetch_batched(node_client: AsyncWeb3) -> List[Optional[bool]]:
+        node_url = node_client.provider.endpoint_uri
+
+        async def fetch_chunk(chunk: List[str]) -> List[Optional[bool]]:
+            requests = [build_json_rpc_request(i, "eth_getTransactionReceipt", [transaction_hash])
+                        for i, transaction_hash in enumerate(chunk)]
+            async with semaphore:
+                responses = await send_json_rpc_batch(node_url, requests)
+            errors = [response["error"] for response in responses if "error" in response]
+            if errors:
+                raise Exception(f"eth_getTransactionReceipt failed in batch: {errors[0]}")
+            # Квитанция отсутствует (null), пока транзакция не включена в блок
+            return [None if response["result"] is None else int(response["result"]["status"], 16) == 1
+                    for response in responses]
+
+        chunk_results = await asyncio.gather(*[
+            fetch_chunk(chunk) for chunk in chunked(transaction_hashes, BSC_BATCH_SIZE)
+        ])
+        return [status for chunk_result in chunk_results for status in chunk_result]
+
+    async def fetch_concurrently(node_client: AsyncWeb3) -> List[Optional[bool]]:
+        async def fetch_receipt(transaction_hash: str) -> Optional[bool]:
+            async with semaphore:
+                try:
+                    receipt = await node_client.eth.get_transaction_receipt(transaction_hash)
+                except TransactionNotFound:
+                    return None
+            return receipt['status'] == 1
+
+        return list(await asyncio.gather(*[fetch_receipt(transaction_hash) for transaction_hash in transaction_hashes]))
+
+    return await bsc_router.call(
+        lambda node_client: call_with_batch_fallback(node_client.provider.endpoint_uri,
+                                                     lambda: fetch_batched(node_client),
+                                                     lambda: fetch_concurrently(node_client)),
+        client,
+    )
+
+
+async def get_known_transactions(transaction_hashes: List[str], client: Optional[AsyncWeb3] = None) -> List[bool]:
+    """
+        Checks which transactions the node knows, whether they are in a block or still in its mempool.
+
+        The eth_getTransactionByHash calls are packed into JSON-RPC batch requests of BSC_BATCH_SIZE calls, at most
+        BSC_MAX_CONCURRENT_REQUESTS requests are in flight at once. If the node rejects batch requests, the
+        transactions are requested one by one with the same concurrency limit.
+
+        Args:
+            transaction_hashes (List[str]): The transaction hashes.
+            client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of bsc_router.
+
+        Returns:
+            List[bool]: In the same order as the hashes: True for transactions the node knows.
+    """
+    if not transaction_hashes:
+        return []
+
+    semaphore = asyncio.Semaphore(BSC_MAX_CONCURRENT_REQUESTS)
+
+    async def fetch_batched(node_client: AsyncWeb3) -> List[bool]:
+        node_url = node_client.provider.endpoint_uri
+
+        async def fetch_chunk(chunk: List[str]) -> List[bool]:
+            requests = [build_json_rpc_request(i, "eth_getTransactionByHash", [transaction_hash])
+                        for i, transaction_hash in enumerate(chunk)]
+            async with semaphore:
+                responses = await send_json_rpc_batch(node_url, requests)
+            errors = [response["error"] for response in responses if "error" in response]
+            if errors:
+                raise Exception(f"eth_getTransactionByHash failed in batch: {errors[0]}")
+            # Неизвестная узлу транзакция (выброшенная из мемпула или не дошедшая до него) возвращается как null
+            return [response["result"] is not None for response in responses]
+
+        chunk_results = await asyncio.gather(*[
+            fetch_chunk(chunk) for chunk in chunked(transaction_hashes, BSC_BATCH_SIZE)
+        ])
+        return [known for chunk_result in chunk_results for known in chunk_result]
+
+    async def fetch_concurrently(node_client: AsyncWeb3) -> List[bool]:
+        async def fetch_transaction(transaction_hash: str) -> bool:
+            async with semaphore:
+                try:
+                    await node_client.eth.get_transaction(transaction_hash)
+                except TransactionNotFound:
+                    return False
+            return True
+
+        return list(await asyncio.gather(*[fetch_transaction(transaction_hash)
+                                           for transaction_hash in transaction_hashes]))
+
+    return await bsc_router.call(
+        lambda node_client: call_with_batch_fallback(node_client.provider.endpoint_uri,
+                                                     lambda: fetch_batched(node_client),
+                                                     lambda: fetch_concurrently(node_client)),
+        client,
+    )
+
+
+async def get_block_number(client: Optional[AsyncWeb3] = None) -> int:
+    """
+        Retrieves the number of the latest BSC block.
+
+        Args:
+            client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of bsc_router.
+
+        Returns:
+            int: The latest block number.
+    """
+    return await bsc_router.call(lambda node_client: node_client.eth.block_number, client)
+
+
+async def get_full_blocks(block_numbers: List[int], client: AsyncWeb3) -> List[Optional[Dict[str, Any]]]:
+    """
+        Retrieves blocks with their full transaction objects.
+
+        The eth_getBlockByNumber calls are packed into JSON-RPC batch requests of BSC_BLOCK_BATCH_SIZE calls, at
+        most BSC_MAX_CONCURRENT_REQUESTS requests are in flight at once. The raw JSON-RPC results are returned
+        without web3 formatting: numbers stay hex strings, which is cheaper for scanning thousands of transactions.
+
+        Args:
+            block_numbers (List[int]): The block numbers.
+            client (AsyncWeb3): The BSC client, its provider URL is used for the batch requests.
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: The blocks in the same order as the block numbers, None for blocks the
+                node does not know yet.
+    """
+    semaphore = asyncio.Semaphore(BSC_MAX_CONCURRENT_REQUESTS)
+
+    return await call_with_batch_fallback(
+        client.provider.endpoint_uri,
+        lambda: get_full_blocks_batched(block_numbers, client, semaphore),
+        lambda: get_full_blocks_concurrently(block_numbers, client, semaphore),
+    )
+
+
+async def get_full_blocks_batched(block_numbers: List[int], client: AsyncWeb3, semaphore: asyncio.Semaphore
+                                  ) -> List[Optional[Dict[str, Any]]]:
+    """
+        Retrieves full blocks with JSON-RPC batch requests of eth_getBlockByNumber calls.
+
+        Args:
+            block_numbers (List[int]): The block numbers.
+            client (AsyncWeb3): The BSC client, its provider URL is used for the batch requests.
+            semaphore (asyncio.Semaphore): The semaphore limiting the number of concurrent batch requests.
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: The blocks in the same order as the block numbers.
+
+        Raises:
+            JsonRpcBatchError: If the node rejects batch requests.
+            Exception: If the node answers a call with an error.
+    """
+    node_url = client.provider.endpoint_uri
+
+    async def fetch_chunk(chunk: List[int]) -> List[Optional[Dict[str, Any]]]:
+        requests = [build_json_rpc_request(i, "eth_getBlockByNumber", [hex(block_number), True])
+                    for i, block_number in enumerate(chunk)]
+        async with semaphore:
+            responses = await send_json_rpc_batch(node_url, requests)
+        errors = [response["error"] for response in responses if "error" in response]
+        if errors:
+            raise Exception(f"eth_getBlockByNumber failed in batch: {errors[0]}")
+        return [response["result"] for response in responses]
+
+    chunk_results = await asyncio.gather(*[fetch_chunk(chunk) for chunk in chunked(block_numbers, BSC_BLOCK_BATCH_SIZE)])
+    return [block for chunk_result in chunk_results for block in chunk_result]
+
+
+async def get_full_blocks_concurrently(block_numbers: List[int], client: AsyncWeb3, semaphore: asyncio.Semaphore
+                                       ) -> List[Optional[Dict[str, Any]]]:
+    """
+        Retrieves full blocks with single eth_getBlockByNumber requests executed concurrently.
+
+        Args:
+            block_numbers (List[int]): The block numbers.
+            client (AsyncWeb3): The BSC client.
+            semaphore (asyncio.Semaphore): The semaphore limiting the number of concurrent requests.
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: The blocks in the same order as the block numbers.
+    """
+    async def fetch_block(block_number: int) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            # Запрос через провайдер возвращает необработанный JSON-RPC ответ, как и пакетный запрос
+            response = await client.provider.make_request("eth_getBlockByNumber", [hex(block_number), True])
+        if "error" in response:
+            raise Exception(f"eth_getBlockByNumber failed: {response['error']}")
+        return response["result"]
+
+    return list(await asyncio.gather(*[fetch_block(block_number) for block_number in block_numbers]))
+
+
+# Кэш балансов запрашивает балансы кошельков BSC пакетными запросами
+balance_cache.register_fetcher('bsc', get_bnb_balance)
+
+
 def is_valid_bsc_private_key(private_key: str) -> bool:
     """
         Checks whether the input string is a valid BSC private key.
@@ -185,23 +574,37 @@ def is_valid_amount(amount: str | int | float) -> bool:
         return False
 
 
-async def bsc_transfer_token(sender_address: str, sender_private_key: str, recipient_address: str, amount: float,
-                             client: AsyncWeb3) -> bool:
+class SignedBscTransfer(NamedTuple):
     """
-        Asynchronous function to transfer tokens between wallets.
+        Signed BSC transfer transaction that has not been sent yet.
+    """
+    transaction_id: str
+    # Транзакция в формате для отправки узлу, в шестнадцатеричном виде
+    raw_transaction: str
+    nonce: int
+
+
+async def bsc_sign_transfer(sender_address: str, sender_private_key: str, recipient_address: str, amount: float,
+                            client: Optional[AsyncWeb3] = None) -> SignedBscTransfer:
+    """
+        Builds and signs a transfer transaction.
+
+        The nonce is allocated by bsc_nonce_manager and the gas price and gas limit come from bsc_gas_oracle, so
+        concurrent transfers from one wallet get different nonces and signing usually makes no RPC call. The hash of
+        the transaction is known before it is sent, so the transfer can be recorded first and sent afterwards.
 
         Args:
             sender_address (str): Sender's address.
             sender_private_key (str): Sender's private key.
             recipient_address (str): Recipient's address.
             amount (float): Amount of tokens to transfer.
-            client (AsyncClient): Asynchronous client for sending the transaction.
+            client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of bsc_router.
 
         Raises:
             ValueError: If any of the provided addresses is invalid or the private key is invalid.
 
         Returns:
-            bool: True if the transfer is successful, False otherwise.
+            SignedBscTransfer: The signed transaction.
     """
     # Проверяем, является ли адрес отправителя действительным
     if not is_valid_bsc_wallet_address(sender_address):
@@ -222,10 +625,13 @@ async def bsc_transfer_token(sender_address: str, sender_private_key: str, recip
 
     wei_amount = AsyncWeb3.to_wei(amount, 'ether')
     print('******** wei_amount:', wei_amount)
-    nonce = await client.eth.get_transaction_count(sender_address)
-    print('****** nonce: ', nonce)
-    gas_price = await client.eth.gas_price
-    print('**** gas_price:', gas_price)
+    # Цена газа обычно берется из кэша, лимит газа - из кэша оценок по получателю
+    gas_price, gas = await asyncio.gather(
+        bsc_gas_oracle.gas_price(client),
+        bsc_gas_oracle.transfer_gas(sender_address, recipient_address, wei_amount, client),
+    )
+    # nonce выделяется последним: ошибка при получении цены или лимита газа не оставляет пропуска в nonce
+    nonce = await bsc_nonce_manager.allocate(sender_address, client)
 
     # 1. Build a new tx
     transaction = {
@@ -233,38 +639,85 @@ async def bsc_transfer_token(sender_address: str, sender_private_key: str, recip
         'to': recipient_address,
         'value': wei_amount,
         'nonce': nonce,
-        'gas': 2000000,
+        'gas': gas,
         'gasPrice': gas_price,
         # 'maxFeePerGas': 2000000000,
         # 'maxPriorityFeePerGas': 1000000000,
     }
 
     # Подписываем транзакцию с приватным ключом
-    signed_txn = client.eth.account.sign_transaction(transaction, sender_private_key)
+    try:
+        signed_txn = w3.eth.account.sign_transaction(transaction, sender_private_key)
+    except Exception:
+        bsc_nonce_manager.resync(sender_address)
+        raise
     print('******* signed_txn:', signed_txn)
 
-    # Отправка транзакции
-    txn_hash = await client.eth.send_raw_transaction(signed_txn.rawTransaction)
+    return SignedBscTransfer(
+        transaction_id=Web3.to_hex(signed_txn.hash),
+        raw_transaction=Web3.to_hex(signed_txn.rawTransaction),
+        nonce=nonce,
+    )
+
+
+async def bsc_send_raw_transaction(raw_transaction: str, client: Optional[AsyncWeb3] = None) -> str:
+    """
+        Sends a signed transaction.
+
+        Sending the same signed transaction again is safe: it has the same hash and nonce and is executed at most once.
+
+        Args:
+            raw_transaction (str): The hex of the signed transaction.
+            client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of bsc_router.
+
+        Returns:
+            str: The transaction hash.
+    """
+    async def send(node_client: AsyncWeb3):
+        return await node_client.eth.send_raw_transaction(raw_transaction)
+
+    # Отправка транзакции. На другой узел переключаемся, только если соединение не было установлено.
+    txn_hash = await bsc_router.call(send, client, failover_on=is_connection_error, timeout=None)
     print('***** txn_hash.hex(): ', txn_hash.hex())
-    txn_receipt = None
+    return Web3.to_hex(txn_hash)
 
-    try:
-        txn_receipt = await client.eth.wait_for_transaction_receipt(txn_hash)
-        # for i in range(10):
-        #     try:
-        #         await asyncio.sleep(i)
-        #         txn_receipt = await client.eth.get_transaction_receipt(txn_hash)
-        #         break
-        #     except TransactionNotFound:
-        #         print('******* TransactionNotFound i:', i)
-    except Exception as e:
-        detailed_error_traceback = traceback.format_exc()
-        logger.error(f"BSC, Failed to get transaction receipt: {e}\n{detailed_error_traceback}")
-        # Вызываем новое исключения с подробной информацией
-        raise Exception(f"BSC, Failed to get transaction receipt: {e}")
 
-    print('******** txn_receipt: ', txn_receipt)
-    if txn_receipt and hasattr(txn_receipt, 'status'):
-        if txn_receipt['status'] == 1:
-            return True
-    return False
+async def bsc_transfer_token(sender_address: str, sender_private_key: str, recipient_address: str, amount: float,
+                             client: Optional[AsyncWeb3] = None,
+                             on_signed: Optional[Callable[[SignedBscTransfer], Awaitable[None]]] = None) -> str:
+    """
+        Asynchronous function to transfer tokens between wallets.
+
+        Returns as soon as a node accepts the transaction. The receipt is awaited by
+        services.confirmation_tracker, which polls the receipts of all pending transfers together.
+
+        Args:
+            sender_address (str): Sender's address.
+            sender_private_key (str): Sender's private key.
+            recipient_address (str): Recipient's address.
+            amount (float): Amount of tokens to transfer.
+            client (Optional[AsyncWeb3]): Asynchronous client for sending the transaction.
+                Defaults to the fastest healthy node of bsc_router.
+            on_signed (Optional[Callable[[SignedBscTransfer], Awaitable[None]]]): Called with the signed transaction
+                before it is sent, for example to record it in the transfer outbox.
+
+        Raises:
+            ValueError: If any of the provided addresses is invalid or the private key is invalid.
+
+        Returns:
+            str: The hash of the submitted transaction.
+    """
+    signed_transfer = await bsc_sign_transfer(sender_address, sender_private_key, recipient_address, amount, client)
+    try:
+        if on_signed is not None:
+            await on_signed(signed_transfer)
+        transaction_id = await bsc_send_raw_transaction(signed_transfer.raw_transaction, client)
+    except Exception:
+        # nonce мог остаться неиспользованным (в том числе если перевод не удалось записать до отправки)
+        # или уже быть занят - следующий перевод получит его от узла
+        bsc_nonce_manager.resync(sender_address)
+        raise
+    # История и балансы обоих кошельков изменились - сбрасываем их закэшированные значения
+    transaction_history_cache.invalidate(sender_address, recipient_address)
+    balance_cache.invalidate('bsc', sender_address, recipient_address)
+    return transaction_id
@@ -0,0 +1,124 @@
+# solana-webwallet/external_services/binance_smart_chain/gas_oracle.py
+
+import asyncio
+import statistics
+from typing import Optional
+
+from web3 import AsyncWeb3
+
+from config_data.config import (BSC_GAS_PRICE_TTL, BSC_FEE_HISTORY_BLOCKS, BSC_FEE_HISTORY_PERCENTILE, BSC_TRANSFER_GAS,
+                                BSC_GAS_LIMIT_MARGIN, BSC_GAS_ESTIMATE_TTL, BSC_GAS_ESTIMATE_MAX_ENTRIES)
+from external_services.rpc_router import RpcRouter
+from external_services.single_flight import rpc_single_flight
+from logger_config import logger
+from utils.cache import TTLLRUCache
+
+
+class GasOracle:
+    """
+        Caches the gas price and the gas limits of BSC transfers.
+
+        The gas price is the larger of eth_gasPrice and the next block's base fee plus the median priority fee of the
+        recent blocks from eth_feeHistory. Both are fetched concurrently at most once per gas_price_ttl seconds and
+        shared by all transfers. Whether the recipient has contract code is checked with eth_getCode once per
+        recipient: an address without code always needs BSC_TRANSFER_GAS and is never estimated, a contract gets the
+        eth_estimateGas estimate with a margin, cached per sender, recipient and amount.
+
+        Attributes:
+            router (RpcRouter): The router of the BSC nodes.
+            gas_price_ttl (float): The time in seconds the gas price is cached for.
+    """
+
+    def __init__(self, router: RpcRouter, gas_price_ttl: float = BSC_GAS_PRICE_TTL) -> None:
+        """
+            Initializes the oracle.
+
+            Args:
+                router (RpcRouter): The router of the BSC nodes.
+                gas_price_ttl (float): The time in seconds the gas price is cached for. Defaults to BSC_GAS_PRICE_TTL.
+        """
+        self.router = router
+        self.gas_price_ttl = gas_price_ttl
+        self._gas_prices = TTLLRUCache(max_entries=1, ttl=gas_price_ttl)
+        # Наличие кода контракта по адресу получателя
+        self._recipient_has_code = TTLLRUCache(max_entries=BSC_GAS_ESTIMATE_MAX_ENTRIES, ttl=BSC_GAS_ESTIMATE_TTL)
+        # Лимит газа перевода на контракт по отправителю, получателю и сумме: оценка зависит от всех трех
+        self._gas_limits = TTLLRUCache(max_entries=BSC_GAS_ESTIMATE_MAX_ENTRIES, ttl=BSC_GAS_ESTIMATE_TTL)
+
+    async def gas_price(self, client: Optional[AsyncWeb3] = None) -> int:
+        """
+            Returns the gas price for a new transaction.
+
+            Args:
+                client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of the router.
+
+            Returns:
+                int: The gas price in wei.
+        """
+        gas_price = self._gas_prices.get('gas_price')
+        if gas_price is None:
+            # Одновременные переводы после истечения TTL получают цену из одного запроса к узлу
+            gas_price = await rpc_single_flight.do(
+                ('eth_gasPrice', 'eth_feeHistory'), lambda: self.router.call(self._fetch_gas_price, client)
+            )
+            self._gas_prices.set('gas_price', gas_price)
+        return gas_price
+
+    async def _fetch_gas_price(self, client: AsyncWeb3) -> int:
+        gas_price, fee_history = await asyncio.gather(
+            client.eth.gas_price,
+            client.eth.fee_history(BSC_FEE_HISTORY_BLOCKS, 'latest', [BSC_FEE_HISTORY_PERCENTILE]),
+            return_exceptions=True,
+        )
+        if isinstance(gas_price, BaseException):
+            raise gas_price
+        if isinstance(fee_history, BaseException):
+            # Узел без eth_feeHistory - достаточно цены из eth_gasPrice
+            logger.debug(f"eth_feeHistory failed, using eth_gasPrice only: {fee_history}")
+            return gas_price
+
+        # Последний элемент baseFeePerGas - базовая комиссия следующего блока
+        base_fee = fee_history['baseFeePerGas'][-1]
+        rewards = [reward[0] for reward in fee_history.get('reward') or [] if reward]
+        priority_fee = int(statistics.median(rewards)) if rewards else 0
+        return max(gas_price, base_fee + priority_fee)
+
+    async def transfer_gas(self, sender_address: str, recipient_address: str, wei_amount: int,
+                           client: Optional[AsyncWeb3] = None) -> int:
+        """
+            Returns the gas limit of a plain value transfer to the recipient.
+
+            Args:
+                sender_address (str): Sender's address.
+                recipient_address (str): Recipient's address.
+                wei_amount (int): Amount of the transfer in wei.
+                client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of the router.
+
+            Returns:
+                int: The gas limit.
+        """
+        recipient = AsyncWeb3.to_checksum_address(recipient_address)
+        has_code = self._recipient_has_code.get(recipient)
+        if has_code is None:
+            code = await rpc_single_flight.do(
+                ('eth_getCode', recipient),
+                lambda: self.router.call(lambda node_client: node_client.eth.get_code(recipient), client),
+            )
+            has_code = len(code) > 0
+            self._recipient_has_code.set(recipient, has_code)
+        if not has_code:
+            # Перевод на адрес без кода всегда стоит фиксированное количество газа
+            return BSC_TRANSFER_GAS
+
+        key = (AsyncWeb3.to_checksum_address(sender_address), recipient, wei_amount)
+        gas = self._gas_limits.get(key)
+        if gas is None:
+            transaction = {'from': key[0], 'to': recipient, 'value': wei_amount}
+            estimate = await rpc_single_flight.do(
+                ('eth_estimateGas',) + key,
+                lambda: self.router.call(lambda node_client: node_client.eth.estimate_gas(transaction), client),
+            )
+            # Оценка для контракта зависит от его состояния - оставляем запас
+            gas = max(BSC_TRANSFER_GAS, int(estimate * BSC_GAS_LIMIT_MARGIN))
+            self._gas_limits.set(key, gas)
+        return gas
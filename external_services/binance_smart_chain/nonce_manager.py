@@ -0,0 +1,68 @@
+# solana-webwallet/external_services/binance_smart_chain/nonce_manager.py
+
+import asyncio
+from collections import defaultdict
+from typing import Dict, Optional
+
+from web3 import AsyncWeb3
+
+from external_services.rpc_router import RpcRouter
+from logger_config import logger
+
+
+class NonceManager:
+    """
+        Allocates the nonces of BSC transactions locally, one sender at a time.
+
+        The first transfer of a sender fetches its pending transaction count from the node, later transfers take the
+        next nonce from memory without an RPC call. Allocation is serialized per sender, so concurrent transfers from
+        one wallet always get different consecutive nonces, while transfers from different wallets do not wait for
+        each other. After a failed send the sender is resynced: its next allocation asks the node again.
+
+        Attributes:
+            router (RpcRouter): The router of the BSC nodes.
+    """
+
+    def __init__(self, router: RpcRouter) -> None:
+        """
+            Initializes the manager.
+
+            Args:
+                router (RpcRouter): The router of the BSC nodes.
+        """
+        self.router = router
+        # Следующий свободный nonce по адресу отправителя
+        self._next_nonces: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def allocate(self, sender_address: str, client: Optional[AsyncWeb3] = None) -> int:
+        """
+            Returns the nonce for a new transaction of the sender.
+
+            Args:
+                sender_address (str): Sender's address.
+                client (Optional[AsyncWeb3]): The BSC client. Defaults to the fastest healthy node of the router.
+
+            Returns:
+                int: The nonce.
+        """
+        key = AsyncWeb3.to_checksum_address(sender_address)
+        async with self._locks[key]:
+            nonce = self._next_nonces.get(key)
+            if nonce is None:
+                # Счетчик с учетом транзакций в мемпуле: отправленные, но еще не включенные в блок, тоже заняли nonce
+                nonce = await self.router.call(
+                    lambda node_client: node_client.eth.get_transaction_count(key, 'pending'), client
+                )
+            self._next_nonces[key] = nonce + 1
+            return nonce
+
+    def resync(self, sender_address: str) -> None:
+        """
+            Forgets the local nonce of the sender, so the next allocation fetches it from the node.
+
+            Args:
+                sender_address (str): Sender's address.
+        """
+        if self._next_nonces.pop(AsyncWeb3.to_checksum_address(sender_address), None) is not None:
+            logger.info(f"Nonce of {sender_address} will be resynced with the node")
@@ -0,0 +1,283 @@
+# solana-webwallet/external_services/cache.py
+
+import asyncio
+import sys
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from config_data.config import (BALANCE_CACHE_TTL, BALANCE_CACHE_STALE_TTL, BALANCE_CACHE_MAX_ENTRIES,
+                                TRANSACTION_HISTORY_PAGE_CACHE_DURATION, TRANSACTION_HISTORY_CACHE_MAX_ENTRIES,
+                                TRANSACTION_HISTORY_CACHE_MAX_BYTES)
+from logger_config import logger
+from utils.cache import TTLLRUCache
+
+
+class BalanceCache:
+    """
+        Cache of wallet balances keyed by (blockchain, address) with stale-while-revalidate refresh.
+
+        A balance younger than ttl is fresh and returned as is. A balance older than ttl but younger than stale_ttl
+        is stale: it is returned immediately when the caller accepts stale data, and refreshed in the background.
+        Missing balances, and stale ones when the caller needs fresh data, are fetched in one batched request.
+
+        The balances are fetched by the functions registered per blockchain with register_fetcher, so the cache
+        does not depend on the blockchain modules. A fetch that started before invalidate() or set() of an address
+        returns its result to the caller but does not cache it, so a pre-transfer balance is not stored as fresh.
+
+        Attributes:
+            ttl (float): The time in seconds a balance is fresh.
+            stale_ttl (float): The time in seconds a stale balance may still be served.
+    """
+
+    def __init__(self, ttl: float = BALANCE_CACHE_TTL, stale_ttl: float = BALANCE_CACHE_STALE_TTL,
+                 max_entries: int = BALANCE_CACHE_MAX_ENTRIES) -> None:
+        """
+            Initializes the cache.
+
+            Args:
+                ttl (float): The time in seconds a balance is fresh. Defaults to BALANCE_CACHE_TTL.
+                stale_ttl (float): The time in seconds a stale balance may still be served.
+                    Defaults to BALANCE_CACHE_STALE_TTL.
+                max_entries (int): The maximum number of cached balances. Defaults to BALANCE_CACHE_MAX_ENTRIES.
+        """
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        # Значение записи - (баланс, момент по time.monotonic, до которого баланс актуален)
+        self._cache = TTLLRUCache(max_entries=max_entries, ttl=self.stale_ttl)
+        self._fetchers: Dict[str, Callable[[List[str]], Awaitable[List[float]]]] = {}
+        # Ключи, которые уже обновляются в фоне, и ссылки на фоновые задачи (чтобы их не собрал сборщик мусора)
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        # Счетчик изменений по ключу: баланс, запрос которого начался до инвалидации или записи более нового
+        # значения, не кэшируется
+        self._generations: Dict[Tuple[str, str], int] = {}
+
+    def register_fetcher(self, blockchain: str, fetcher: Callable[[List[str]], Awaitable[List[float]]]) -> None:
+        """
+            Registers the function fetching the balances of a blockchain.
+
+            Args:
+                blockchain (str): The blockchain, for example 'solana' or 'bsc'.
+                fetcher (Callable[[List[str]], Awaitable[List[float]]]): The function returning the balances of the
+                    addresses in the same order.
+        """
+        self._fetchers[blockchain] = fetcher
+
+    def set(self, blockchain: str, wallet_address: str, balance: float, ttl: Optional[float] = None) -> None:
+        """
+            Stores a known up-to-date balance, for example one received from a subscription.
+
+            Args:
+                blockchain (str): The blockchain.
+                wallet_address (str): The wallet address.
+                balance (float): The balance.
+                ttl (Optional[float]): The time in seconds the balance is fresh. Defaults to the cache TTL.
+                    math.inf keeps the balance fresh until it is replaced or invalidated.
+        """
+        key = (blockchain, wallet_address)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._store(key, balance, ttl)
+
+    def _store(self, key: Tuple[str, str], balance: float, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        # Устаревший баланс хранится еще (stale_ttl - ttl) секунд после окончания срока актуальности
+        self._cache.set(key, (balance, time.monotonic() + ttl), ttl=ttl + self.stale_ttl - self.ttl)
+
+    def invalidate(self, blockchain: str, *wallet_addresses: str) -> None:
+        """
+            Removes the cached balances of the wallets, for example after a transfer.
+
+            Args:
+                blockchain (str): The blockchain.
+                *wallet_addresses (str): The wallet addresses whose balances have changed.
+        """
+        for wallet_address in wallet_addresses:
+            key = (blockchain, wallet_address)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._cache.delete(key)
+
+    async def get_balance(self, blockchain: str, wallet_address: str, allow_stale: bool = True) -> float:
+        """
+            Returns the balance of one wallet.
+
+            Args:
+                blockchain (str): The blockchain.
+                wallet_address (str): The wallet address.
+                allow_stale (bool): Whether a stale balance may be returned. Defaults to True.
+
+            Returns:
+                float: The wallet balance.
+        """
+        return (await self.get_balances(blockchain, [wallet_address], allow_stale))[0]
+
+    async def get_balances(self, blockchain: str, wallet_addresses: List[str], allow_stale: bool = True
+                           ) -> List[float]:
+        """
+            Returns the balances of the wallets, fetching only the missing ones.
+
+            Args:
+                blockchain (str): The blockchain.
+                wallet_addresses (List[str]): The wallet addresses.
+                allow_stale (bool): Whether stale balances may be returned while they are refreshed in the
+                    background. Pass False when the balance is used for a decision, for example a transfer
+                    amount check. Defaults to True.
+
+            Returns:
+                List[float]: The balances in the same order as the wallet addresses.
+        """
+        now = time.monotonic()
+        balances: Dict[str, float] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+
+        for wallet_address in dict.fromkeys(wallet_addresses):
+            entry = self._cache.get((blockchain, wallet_address))
+            if entry is not None:
+                balance, fresh_until = entry
+                if now < fresh_until:
+                    balances[wallet_address] = balance
+                    continue
+                if allow_stale:
+                    balances[wallet_address] = balance
+                    stale.append(wallet_address)
+                    continue
+            missing.append(wallet_address)
+
+        if missing:
+            balances.update(await self._fetch(blockchain, missing))
+        if stale:
+            self._refresh_in_background(blockchain, stale)
+
+        return [balances[wallet_address] for wallet_address in wallet_addresses]
+
+    async def _fetch(self, blockchain: str, wallet_addresses: List[str]) -> Dict[str, float]:
+        # Запрашиваем балансы одним пакетным вызовом и сохраняем их в кэш
+        keys = [(blockchain, wallet_address) for wallet_address in wallet_addresses]
+        generations = [self._generations.get(key, 0) for key in keys]
+        fetched_balances = await self._fetchers[blockchain](wallet_addresses)
+        for key, generation, balance in zip(keys, generations, fetched_balances):
+            # Перевод или уведомление подписки во время запроса делают полученный баланс устаревшим
+            if self._generations.get(key, 0) == generation:
+                self._store(key, balance)
+        return dict(zip(wallet_addresses, fetched_balances))
+
+    def _refresh_in_background(self, blockchain: str, wallet_addresses: List[str]) -> None:
+        # Адреса, которые уже обновляются, повторно не запрашиваем
+        keys = [(blockchain, wallet_address) for wallet_address in wallet_addresses
+                if (blockchain, wallet_address) not in self._refreshing]
+        if not keys:
+            return
+        self._refreshing.update(keys)
+
+        async def refresh() -> None:
+            try:
+                await self._fetch(blockchain, [wallet_address for _, wallet_address in keys])
+            except Exception as e:
+                detailed_error_traceback = traceback.format_exc()
+                logger.error(f"Failed to refresh {blockchain} balances: {e}\n{detailed_error_traceback}")
+            finally:
+                self._refreshing.difference_update(keys)
+
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+
+def estimate_history_page_size(page: Any) -> int:
+    """
+        Estimates the memory used by a cached page of transaction history.
+
+        Args:
+            page (Any): The page, an object with the list of model instances in its transactions attribute.
+
+        Returns:
+            int: The approximate size of the page in bytes.
+    """
+    # sys.getsizeof не учитывает вложенные объекты - суммируем размеры полей каждой модели
+    return sys.getsizeof(page) + sum(
+        sys.getsizeof(transaction) + sum(sys.getsizeof(value) for value in vars(transaction).values())
+        for transaction in page.transactions
+    )
+
+
+class TransactionHistoryCache:
+    """
+        Cache of transaction history pages read from the database, tagged with the wallet address.
+
+        A page is keyed by the wallet address and the page key (navigation direction, cursor, page size). Storing
+        new transactions of a wallet, a transfer and an account notification drop every cached page of the wallet.
+        A page read that started before such an invalidation returns its result to the caller but does not cache
+        it, so a page missing a just stored transaction is not kept. Hit and miss rates are reported by stats().
+
+        Attributes:
+            cache (TTLLRUCache): The cache of pages.
+    """
+
+    def __init__(self, ttl: float = TRANSACTION_HISTORY_PAGE_CACHE_DURATION,
+                 max_entries: int = TRANSACTION_HISTORY_CACHE_MAX_ENTRIES,
+                 max_bytes: int = TRANSACTION_HISTORY_CACHE_MAX_BYTES) -> None:
+        """
+            Initializes the cache.
+
+            Args:
+                ttl (float): The default time to live of a page in seconds.
+                    Defaults to TRANSACTION_HISTORY_PAGE_CACHE_DURATION.
+                max_entries (int): The maximum number of cached pages.
+                    Defaults to TRANSACTION_HISTORY_CACHE_MAX_ENTRIES.
+                max_bytes (int): The approximate memory limit in bytes. Defaults to TRANSACTION_HISTORY_CACHE_MAX_BYTES.
+        """
+        self.cache = TTLLRUCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes,
+                                 sizeof=estimate_history_page_size)
+        # Счетчик инвалидаций по адресу кошелька: страница, чтение которой началось до инвалидации, не кэшируется
+        self._generations: Dict[str, int] = {}
+
+    async def get_page(self, wallet_address: str, page_key: Tuple, fetch: Callable[[], Awaitable[Any]],
+                       ttl: Optional[float] = None) -> Any:
+        """
+            Returns the cached page or reads it with fetch and caches it.
+
+            Args:
+                wallet_address (str): The wallet address.
+                page_key (Tuple): The key of the page within the wallet history.
+                fetch (Callable[[], Awaitable[Any]]): The function reading the page from the database.
+                ttl (Optional[float]): The time to live of the page in seconds. Defaults to the cache TTL.
+
+            Returns:
+                Any: The page.
+        """
+        key = (wallet_address, *page_key)
+        page = self.cache.get(key)
+        logger.debug(f"Transaction history cache stats: {self.cache.stats()}")
+        if page is None:
+            generation = self._generations.get(wallet_address, 0)
+            page = await fetch()
+            if self._generations.get(wallet_address, 0) == generation:
+                self.cache.set(key, page, ttl=ttl, tags=[wallet_address])
+        return page
+
+    def invalidate(self, *wallet_addresses: str) -> None:
+        """
+            Removes all cached history pages of the wallets.
+
+            Args:
+                *wallet_addresses (str): The wallet addresses whose history has changed.
+        """
+        for wallet_address in wallet_addresses:
+            self._generations[wallet_address] = self._generations.get(wallet_address, 0) + 1
+            removed = self.cache.invalidate_tag(wallet_address)
+            if removed:
+                logger.debug(f"Invalidated {removed} cached history pages for wallet {wallet_address}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Returns the cache statistics, including the hit and miss rates.
+        """
+        return self.cache.stats()
+
+
+# Кэш балансов кошельков. Функции получения балансов регистрируются модулями блокчейнов.
+balance_cache = BalanceCache()
+
+# Кэш страниц истории транзакций кошельков
+transaction_history_cache = TransactionHistoryCache()
@@ -0,0 +1,108 @@
+# solana-webwallet/external_services/json_rpc.py
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, TypeVar
+
+import httpx
+
+from external_services.transport import rpc_transport
+from logger_config import logger
+
+T = TypeVar('T')
+
+# HTTP-статусы, которыми узлы отвечают на batch-запрос, если не принимают их: 405 Method Not Allowed и
+# 413 Payload Too Large. Остальные ошибки (неверный ключ или URL, разовый 400, 429) с поддержкой batch не связаны
+BATCH_REJECTION_STATUS_CODES = (405, 413)
+
+# URL узлов, отклонивших batch-запрос: к ним сразу отправляются одиночные запросы
+batch_unsupported_urls: Set[str] = set()
+
+
+class JsonRpcBatchError(Exception):
+    """
+        Raised when a node rejects a JSON-RPC batch request.
+    """
+    pass
+
+
+def build_json_rpc_request(request_id: int, method: str, params: List[Any]) -> Dict[str, Any]:
+    """
+        Builds a single JSON-RPC 2.0 request object.
+
+        Args:
+            request_id (int): The request identifier used to match the response.
+            method (str): The JSON-RPC method name.
+            params (List[Any]): The method parameters.
+
+        Returns:
+            Dict[str, Any]: The JSON-RPC request object.
+    """
+    return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+
+async def send_json_rpc_batch(url: str, requests: List[Dict[str, Any]],
+                              session: Optional[httpx.AsyncClient] = None) -> List[Dict[str, Any]]:
+    """
+        Sends several JSON-RPC requests in a single HTTP POST and returns the responses in request order.
+
+        Nodes are allowed to answer batch items in any order, so the responses are matched back by their ids.
+        Error items are returned as is, it is up to the caller to inspect the "error" field.
+
+        Args:
+            url (str): The node URL.
+            requests (List[Dict[str, Any]]): The JSON-RPC request objects with unique ids.
+            session (Optional[httpx.AsyncClient]): The HTTP client to use. Defaults to the shared RPC transport client.
+
+        Returns:
+            List[Dict[str, Any]]: The JSON-RPC response objects in the same order as the requests.
+
+        Raises:
+            JsonRpcBatchError: If the node does not support batches.
+            httpx.HTTPError: If the HTTP request itself fails.
+            Exception: If some responses are missing.
+    """
+    if not requests:
+        return []
+
+    session = session or rpc_transport.session
+    response = await session.post(url, json=requests)
+    if response.status_code in BATCH_REJECTION_STATUS_CODES:
+        raise JsonRpcBatchError(f"Node {url} rejected the batch request with HTTP {response.status_code}")
+    response.raise_for_status()
+    payload = response.json()
+
+    # Узлы без поддержки batch возвращают один объект с ошибкой вместо списка ответов
+    if not isinstance(payload, list):
+        raise JsonRpcBatchError(f"Node {url} rejected the batch request: {payload}")
+
+    # Сопоставляем ответы с запросами по идентификатору
+    responses_by_id = {item.get("id"): item for item in payload if isinstance(item, dict)}
+    try:
+        return [responses_by_id[request["id"]] for request in requests]
+    except KeyError as error:
+        raise Exception(f"Node {url} returned an incomplete batch response, missing id {error}")
+
+
+async def call_with_batch_fallback(url: str, batched: Callable[[], Awaitable[T]],
+                                   single: Callable[[], Awaitable[T]]) -> T:
+    """
+        Runs the batched version of a request, or the version with single requests for a node that rejects batches.
+
+        Support for batches is tracked per node URL: a node that rejected a batch request once gets only single
+        requests for the rest of the process, the other nodes keep receiving batches.
+
+        Args:
+            url (str): The node URL.
+            batched (Callable[[], Awaitable[T]]): The function sending JSON-RPC batch requests to the node.
+            single (Callable[[], Awaitable[T]]): The function sending the same calls as single requests.
+
+        Returns:
+            T: The result of the function that was run.
+    """
+    if url not in batch_unsupported_urls:
+        try:
+            return await batched()
+        except JsonRpcBatchError as error:
+            # Узел не поддерживает пакетные запросы - запоминаем это, чтобы не тратить на них время в дальнейшем
+            batch_unsupported_urls.add(url)
+            logger.warning(f"Node {url} does not support JSON-RPC batches, falling back to single requests: {error}")
+    return await single()
@@ -0,0 +1,276 @@
+# solana-webwallet/external_services/rpc_router.py
+
+import asyncio
+import math
+import time
+import traceback
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar
+
+import aiohttp
+import httpx
+
+from config_data.config import RPC_PROBE_INTERVAL, RPC_PROBE_TIMEOUT, RPC_READ_TIMEOUT, RPC_LATENCY_EWMA_ALPHA
+from logger_config import logger
+
+ClientT = TypeVar("ClientT")
+ResultT = TypeVar("ResultT")
+
+# Ошибки установки соединения: запрос гарантированно не дошел до узла, поэтому его можно повторить на другом узле
+CONNECTION_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, aiohttp.ClientConnectorError)
+
+# Ошибки, после которых запрос на чтение повторяется на другом узле: сетевые сбои и таймауты
+READ_FAILOVER_ERRORS = (httpx.TransportError, aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+
+def iter_error_chain(error: BaseException):
+    """
+        Iterates over the exception and the exceptions it was raised from.
+
+        Client libraries wrap transport errors (for example, solana-py raises SolanaRpcException from httpx errors),
+        so the original error has to be looked up in the exception chain.
+
+        Args:
+            error (BaseException): The raised exception.
+
+        Yields:
+            BaseException: The exception and its causes.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+        Checks whether the request failed before it reached the node.
+
+        Args:
+            error (BaseException): The raised exception.
+
+        Returns:
+            bool: True if the connection to the node could not be established.
+    """
+    return any(isinstance(e, CONNECTION_ERRORS) for e in iter_error_chain(error))
+
+
+def is_read_failover_error(error: BaseException) -> bool:
+    """
+        Checks whether a read request should be retried on another node.
+
+        Args:
+            error (BaseException): The raised exception.
+
+        Returns:
+            bool: True for network errors, timeouts and server-side (5xx, 429) HTTP errors.
+    """
+    for e in iter_error_chain(error):
+        if isinstance(e, READ_FAILOVER_ERRORS):
+            return True
+        if isinstance(e, httpx.HTTPStatusError) and (e.response.status_code >= 500 or e.response.status_code == 429):
+            return True
+        if isinstance(e, aiohttp.ClientResponseError) and (e.status >= 500 or e.status == 429):
+            return True
+    return False
+
+
+class RpcNode(Generic[ClientT]):
+    """
+        RPC endpoint with its client and health statistics.
+
+        Attributes:
+            url (str): The endpoint URL.
+            client (ClientT): The RPC client bound to the endpoint.
+            healthy (bool): False after a failed probe or a failed request, until the next successful probe.
+            latency (Optional[float]): The exponentially weighted moving average of the latency in seconds.
+            failures (int): The number of failed requests and probes.
+    """
+
+    def __init__(self, url: str, client: ClientT) -> None:
+        self.url = url
+        self.client = client
+        self.healthy = True
+        self.latency: Optional[float] = None
+        self.failures = 0
+
+    def record_success(self, latency: float, alpha: float) -> None:
+        # Экспоненциальное скользящее среднее сглаживает единичные выбросы задержки
+        self.latency = latency if self.latency is None else alpha * latency + (1 - alpha) * self.latency
+        self.healthy = True
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.healthy = False
+
+    def __repr__(self) -> str:
+        latency = f"{self.latency * 1000:.0f}ms" if self.latency is not None else "n/a"
+        return f"RpcNode({self.url}, healthy={self.healthy}, latency={latency})"
+
+
+class RpcRouter(Generic[ClientT]):
+    """
+        Routes RPC calls of one blockchain across several endpoints.
+
+        Every call goes to the fastest healthy node. Failed nodes are moved to the end of the list until a
+        background probe finds them healthy again. Read calls fail over to the next node on network errors and
+        timeouts. Calls that send transactions fail over only if the connection could not be established, so
+        a transaction is never submitted twice.
+
+        Attributes:
+            name (str): The router name used in logs.
+            nodes (List[RpcNode]): The endpoints in configuration order.
+            probe (Callable[[ClientT], Awaitable[bool]]): The health check of a client.
+            probe_interval (float): The pause between background probes in seconds.
+            probe_timeout (float): The timeout of a probe in seconds.
+            latency_alpha (float): The smoothing factor of the latency moving average.
+    """
+
+    def __init__(self, name: str, nodes: List[RpcNode[ClientT]], probe: Callable[[ClientT], Awaitable[bool]],
+                 probe_interval: float = RPC_PROBE_INTERVAL, probe_timeout: float = RPC_PROBE_TIMEOUT,
+                 latency_alpha: float = RPC_LATENCY_EWMA_ALPHA) -> None:
+        """
+            Initializes the router.
+
+            Args:
+                name (str): The router name used in logs.
+                nodes (List[RpcNode]): The endpoints, the first one is preferred until latencies are measured.
+                probe (Callable[[ClientT], Awaitable[bool]]): The health check of a client.
+                probe_interval (float): The pause between background probes in seconds.
+                    Defaults to RPC_PROBE_INTERVAL.
+                probe_timeout (float): The timeout of a probe in seconds. Defaults to RPC_PROBE_TIMEOUT.
+                latency_alpha (float): The smoothing factor of the latency moving average.
+                    Defaults to RPC_LATENCY_EWMA_ALPHA.
+
+            Raises:
+                ValueError: If no nodes are given.
+        """
+        if not nodes:
+            raise ValueError("At least one RPC node is required.")
+        self.name = name
+        self.nodes = nodes
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.latency_alpha = latency_alpha
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def primary_client(self) -> ClientT:
+        """
+            Returns the client of the first configured node.
+        """
+        return self.nodes[0].client
+
+    def ranked_nodes(self) -> List[RpcNode[ClientT]]:
+        """
+            Returns the nodes in the order they are tried: healthy nodes by latency, then unhealthy ones.
+
+            Returns:
+                List[RpcNode]: The nodes ordered by preference.
+        """
+        order = {id(node): index for index, node in enumerate(self.nodes)}
+        # Узлы без измеренной задержки идут после измеренных, но в порядке конфигурации
+        return sorted(self.nodes, key=lambda node: (not node.healthy,
+                                                    node.latency if node.latency is not None else math.inf,
+                                                    order[id(node)]))
+
+    def best_client(self) -> ClientT:
+        """
+            Returns the client of the fastest healthy node.
+        """
+        return self.ranked_nodes()[0].client
+
+    async def call(self, operation: Callable[[ClientT], Awaitable[ResultT]], client: Optional[ClientT] = None,
+                   failover_on: Callable[[BaseException], bool] = is_read_failover_error,
+                   timeout: Optional[float] = RPC_READ_TIMEOUT) -> ResultT:
+        """
+            Runs the operation on the best node, falling over to the next nodes on retryable errors.
+
+            Args:
+                operation (Callable[[ClientT], Awaitable[ResultT]]): The coroutine function taking a node client.
+                client (Optional[ClientT]): The explicit client. If given, the operation runs on it without routing.
+                failover_on (Callable[[BaseException], bool]): Decides whether an error allows retrying the
+                    operation on another node. Defaults to is_read_failover_error.
+                timeout (Optional[float]): The timeout of a single attempt in seconds, None disables it.
+                    Defaults to RPC_READ_TIMEOUT.
+
+            Returns:
+                ResultT: The result of the operation.
+
+            Raises:
+                Exception: The error of the last attempt, or the first error that does not allow a failover.
+        """
+        if client is not None:
+            return await operation(client)
+
+        last_error: Optional[BaseException] = None
+        for node in self.ranked_nodes():
+            start_time = time.monotonic()
+            try:
+                if timeout is None:
+                    result = await operation(node.client)
+                else:
+                    result = await asyncio.wait_for(operation(node.client), timeout)
+            except Exception as error:
+                if not failover_on(error):
+                    raise
+                node.record_failure()
+                last_error = error
+                logger.warning(f"{self.name} RPC node {node.url} failed, trying the next one: {error!r}")
+                continue
+            node.record_success(time.monotonic() - start_time, self.latency_alpha)
+            return result
+
+        raise last_error
+
+    async def probe_all(self) -> None:
+        """
+            Checks the health and latency of every node concurrently.
+        """
+        async def probe_node(node: RpcNode[ClientT]) -> None:
+            start_time = time.monotonic()
+            try:
+                healthy = await asyncio.wait_for(self.probe(node.client), self.probe_timeout)
+            except Exception as error:
+                logger.debug(f"{self.name} RPC node {node.url} probe failed: {error!r}")
+                healthy = False
+            if healthy:
+                node.record_success(time.monotonic() - start_time, self.latency_alpha)
+            else:
+                node.record_failure()
+
+        await asyncio.gather(*[probe_node(node) for node in self.nodes])
+        logger.debug(f"{self.name} RPC nodes: {self.ranked_nodes()}")
+
+    def start(self) -> None:
+        """
+            Starts the background probes in the running event loop.
+        """
+        if len(self.nodes) > 1 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+            Stops the background probes.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        # Периодически проверяем все узлы, чтобы вернуть восстановившиеся узлы в работу
+        while True:
+            try:
+                await self.probe_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detailed_error_traceback = traceback.format_exc()
+                logger.error(f"{self.name} RPC probe failed: {e}\n{detailed_error_traceback}")
+            await asyncio.sleep(self.probe_interval)
@@ -0,0 +1,76 @@
+# solana-webwallet/external_services/single_flight.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+        Coalesces concurrent identical calls into one in-flight request.
+
+        The first caller of a key starts the request, callers arriving with the same key while it is in flight await
+        the same future and get the same result or exception. Once the request completes the key is forgotten, so the
+        results are never reused by later callers - this is request coalescing, not caching.
+
+        Attributes:
+            calls (int): The number of requests actually executed.
+            coalesced (int): The number of calls that were served by a request already in flight.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+            Runs the call unless an identical one is already in flight and returns its result.
+
+            Args:
+                key (Hashable): The call key, for example (method, params).
+                fn (Callable[[], Awaitable[T]]): The coroutine function performing the request.
+
+            Returns:
+                T: The result of the request.
+
+            Raises:
+                Exception: The exception raised by the request.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done_task: self._forget(key, done_task))
+        # shield: отмена одного из ожидающих не должна отменять запрос для остальных
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Returns the coalescing statistics.
+
+            Returns:
+                Dict[str, Any]: The number of executed and coalesced calls, requests in flight and the coalesced ratio.
+        """
+        total = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "coalesced_rate": self.coalesced / total if total else 0.0,
+        }
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Помечаем исключение как полученное: если все ожидающие были отменены, asyncio не выведет предупреждение
+        if not task.cancelled():
+            task.exception()
+
+
+# Общий экземпляр для запросов на чтение к RPC-узлам
+rpc_single_flight = SingleFlight()
@@ -0,0 +1,214 @@
+# solana-webwallet/external_services/solana/blockhash_provider.py
+
+import asyncio
+import time
+import traceback
+from typing import NamedTuple, Optional
+
+from solana.rpc.async_api import AsyncClient
+from solders.hash import Hash
+from solders.signature import Signature
+
+from config_data.config import (SOLANA_BLOCKHASH_REFRESH_INTERVAL, SOLANA_BLOCKHASH_MAX_AGE,
+                                SOLANA_RECENT_SIGNATURES_TTL, SOLANA_RECENT_SIGNATURES_MAX_ENTRIES, SOLANA_SLOT_TIME,
+                                SOLANA_FRESH_BLOCKHASH_ATTEMPTS)
+from external_services.rpc_router import RpcRouter
+from logger_config import logger
+from utils.cache import TTLLRUCache
+
+
+class RecentBlockhash(NamedTuple):
+    """
+        Recent blockhash with the block heights it was fetched at.
+    """
+    blockhash: Hash
+    # Высота блока, после которой транзакция с этим блокхэшем уже не может попасть в блок
+    last_valid_block_height: int
+    # Высота блока на момент запроса
+    block_height: int
+    fetched_at: float
+
+
+class BlockhashProvider:
+    """
+        Background service that keeps a recent Solana blockhash ready for transfers.
+
+        Every refresh_interval seconds it fetches getLatestBlockhash and getBlockHeight concurrently, so signing a
+        transfer needs no RPC call and sending it takes one sendTransaction. If the cached blockhash is older than
+        max_age (the task is not running or the nodes were unavailable), get_blockhash() fetches a new one itself;
+        concurrent callers share that request. The cached block height tells whether a signed transaction can still
+        land: once it exceeds the lastValidBlockHeight of the transaction's blockhash, the transaction has expired.
+
+        Two identical transfers signed with one blockhash get one signature, and a node executes only one of them. The
+        provider remembers the signatures of signed transactions: claim() tells whether a signature is new, and a
+        transaction whose signature is taken is signed again with a blockhash from refresh_after().
+
+        Attributes:
+            router (RpcRouter): The router of the Solana nodes.
+            refresh_interval (float): The interval in seconds between refreshes.
+            max_age (float): The age in seconds after which the cached blockhash is not handed out.
+    """
+
+    def __init__(self, router: RpcRouter, refresh_interval: float = SOLANA_BLOCKHASH_REFRESH_INTERVAL,
+                 max_age: float = SOLANA_BLOCKHASH_MAX_AGE) -> None:
+        """
+            Initializes the provider.
+
+            Args:
+                router (RpcRouter): The router of the Solana nodes.
+                refresh_interval (float): The interval in seconds between refreshes.
+                    Defaults to SOLANA_BLOCKHASH_REFRESH_INTERVAL.
+                max_age (float): The age in seconds after which the cached blockhash is not handed out.
+                    Defaults to SOLANA_BLOCKHASH_MAX_AGE.
+        """
+        self.router = router
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._recent: Optional[RecentBlockhash] = None
+        self._lock = asyncio.Lock()
+        # Подписи транзакций, подписанных недавно выданными блокхэшами
+        self._signatures = TTLLRUCache(max_entries=SOLANA_RECENT_SIGNATURES_MAX_ENTRIES,
+                                       ttl=SOLANA_RECENT_SIGNATURES_TTL)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        """
+            Returns True if the provider background task is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    @property
+    def block_height(self) -> Optional[int]:
+        """
+            Returns the block height seen by the last refresh, or None before the first refresh.
+        """
+        return self._recent.block_height if self._recent is not None else None
+
+    def is_expired(self, last_valid_block_height: Optional[int]) -> bool:
+        """
+            Checks whether a transaction signed with a blockhash can no longer land in a block.
+
+            Args:
+                last_valid_block_height (Optional[int]): The lastValidBlockHeight of the transaction's blockhash.
+
+            Returns:
+                bool: True if the last seen block height is above it. False while either height is unknown.
+        """
+        if last_valid_block_height is None or self.block_height is None:
+            return False
+        return self.block_height > last_valid_block_height
+
+    async def refresh(self, client: Optional[AsyncClient] = None) -> RecentBlockhash:
+        """
+            Fetches the latest blockhash and the current block height.
+
+            Args:
+                client (Optional[AsyncClient]): The Solana client. Defaults to the fastest healthy node of the router.
+
+            Returns:
+                RecentBlockhash: The fetched blockhash.
+        """
+        blockhash_resp, block_height_resp = await asyncio.gather(
+            self.router.call(lambda node_client: node_client.get_latest_blockhash(), client),
+            self.router.call(lambda node_client: node_client.get_block_height(), client),
+        )
+        recent = RecentBlockhash(
+            blockhash=blockhash_resp.value.blockhash,
+            last_valid_block_height=blockhash_resp.value.last_valid_block_height,
+            block_height=block_height_resp.value,
+            fetched_at=time.monotonic(),
+        )
+        # Ответ более медленного узла не должен откатывать высоту блока назад
+        if self._recent is None or recent.block_height >= self._recent.block_height:
+            self._recent = recent
+        return self._recent
+
+    async def get_blockhash(self) -> RecentBlockhash:
+        """
+            Returns a recent blockhash, fetching a new one only if the cached one is older than max_age.
+
+            Returns:
+                RecentBlockhash: The blockhash for a new transaction.
+        """
+        recent = self._recent
+        if recent is not None and time.monotonic() - recent.fetched_at <= self.max_age:
+            return recent
+        async with self._lock:
+            # Пока ждали блокировку, блокхэш мог обновить другой перевод или фоновая задача
+            recent = self._recent
+            if recent is not None and time.monotonic() - recent.fetched_at <= self.max_age:
+                return recent
+            return await self.refresh()
+
+    async def refresh_after(self, blockhash: Hash, client: Optional[AsyncClient] = None) -> RecentBlockhash:
+        """
+            Fetches a blockhash newer than the given one, waiting for the next slot if the nodes still return it.
+
+            Args:
+                blockhash (Hash): The blockhash to replace.
+                client (Optional[AsyncClient]): The Solana client. Defaults to the fastest healthy node of the router.
+
+            Raises:
+                Exception: If the nodes return the same blockhash for SOLANA_FRESH_BLOCKHASH_ATTEMPTS slots.
+
+            Returns:
+                RecentBlockhash: The newer blockhash.
+        """
+        for _ in range(SOLANA_FRESH_BLOCKHASH_ATTEMPTS):
+            recent = await self.refresh(client)
+            if recent.blockhash != blockhash:
+                return recent
+            await asyncio.sleep(SOLANA_SLOT_TIME)
+        raise Exception(f"No blockhash newer than {blockhash} after {SOLANA_FRESH_BLOCKHASH_ATTEMPTS} attempts")
+
+    def claim(self, signature: Signature) -> bool:
+        """
+            Remembers the signature of a signed transaction.
+
+            Args:
+                signature (Signature): The transaction signature.
+
+            Returns:
+                bool: True if the signature is new, False if an identical transaction was signed recently.
+        """
+        key = str(signature)
+        if self._signatures.get(key) is not None:
+            return False
+        self._signatures.set(key, True)
+        return True
+
+    def start(self) -> None:
+        """
+            Starts the provider background task in the running event loop.
+        """
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Blockhash provider started")
+
+    async def stop(self) -> None:
+        """
+            Stops the provider background task and waits for it to finish.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Blockhash provider stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Переводы запросят блокхэш сами, когда закэшированный устареет
+                detailed_error_traceback = traceback.format_exc()
+                logger.warning(f"Blockhash refresh failed: {e}\n{detailed_error_traceback}")
+            await asyncio.sleep(self.refresh_interval)
+
@@ -1,29 +1,61 @@
 # solana-webwallet/external_services/solana/solana.py
 
+import asyncio
+import json
 import time
 import traceback
-from typing import Tuple, Dict, List, Optional, Any
+from typing import Awaitable, Callable, Tuple, Dict, List, NamedTuple, Optional, Any
 
 import base58
-import httpx
-import mnemonic
 from solana.rpc.api import Keypair
 from solana.rpc.async_api import AsyncClient
+from solana.rpc.types import DataSliceOpts
 from solana.transaction import Transaction
+from solders.hash import Hash
+from solders.instruction import Instruction
+from solders.message import Message
 from solders.pubkey import Pubkey
+from solders.rpc.responses import GetTransactionResp
+from solders.signature import Signature
 from solders.system_program import transfer, TransferParams
-from solders.transaction_status import TransactionConfirmationStatus
-
-from config_data.config import (SOLANA_NODE_URL, LAMPORT_TO_SOL_RATIO, PRIVATE_KEY_HEX_LENGTH,
-                                PRIVATE_KEY_BINARY_LENGTH, TRANSACTION_HISTORY_CACHE_DURATION,
-                                TRANSACTION_LIMIT, timeout_settings)
+from solders.rpc.responses import RpcConfirmedTransactionStatusWithSignature
+from solders.transaction import Transaction as SoldersTransaction
+from solders.transaction_status import TransactionStatus, EncodedConfirmedTransactionWithStatusMeta
+
+from config_data.config import (SOLANA_NODE_URLS, LAMPORT_TO_SOL_RATIO, PRIVATE_KEY_HEX_LENGTH,
+                                PRIVATE_KEY_BINARY_LENGTH, SOLANA_SIGNATURES_PAGE_LIMIT, SOLANA_MULTIPLE_ACCOUNTS_LIMIT,
+                                SOLANA_TRANSACTION_BATCH_SIZE, SOLANA_MAX_CONCURRENT_REQUESTS, SOLANA_SIGNATURE_STATUSES_LIMIT, SOLANA_PACKET_DATA_SIZE,
+                                timeout_settings)
+from external_services.cache import balance_cache, transaction_history_cache
+from external_services.json_rpc import build_json_rpc_request, call_with_batch_fallback, send_json_rpc_batch
+from external_services.rpc_router import RpcNode, RpcRouter, is_connection_error
+from external_services.single_flight import rpc_single_flight
+from external_services.solana.blockhash_provider import BlockhashProvider
+from external_services.transport import rpc_transport
 from logger_config import logger
+from utils.batching import chunked
+from utils.crypto_executor import crypto_executor
+from utils.key_derivation import generate_solana_wallet
+
+
+async def probe_solana_node(client: AsyncClient) -> bool:
+    # getHealth возвращает ошибку, если узел отстал от кластера
+    return await client.is_connected()
 
-# Создание клиента для подключения к тестовой сети с настроенными таймаутами
-http_client = AsyncClient(SOLANA_NODE_URL, timeout=timeout_settings)
 
-# Создаем словарь для кэширования результатов запросов истории транзакций
-# transaction_history_cache: Dict[str, Tuple[List, float]] = {}
+# Маршрутизатор запросов между узлами Solana, запросы всех клиентов идут через общий пул соединений
+solana_router = RpcRouter(
+    "Solana",
+    [RpcNode(url, rpc_transport.attach_solana_client(AsyncClient(url, timeout=timeout_settings)))
+     for url in SOLANA_NODE_URLS],
+    probe_solana_node,
+)
+
+# Клиент основного узла сети
+http_client = solana_router.primary_client
+
+# Закэшированный последний блокхэш для подписи переводов и текущая высота блока
+blockhash_provider = BlockhashProvider(solana_router)
 
 
 async def create_solana_wallet() -> Tuple[str, str, str]:
@@ -38,13 +70,8 @@ async def create_solana_wallet() -> Tuple[str, str, str]:
     """
     try:
         solana_derivation_path = "m/44'/501'/0'/0'"
-        mnemo = mnemonic.Mnemonic("english")
-        words = mnemo.generate(strength=128) # strength=128 for 12 words, strength=256 for 24 words
-        seed = mnemo.to_seed(words, passphrase="")
-        keypair = Keypair.from_seed_and_derivation_path(seed, solana_derivation_path)
-        wallet_address = str(keypair.pubkey())
-        private_key = keypair.secret().hex()
-        return wallet_address, private_key, words
+        # Получение seed из мнемонической фразы (PBKDF2) выполняется в пуле, чтобы не блокировать цикл событий
+        return await crypto_executor.run(generate_solana_wallet, solana_derivation_path)
 
     except Exception as e:
         detailed_error_traceback = traceback.format_exc()
@@ -157,13 +184,13 @@ def is_valid_amount(amount: str | int | float) -> bool:
         return False
 
 
-async def get_sol_balance(wallet_addresses, client):
+async def get_sol_balance(wallet_addresses, client=None):
     """
         Asynchronously retrieves the SOL balance for the specified wallet addresses.
 
         Args:
             wallet_addresses (Union[str, List[str]]): The wallet address or a list of wallet addresses.
-            client: The Solana client.
+            client: The Solana client. Defaults to the fastest healthy node of solana_router.
 
         Returns:
             Union[float, List[float]]: The SOL balance or a list of SOL balances corresponding to the wallet addresses.
@@ -171,20 +198,26 @@ async def get_sol_balance(wallet_addresses, client):
     try:
         # Если передан одиночный адрес кошелька
         if isinstance(wallet_addresses, str):
-            balance = (await client.get_balance(Pubkey.from_string(wallet_addresses))).value
+            pubkey = Pubkey.from_string(wallet_addresses)
+            # Одновременные запросы баланса одного адреса объединяются в один запрос к узлу
+            balance = (await rpc_single_flight.do(
+                ("getBalance", wallet_addresses),
+                lambda: solana_router.call(lambda node_client: node_client.get_balance(pubkey), client),
+            )).value
             # Преобразование лампортов в SOL
             sol_balance = balance / LAMPORT_TO_SOL_RATIO
             logger.debug(f"wallet_address: {wallet_addresses}, balance: {balance}, sol_balance: {sol_balance}")
             return sol_balance
         # Если передан список адресов кошельков
         elif isinstance(wallet_addresses, list):
-            sol_balances = []
-            for address in wallet_addresses:
-                balance = (await client.get_balance(Pubkey.from_string(address))).value
-                # Преобразование лампортов в SOL
-                sol_balance = balance / LAMPORT_TO_SOL_RATIO
-                sol_balances.append(sol_balance)
-            return sol_balances
+            # Балансы всех адресов запрашиваются пакетами через getMultipleAccounts.
+            # Результат общий для объединенных запросов, поэтому каждому вызывающему возвращаем копию списка.
+            return list(await rpc_single_flight.do(
+                ("getMultipleAccounts", tuple(wallet_addresses)),
+                lambda: solana_router.call(
+                    lambda node_client: get_multiple_sol_balances(wallet_addresses, node_client), client
+                ),
+            ))
         else:
             raise ValueError("Invalid type for wallet_addresses. Expected str or list[str].")
     except Exception as error:
@@ -193,23 +226,84 @@ async def get_sol_balance(wallet_addresses, client):
         raise Exception(f"Failed to get Solana balance: {error}\n{detailed_error_traceback}")
 
 
-async def transfer_token(sender_address: str, sender_private_key: str, recipient_address: str, amount: float,
-                         client: AsyncClient) -> bool:
+async def get_multiple_sol_balances(wallet_addresses: List[str], client: AsyncClient) -> List[float]:
     """
-        Asynchronous function to transfer tokens between wallets.
+        Asynchronously retrieves the SOL balances for a list of wallet addresses using getMultipleAccounts.
+
+        The addresses are split into chunks of SOLANA_MULTIPLE_ACCOUNTS_LIMIT and all chunks are requested
+        concurrently, so the latency stays close to a single RPC round trip regardless of the number of wallets.
+        Accounts that do not exist on chain yet are reported with a zero balance.
+
+        Args:
+            wallet_addresses (List[str]): The list of wallet addresses.
+            client (AsyncClient): The Solana client.
+
+        Returns:
+            List[float]: The SOL balances in the same order as the input wallet addresses.
+    """
+    if not wallet_addresses:
+        return []
+
+    pubkeys = [Pubkey.from_string(address) for address in wallet_addresses]
+
+    # Запрашиваем только метаданные аккаунтов: данные аккаунта (data) нам не нужны, поэтому срезаем их до нуля байт
+    data_slice = DataSliceOpts(offset=0, length=0)
+
+    # Выполняем запросы по всем пакетам параллельно, asyncio.gather сохраняет порядок результатов
+    responses = await asyncio.gather(*[
+        client.get_multiple_accounts(chunk, data_slice=data_slice)
+        for chunk in chunked(pubkeys, SOLANA_MULTIPLE_ACCOUNTS_LIMIT)
+    ])
+
+    sol_balances = []
+    for response in responses:
+        # Узел возвращает аккаунты в том же порядке, что и запрошенные ключи; несуществующий аккаунт - None
+        for account in response.value:
+            lamports = account.lamports if account is not None else 0
+            # Преобразование лампортов в SOL
+            sol_balances.append(lamports / LAMPORT_TO_SOL_RATIO)
+
+    logger.debug(f"Fetched {len(sol_balances)} Solana balances in {len(responses)} getMultipleAccounts requests")
+    return sol_balances
+
+
+# Кэш балансов запрашивает балансы кошельков Solana пакетными запросами
+balance_cache.register_fetcher('solana', get_sol_balance)
+
+
+class SignedTransfer(NamedTuple):
+    """
+        Signed Solana transfer transaction that has not been sent yet.
+    """
+    transaction_id: str
+    # Транзакция в формате для отправки узлу, в шестнадцатеричном виде
+    raw_transaction: str
+    recent_blockhash: str
+    last_valid_block_height: int
+
+
+async def sign_transfer(sender_address: str, sender_private_key: str, recipient_address: str, amount: float,
+                        client: Optional[AsyncClient] = None) -> SignedTransfer:
+    """
+        Builds and signs a transfer transaction with a recent blockhash.
+
+        The blockhash comes from blockhash_provider, so signing usually makes no RPC call. The signature of the
+        transaction is known before it is sent, so the transfer can be recorded first and sent afterwards. A transfer
+        identical to one signed recently is signed with a newer blockhash, so their signatures never collide.
 
         Args:
             sender_address (str): Sender's address.
             sender_private_key (str): Sender's private key.
             recipient_address (str): Recipient's address.
             amount (float): Amount of tokens to transfer.
-            client (AsyncClient): Asynchronous client for sending the transaction.
+            client (Optional[AsyncClient]): The Solana client. If given, a fresh blockhash is fetched from it instead
+                of the cached one.
 
         Raises:
             ValueError: If any of the provided addresses is invalid or the private key is invalid.
 
         Returns:
-            bool: True if the transfer is successful, False otherwise.
+            SignedTransfer: The signed transaction.
     """
     # Проверяем, является ли адрес отправителя действительным
     if not is_valid_wallet_address(sender_address):
@@ -229,31 +323,278 @@ async def transfer_token(sender_address: str, sender_private_key: str, recipient
     # Создаем пару ключей отправителя из приватного ключа
     sender_keypair = Keypair.from_seed(bytes.fromhex(sender_private_key))
 
-    # Создаем транзакцию для перевода токенов
-    txn = Transaction().add(
-        transfer(
-            TransferParams(
-                from_pubkey=sender_keypair.pubkey(),
-                to_pubkey=Pubkey.from_string(recipient_address),
-                # Количество лампортов для перевода, преобразованное из суммы SOL.
-                lamports=int(amount * LAMPORT_TO_SOL_RATIO),
+    # Блокхэш и высота блока, после которой транзакция с ним уже не может попасть в блок
+    if client is None:
+        blockhash = await blockhash_provider.get_blockhash()
+    else:
+        blockhash = await blockhash_provider.refresh(client)
+
+    while True:
+        # Создаем транзакцию для перевода токенов
+        txn = Transaction(recent_blockhash=blockhash.blockhash, fee_payer=sender_keypair.pubkey()).add(
+            transfer(
+                TransferParams(
+                    from_pubkey=sender_keypair.pubkey(),
+                    to_pubkey=Pubkey.from_string(recipient_address),
+                    # Количество лампортов для перевода, преобразованное из суммы SOL.
+                    lamports=int(amount * LAMPORT_TO_SOL_RATIO),
+                )
             )
         )
+        txn.sign(sender_keypair)
+        # Такой же перевод уже подписан этим блокхэшем: с той же подписью узел выполнил бы только один из них
+        if blockhash_provider.claim(txn.signature()):
+            break
+        blockhash = await blockhash_provider.refresh_after(blockhash.blockhash, client)
+
+    return SignedTransfer(
+        transaction_id=str(txn.signature()),
+        raw_transaction=txn.serialize().hex(),
+        recent_blockhash=str(blockhash.blockhash),
+        last_valid_block_height=blockhash.last_valid_block_height,
+    )
+
+
+async def send_raw_transaction(raw_transaction: str, client: Optional[AsyncClient] = None) -> str:
+    """
+        Sends a signed transaction.
+
+        Sending the same signed transaction again is safe: it has the same signature and is executed at most once.
+
+        Args:
+            raw_transaction (str): The hex of the signed wire transaction.
+            client (Optional[AsyncClient]): The Solana client. Defaults to the fastest healthy node of solana_router.
+
+        Returns:
+            str: The transaction signature.
+    """
+    async def send(node_client: AsyncClient):
+        return await node_client.send_raw_transaction(bytes.fromhex(raw_transaction))
+
+    # На другой узел переключаемся, только если соединение не было установлено: после таймаута транзакция могла
+    # быть принята узлом
+    send_transaction_response = await solana_router.call(send, client, failover_on=is_connection_error, timeout=None)
+    return str(send_transaction_response.value)
+
+
+async def transfer_token(sender_address: str, sender_private_key: str, recipient_address: str, amount: float,
+                         client: Optional[AsyncClient] = None,
+                         on_signed: Optional[Callable[[SignedTransfer], Awaitable[None]]] = None) -> str:
+    """
+        Asynchronous function to transfer tokens between wallets.
+
+        Returns as soon as a node accepts the transaction. The confirmation is awaited by
+        services.confirmation_tracker, which polls the statuses of all pending transfers together.
+
+        Args:
+            sender_address (str): Sender's address.
+            sender_private_key (str): Sender's private key.
+            recipient_address (str): Recipient's address.
+            amount (float): Amount of tokens to transfer.
+            client (Optional[AsyncClient]): Asynchronous client for sending the transaction.
+                Defaults to the fastest healthy node of solana_router.
+            on_signed (Optional[Callable[[SignedTransfer], Awaitable[None]]]): Called with the signed transaction
+                before it is sent, for example to record it in the transfer outbox.
+
+        Raises:
+            ValueError: If any of the provided addresses is invalid or the private key is invalid.
+
+        Returns:
+            str: The signature of the submitted transaction.
+    """
+    signed_transfer = await sign_transfer(sender_address, sender_private_key, recipient_address, amount, client)
+    if on_signed is not None:
+        await on_signed(signed_transfer)
+
+    transaction_id = await send_raw_transaction(signed_transfer.raw_transaction, client)
+    # История и балансы обоих кошельков изменились - сбрасываем их закэшированные значения
+    transaction_history_cache.invalidate(sender_address, recipient_address)
+    balance_cache.invalidate('solana', sender_address, recipient_address)
+    return transaction_id
+
+
+class PayoutBatch(NamedTuple):
+    """
+        Transaction of a batch payout and the payouts packed into it.
+    """
+    # Пары (адрес получателя, сумма) в порядке инструкций транзакции
+    payouts: List[Tuple[str, float]]
+    # Подпись транзакции. Известна и при ошибке отправки: транзакция могла быть принята узлом
+    transaction_id: str
+    error: Optional[str] = None
+
+
+def build_transfer_instruction(sender_pubkey: Pubkey, recipient_address: str, amount: float) -> Instruction:
+    return transfer(
+        TransferParams(
+            from_pubkey=sender_pubkey,
+            to_pubkey=Pubkey.from_string(recipient_address),
+            lamports=int(amount * LAMPORT_TO_SOL_RATIO),
+        )
     )
-    # Отправляем транзакцию клиенту
-    send_transaction_response = await client.send_transaction(txn, sender_keypair)
-    # Подтверждаем транзакцию
-    confirm_transaction_response = await client.confirm_transaction(send_transaction_response.value)
-
-    if hasattr(confirm_transaction_response, 'value') and confirm_transaction_response.value[0]:
-        if hasattr(confirm_transaction_response.value[0], 'confirmation_status'):
-            confirmation_status = confirm_transaction_response.value[0].confirmation_status
-            if confirmation_status:
-                logger.debug(f"Transaction confirmation_status: {confirmation_status}")
-                if confirmation_status in [TransactionConfirmationStatus.Confirmed,
-                                           TransactionConfirmationStatus.Finalized]:
-                    return True
-    return False
+
+
+def pack_payouts(sender_pubkey: Pubkey, payouts: List[Tuple[str, float]], blockhash: Hash
+                 ) -> List[List[Tuple[str, float]]]:
+    """
+        Splits payouts into groups whose transfer instructions fit into one transaction.
+
+        Each group is filled while the serialized transaction stays within SOLANA_PACKET_DATA_SIZE bytes. The size is
+        measured on the real message, so repeated recipients, which share an account key, are packed tighter.
+
+        Args:
+            sender_pubkey (Pubkey): The sender, who is also the fee payer.
+            payouts (List[Tuple[str, float]]): Pairs of the recipient address and the amount of SOL.
+            blockhash (Hash): The blockhash of the transactions.
+
+        Returns:
+            List[List[Tuple[str, float]]]: The groups of payouts in the original order.
+    """
+    groups: List[List[Tuple[str, float]]] = []
+    group: List[Tuple[str, float]] = []
+    instructions: List[Instruction] = []
+    for recipient_address, amount in payouts:
+        instruction = build_transfer_instruction(sender_pubkey, recipient_address, amount)
+        message = Message.new_with_blockhash(instructions + [instruction], sender_pubkey, blockhash)
+        # Неподписанная транзакция содержит нулевые подписи, поэтому ее размер совпадает с размером подписанной
+        if group and len(bytes(SoldersTransaction.new_unsigned(message))) > SOLANA_PACKET_DATA_SIZE:
+            groups.append(group)
+            group, instructions = [], []
+        group.append((recipient_address, amount))
+        instructions.append(instruction)
+    if group:
+        groups.append(group)
+    return groups
+
+
+async def batch_transfer(sender_address: str, sender_private_key: str, payouts: List[Tuple[str, float]],
+                         client: Optional[AsyncClient] = None) -> List[PayoutBatch]:
+    """
+        Pays out SOL from one wallet to many recipients with as few transactions as possible.
+
+        The transfer instructions are packed into transactions up to the size limit (about twenty recipients per
+        transaction), the transactions are signed with one cached blockhash and sent concurrently, at most
+        SOLANA_MAX_CONCURRENT_REQUESTS at once. A group identical to one signed recently gets a newer blockhash, so
+        every transaction has its own signature. A failed send does not stop the others: its error is reported in
+        the batch. The returned signatures can be passed to get_signature_statuses or the confirmation tracker to
+        see which batches landed.
+
+        Address lookup tables are not used: a table has to be created, extended and activated by separate
+        transactions before the payout, and for plain transfers it saves less than it costs.
+
+        Args:
+            sender_address (str): Sender's address.
+            sender_private_key (str): Sender's private key.
+            payouts (List[Tuple[str, float]]): Pairs of the recipient address and the amount of SOL.
+            client (Optional[AsyncClient]): The Solana client. Defaults to the fastest healthy node of solana_router.
+
+        Raises:
+            ValueError: If any of the provided addresses or amounts is invalid or the private key is invalid.
+
+        Returns:
+            List[PayoutBatch]: The transactions with their payouts, in the order of the payouts.
+    """
+    if not is_valid_wallet_address(sender_address):
+        raise ValueError("Invalid sender address")
+
+    if not is_valid_private_key(sender_private_key):
+        raise ValueError("Invalid sender private key")
+
+    # Проверяем все выплаты до отправки первой транзакции, чтобы не выплатить только часть списка
+    for recipient_address, amount in payouts:
+        if not is_valid_wallet_address(recipient_address):
+            raise ValueError(f"Invalid recipient address: {recipient_address}")
+        if not is_valid_amount(amount):
+            raise ValueError(f"Invalid amount for {recipient_address}: {amount}")
+
+    if not payouts:
+        return []
+
+    sender_keypair = Keypair.from_seed(bytes.fromhex(sender_private_key))
+    if client is None:
+        blockhash = await blockhash_provider.get_blockhash()
+    else:
+        blockhash = await blockhash_provider.refresh(client)
+
+    def sign(group: List[Tuple[str, float]], recent_blockhash: Hash) -> SoldersTransaction:
+        message = Message.new_with_blockhash(
+            [build_transfer_instruction(sender_keypair.pubkey(), recipient_address, amount)
+             for recipient_address, amount in group],
+            sender_keypair.pubkey(),
+            recent_blockhash,
+        )
+        return SoldersTransaction([sender_keypair], message, recent_blockhash)
+
+    transactions = []
+    for group in pack_payouts(sender_keypair.pubkey(), payouts, blockhash.blockhash):
+        txn = sign(group, blockhash.blockhash)
+        # Одинаковые группы этой или недавней выплаты получают одну подпись - повторная подписывается новым блокхэшем
+        while not blockhash_provider.claim(txn.signatures[0]):
+            blockhash = await blockhash_provider.refresh_after(blockhash.blockhash, client)
+            txn = sign(group, blockhash.blockhash)
+        transactions.append((group, txn))
+
+    semaphore = asyncio.Semaphore(SOLANA_MAX_CONCURRENT_REQUESTS)
+
+    async def send(group: List[Tuple[str, float]], txn: SoldersTransaction) -> PayoutBatch:
+        transaction_id = str(txn.signatures[0])
+        try:
+            async with semaphore:
+                await send_raw_transaction(bytes(txn).hex(), client)
+        except Exception as e:
+            detailed_error_traceback = traceback.format_exc()
+            logger.error(f"Failed to send payout transaction {transaction_id}: {e}\n{detailed_error_traceback}")
+            return PayoutBatch(group, transaction_id, str(e) or type(e).__name__)
+        return PayoutBatch(group, transaction_id)
+
+    batches = list(await asyncio.gather(*[send(group, txn) for group, txn in transactions]))
+    logger.info(f"Sent {len(payouts)} payouts from {sender_address} in {len(batches)} transactions, "
+                f"{sum(batch.error is not None for batch in batches)} failed")
+
+    # История и балансы всех участников изменились - сбрасываем их закэшированные значения
+    recipient_addresses = list({recipient_address for recipient_address, _ in payouts})
+    transaction_history_cache.invalidate(sender_address, *recipient_addresses)
+    balance_cache.invalidate('solana', sender_address, *recipient_addresses)
+    return batches
+
+
+async def get_signature_statuses(signatures: List[str], client: Optional[AsyncClient] = None,
+                                 search_transaction_history: bool = False) -> List[Optional[TransactionStatus]]:
+    """
+        Retrieves the statuses of transaction signatures.
+
+        getSignatureStatuses accepts many signatures in one call, so the signatures are requested in chunks of
+        SOLANA_SIGNATURE_STATUSES_LIMIT with at most SOLANA_MAX_CONCURRENT_REQUESTS requests in flight.
+
+        Args:
+            signatures (List[str]): The transaction signatures.
+            client (Optional[AsyncClient]): The Solana client. Defaults to the fastest healthy node of solana_router.
+            search_transaction_history (bool): Whether to look the signatures up in the ledger history and not only
+                in the recent status cache of the node. Defaults to False.
+
+        Returns:
+            List[Optional[TransactionStatus]]: The statuses in the same order as the signatures, None for the
+                signatures the node does not know (not processed yet, or dropped).
+    """
+    if not signatures:
+        return []
+
+    semaphore = asyncio.Semaphore(SOLANA_MAX_CONCURRENT_REQUESTS)
+
+    async def fetch_statuses(node_client: AsyncClient) -> List[Optional[TransactionStatus]]:
+        async def fetch_chunk(chunk: List[str]) -> List[Optional[TransactionStatus]]:
+            async with semaphore:
+                response = await node_client.get_signature_statuses(
+                    [Signature.from_string(signature) for signature in chunk], search_transaction_history
+                )
+            return list(response.value)
+
+        chunk_results = await asyncio.gather(*[
+            fetch_chunk(chunk) for chunk in chunked(signatures, SOLANA_SIGNATURE_STATUSES_LIMIT)
+        ])
+        return [status for chunk_result in chunk_results for status in chunk_result]
+
+    return await solana_router.call(fetch_statuses, client)
 
 
 def decode_solana_address(encoded_address: str) -> Optional[Any]:
@@ -277,63 +618,230 @@ def decode_solana_address(encoded_address: str) -> Optional[Any]:
         return None
 
 
-async def get_transaction_history(wallet_address: str, transaction_id_before: str | None, transaction_limit: int) -> list[dict]:
+def get_endpoint_uri(client: AsyncClient) -> str:
     """
-        Retrieves transaction history for a given Solana wallet address.
+        Returns the RPC node URL the Solana client is connected to.
 
-        Arguments:
-        wallet_address (str): The Solana wallet address.
+        Args:
+            client (AsyncClient): The Solana client.
 
         Returns:
-        list[dict]: A list of dictionaries representing transactions in JSON format.
+            str: The RPC node URL.
     """
-    try:
-        # # Проверяем, были ли уже получены данные для этого адреса кошелька и время их сохранения
-        # cached_data = transaction_history_cache.get(wallet_address)
-        # if cached_data is not None:
-        #     transaction_history, cache_time = cached_data
-        #     # Проверяем, не истекло ли время действия кеша
-        #     if time.time() - cache_time <= TRANSACTION_HISTORY_CACHE_DURATION:
-        #         # Возвращаем кэшированные данные
-        #         return transaction_history
-
-        # Получение истории транзакций кошелька
-        transaction_history = []
-
-        # Декодируем строку Base58 в байтовый формат
-        pubkey_bytes = base58.b58decode(wallet_address)
-        # Создаем объект Pubkey из байтового представления
-        pubkey = Pubkey(pubkey_bytes)
+    # AsyncClient не предоставляет публичного доступа к адресу узла, поэтому берем его у провайдера
+    return client._provider.endpoint_uri
 
-        try:
-            # Получение истории транзакций для текущего адреса
-            signature_statuses = (
-                # await http_client.get_signatures_for_address(pubkey, limit=TRANSACTION_LIMIT)
-                await http_client.get_signatures_for_address(pubkey, before=transaction_id_before, limit=transaction_limit)
-            ).value
-
-            # Проходим по всем статусам подписей в результате
-            for signature_status in signature_statuses:
-                # Получаем транзакцию по подписи
-                transaction = (await http_client.get_transaction(signature_status.signature)).value
-                # Добавляем полученную транзакцию в историю транзакций
-                transaction_history.append(transaction)
-
-            # Кэшируем полученные данные для последующих запросов
-            # transaction_history_cache[wallet_address] = (transaction_history, time.time())
-
-            # Возвращаем список истории транзакций
-            return transaction_history
-
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 429:
-                # Если получена ошибка "429 Too Many Requests", вернем None
-                return []
+
+async def get_transactions(signatures: List[Signature], client: AsyncClient,
+                           max_concurrent_requests: int = SOLANA_MAX_CONCURRENT_REQUESTS
+                           ) -> List[Optional[EncodedConfirmedTransactionWithStatusMeta]]:
+    """
+        Asynchronously retrieves the transactions for a list of signatures.
+
+        getTransaction calls are packed into JSON-RPC batch requests of SOLANA_TRANSACTION_BATCH_SIZE calls, and at
+        most max_concurrent_requests requests are in flight at once. If the node rejects batch requests, the
+        transactions are requested one by one with the same concurrency limit.
+
+        Args:
+            signatures (List[Signature]): The transaction signatures.
+            client (AsyncClient): The Solana client.
+            max_concurrent_requests (int): The maximum number of concurrent requests to the node.
+
+        Returns:
+            List[Optional[EncodedConfirmedTransactionWithStatusMeta]]: The transactions in the same order as the
+            signatures, None for transactions the node could not return.
+    """
+    if not signatures:
+        return []
+
+    semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+    return await call_with_batch_fallback(
+        get_endpoint_uri(client),
+        lambda: get_transactions_batched(signatures, client, semaphore),
+        lambda: get_transactions_concurrently(signatures, client, semaphore),
+    )
+
+
+async def get_transactions_batched(signatures: List[Signature], client: AsyncClient, semaphore: asyncio.Semaphore
+                                   ) -> List[Optional[EncodedConfirmedTransactionWithStatusMeta]]:
+    """
+        Retrieves transactions with JSON-RPC batch requests of getTransaction calls.
+
+        Args:
+            signatures (List[Signature]): The transaction signatures.
+            client (AsyncClient): The Solana client, its node URL is used for the batch requests.
+            semaphore (asyncio.Semaphore): The semaphore limiting the number of concurrent batch requests.
+
+        Returns:
+            List[Optional[EncodedConfirmedTransactionWithStatusMeta]]: The transactions in signature order.
+
+        Raises:
+            JsonRpcBatchError: If the node rejects batch requests.
+    """
+    node_url = get_endpoint_uri(client)
+
+    async def fetch_chunk(chunk: List[Signature]) -> List[Optional[EncodedConfirmedTransactionWithStatusMeta]]:
+        requests = [build_json_rpc_request(i, "getTransaction", [str(signature), {"encoding": "json"}])
+                    for i, signature in enumerate(chunk)]
+        async with semaphore:
+            responses = await send_json_rpc_batch(node_url, requests)
+
+        transactions = []
+        for signature, response in zip(chunk, responses):
+            if "error" in response:
+                logger.warning(f"getTransaction failed in batch for {signature}: {response['error']}")
+                transactions.append(None)
             else:
-                raise e
+                # Разбираем ответ тем же типом, что использует AsyncClient.get_transaction
+                transactions.append(GetTransactionResp.from_json(json.dumps(response)).value)
+        return transactions
 
-    except Exception as e:
-        detailed_error_traceback = traceback.format_exc()
-        logger.error(
-            f"Failed to get transaction history for Solana wallet {wallet_address}: {e}\n{detailed_error_traceback}")
+    chunk_results = await asyncio.gather(*[
+        fetch_chunk(chunk) for chunk in chunked(signatures, SOLANA_TRANSACTION_BATCH_SIZE)
+    ])
+    return [transaction for chunk_result in chunk_results for transaction in chunk_result]
+
+
+async def get_transactions_concurrently(signatures: List[Signature], client: AsyncClient,
+                                        semaphore: asyncio.Semaphore
+                                        ) -> List[Optional[EncodedConfirmedTransactionWithStatusMeta]]:
+    """
+        Retrieves transactions with single getTransaction requests executed concurrently.
+
+        Args:
+            signatures (List[Signature]): The transaction signatures.
+            client (AsyncClient): The Solana client.
+            semaphore (asyncio.Semaphore): The semaphore limiting the number of concurrent requests.
+
+        Returns:
+            List[Optional[EncodedConfirmedTransactionWithStatusMeta]]: The transactions in signature order.
+    """
+    async def fetch_transaction(signature: Signature) -> Optional[EncodedConfirmedTransactionWithStatusMeta]:
+        async with semaphore:
+            return (await client.get_transaction(signature)).value
+
+    return list(await asyncio.gather(*[fetch_transaction(signature) for signature in signatures]))
+
+
+async def has_transaction_history(wallet_addresses: List[str], client: Optional[AsyncClient] = None) -> List[bool]:
+    """
+        Checks which wallets have at least one transaction.
+
+        getSignaturesForAddress calls with limit 1 are packed into JSON-RPC batch requests of
+        SOLANA_TRANSACTION_BATCH_SIZE calls. If the node rejects batch requests, the addresses are checked one by one
+        with at most SOLANA_MAX_CONCURRENT_REQUESTS requests in flight.
+
+        Args:
+            wallet_addresses (List[str]): The wallet addresses.
+            client (Optional[AsyncClient]): The Solana client. Defaults to the fastest healthy node of solana_router.
+
+        Returns:
+            List[bool]: True for the wallets with transactions, in the same order as the addresses.
+    """
+    if not wallet_addresses:
         return []
+
+    semaphore = asyncio.Semaphore(SOLANA_MAX_CONCURRENT_REQUESTS)
+
+    async def check_batched(node_client: AsyncClient) -> List[bool]:
+        node_url = get_endpoint_uri(node_client)
+
+        async def fetch_chunk(chunk: List[str]) -> List[bool]:
+            requests = [build_json_rpc_request(i, "getSignaturesForAddress", [address, {"limit": 1}])
+                        for i, address in enumerate(chunk)]
+            async with semaphore:
+                responses = await send_json_rpc_batch(node_url, requests)
+            errors = [response["error"] for response in responses if "error" in response]
+            if errors:
+                raise Exception(f"getSignaturesForAddress failed in batch: {errors[0]}")
+            return [bool(response["result"]) for response in responses]
+
+        chunk_results = await asyncio.gather(*[
+            fetch_chunk(chunk) for chunk in chunked(wallet_addresses, SOLANA_TRANSACTION_BATCH_SIZE)
+        ])
+        return [has_history for chunk_result in chunk_results for has_history in chunk_result]
+
+    async def check_concurrently(node_client: AsyncClient) -> List[bool]:
+        async def fetch_signature(address: str) -> bool:
+            async with semaphore:
+                response = await node_client.get_signatures_for_address(Pubkey.from_string(address), limit=1)
+            return bool(response.value)
+
+        return list(await asyncio.gather(*[fetch_signature(address) for address in wallet_addresses]))
+
+    return await solana_router.call(
+        lambda node_client: call_with_batch_fallback(get_endpoint_uri(node_client),
+                                                     lambda: check_batched(node_client),
+                                                     lambda: check_concurrently(node_client)),
+        client,
+    )
+
+
+async def get_signatures_page(pubkey: Pubkey, before: Signature | str | None, until: Signature | str | None,
+                              limit: int | None, client: AsyncClient) -> List[RpcConfirmedTransactionStatusWithSignature]:
+    """
+        Retrieves one page of getSignaturesForAddress.
+
+        Concurrent requests for the same page (for example, a double tap or the background indexer racing a user)
+        share one in-flight RPC call.
+
+        Args:
+            pubkey (Pubkey): The wallet public key.
+            before (Signature | str | None): The signature to start searching backwards from.
+            until (Signature | str | None): The signature to stop searching at.
+            limit (int | None): The maximum number of signatures in the page.
+            client (AsyncClient): The Solana client.
+
+        Returns:
+            List[RpcConfirmedTransactionStatusWithSignature]: The signature statuses, newest first.
+    """
+    if isinstance(before, str):
+        before = Signature.from_string(before)
+    if isinstance(until, str):
+        until = Signature.from_string(until)
+
+    response = await rpc_single_flight.do(
+        ("getSignaturesForAddress", str(pubkey), str(before) if before else None, str(until) if until else None, limit),
+        lambda: client.get_signatures_for_address(pubkey, before=before, until=until, limit=limit),
+    )
+    logger.debug(f"RPC single-flight stats: {rpc_single_flight.stats()}")
+    return list(response.value)
+
+
+async def get_signatures_until(wallet_address: str, transaction_id_until: str | None, limit: int | None,
+                               client: AsyncClient) -> List[RpcConfirmedTransactionStatusWithSignature]:
+    """
+        Retrieves the signatures of the wallet transactions that are newer than the given signature.
+
+        Pages through getSignaturesForAddress with the `until` parameter, so only transactions after the
+        high-water mark are returned. A wallet without new transactions costs a single RPC call.
+
+        Args:
+            wallet_address (str): The Solana wallet address.
+            transaction_id_until (str | None): The newest already known signature, None to start from the newest.
+            limit (int | None): The maximum number of signatures to return, None for all signatures after the mark.
+            client (AsyncClient): The Solana client.
+
+        Returns:
+            List[RpcConfirmedTransactionStatusWithSignature]: The signature statuses, newest first.
+    """
+    pubkey = Pubkey.from_string(wallet_address)
+    until = Signature.from_string(transaction_id_until) if transaction_id_until else None
+    before = None
+    signature_statuses = []
+
+    while True:
+        page_limit = SOLANA_SIGNATURES_PAGE_LIMIT
+        if limit is not None:
+            page_limit = min(page_limit, limit - len(signature_statuses))
+
+        page = await get_signatures_page(pubkey, before, until, page_limit, client)
+        signature_statuses += page
+
+        # Неполная страница означает, что более новых подписей не осталось
+        if len(page) < page_limit or (limit is not None and len(signature_statuses) >= limit):
+            return signature_statuses
+
+        # Продолжаем листать назад от самой старой полученной подписи
+        before = page[-1].signature
@@ -0,0 +1,295 @@
+# solana-webwallet/external_services/solana/subscriptions.py
+
+import asyncio
+import itertools
+import json
+import math
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+import websockets
+from solana.rpc.types import DataSliceOpts
+from solders.pubkey import Pubkey
+
+from config_data.config import (SOLANA_WS_URL, SOLANA_WS_RECONNECT_DELAY, SOLANA_WS_MAX_RECONNECT_DELAY,
+                                SOLANA_WS_RESYNC_INTERVAL, SOLANA_MULTIPLE_ACCOUNTS_LIMIT, LAMPORT_TO_SOL_RATIO)
+from external_services.cache import balance_cache, transaction_history_cache
+from external_services.solana.solana import solana_router
+from logger_config import logger
+from utils.batching import chunked
+
+
+class AccountSubscriptionManager:
+    """
+        Keeps the balances of tracked Solana wallets up to date over one multiplexed WebSocket connection.
+
+        Every tracked address gets an accountSubscribe subscription. Account notifications update the balance cache
+        and drop the cached history pages of the wallet.
+        While the connection is up, the balances of subscribed wallets stay fresh in the balance cache, so they are
+        served without RPC calls. After a disconnect the cached balances are invalidated, the connection is
+        re-established with exponential backoff and all addresses are subscribed again.
+
+        Attributes:
+            ws_url (str): The WebSocket URL of the Solana node.
+            commitment (str): The commitment level of the notifications.
+            reconnect_delay (float): The initial pause before reconnecting in seconds.
+            max_reconnect_delay (float): The maximum pause before reconnecting in seconds.
+            resync_interval (float): The pause between reloads of the tracked addresses in seconds.
+    """
+
+    def __init__(self, ws_url: str = SOLANA_WS_URL, commitment: str = "confirmed",
+                 reconnect_delay: float = SOLANA_WS_RECONNECT_DELAY,
+                 max_reconnect_delay: float = SOLANA_WS_MAX_RECONNECT_DELAY,
+                 resync_interval: float = SOLANA_WS_RESYNC_INTERVAL) -> None:
+        """
+            Initializes the manager.
+
+            Args:
+                ws_url (str): The WebSocket URL of the Solana node. Defaults to SOLANA_WS_URL.
+                commitment (str): The commitment level of the notifications. Defaults to "confirmed".
+                reconnect_delay (float): The initial pause before reconnecting in seconds.
+                    Defaults to SOLANA_WS_RECONNECT_DELAY.
+                max_reconnect_delay (float): The maximum pause before reconnecting in seconds.
+                    Defaults to SOLANA_WS_MAX_RECONNECT_DELAY.
+                resync_interval (float): The pause between reloads of the tracked addresses in seconds.
+                    Defaults to SOLANA_WS_RESYNC_INTERVAL.
+        """
+        self.ws_url = ws_url
+        self.commitment = commitment
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.resync_interval = resync_interval
+        self._tracked: Set[str] = set()
+        # id подписки -> адрес кошелька и обратное соответствие
+        self._subscriptions: Dict[int, str] = {}
+        self._subscription_ids: Dict[str, int] = {}
+        # id запроса accountSubscribe, ожидающего ответа -> адрес кошелька
+        self._pending: Dict[int, str] = {}
+        # Слот последнего уведомления по адресу: не даем устаревшему ответу HTTP-запроса перезаписать баланс
+        self._last_slots: Dict[str, int] = {}
+        self._request_ids = itertools.count(1)
+        self._ws: Optional[websockets.WebSocketClientProtocol] = None
+        self._on_account_change: Optional[Callable[[str], None]] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_connected(self) -> bool:
+        """
+            Returns True if the WebSocket connection is open.
+        """
+        return self._ws is not None and self._ws.open
+
+    def is_subscribed(self, wallet_address: str) -> bool:
+        """
+            Checks whether the wallet balance is pushed by an active subscription.
+
+            Args:
+                wallet_address (str): The wallet address.
+
+            Returns:
+                bool: True if the wallet has an active subscription.
+        """
+        return self.is_connected and wallet_address in self._subscription_ids
+
+    async def track(self, wallet_address: str) -> None:
+        """
+            Starts tracking the wallet, subscribing to it right away if the connection is open.
+
+            Args:
+                wallet_address (str): The wallet address.
+        """
+        if wallet_address in self._tracked:
+            return
+        self._tracked.add(wallet_address)
+        if self.is_connected:
+            await self._subscribe(wallet_address)
+            await self._seed_balances([wallet_address])
+
+    async def untrack(self, wallet_address: str) -> None:
+        """
+            Stops tracking the wallet and cancels its subscription.
+
+            Args:
+                wallet_address (str): The wallet address.
+        """
+        self._tracked.discard(wallet_address)
+        self._last_slots.pop(wallet_address, None)
+        subscription_id = self._subscription_ids.pop(wallet_address, None)
+        if subscription_id is not None:
+            self._subscriptions.pop(subscription_id, None)
+            if self.is_connected:
+                await self._send("accountUnsubscribe", [subscription_id])
+        # Баланс больше не обновляется уведомлениями
+        balance_cache.invalidate('solana', wallet_address)
+
+    async def sync_tracked(self, wallet_addresses: Iterable[str]) -> None:
+        """
+            Makes the set of tracked wallets equal to the given addresses.
+
+            Args:
+                wallet_addresses (Iterable[str]): The addresses that should be tracked.
+        """
+        wallet_addresses = set(wallet_addresses)
+        for wallet_address in self._tracked - wallet_addresses:
+            await self.untrack(wallet_address)
+        new_addresses = wallet_addresses - self._tracked
+        self._tracked.update(new_addresses)
+        if new_addresses and self.is_connected:
+            for wallet_address in new_addresses:
+                await self._subscribe(wallet_address)
+            await self._seed_balances(list(new_addresses))
+
+    def start(self, address_loader: Optional[Callable[[], Awaitable[Iterable[str]]]] = None,
+              on_account_change: Optional[Callable[[str], None]] = None) -> None:
+        """
+            Starts the connection loop and, if a loader is given, the periodic reload of tracked addresses.
+
+            Args:
+                address_loader (Optional[Callable[[], Awaitable[Iterable[str]]]]): The function returning the
+                    addresses of the wallets to track, for example all Solana wallets from the database.
+                on_account_change (Optional[Callable[[str], None]]): Called with the wallet address on every account
+                    notification, for example to mark the stored history of the wallet as outdated.
+        """
+        if self._tasks:
+            return
+        self._on_account_change = on_account_change
+        self._tasks.append(asyncio.create_task(self._run()))
+        if address_loader is not None:
+            self._tasks.append(asyncio.create_task(self._resync(address_loader)))
+        logger.info(f"Solana account subscriptions started: {self.ws_url}")
+
+    async def stop(self) -> None:
+        """
+            Stops all background tasks and closes the connection.
+        """
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        logger.info("Solana account subscriptions stopped")
+
+    async def _send(self, method: str, params: List[Any]) -> int:
+        request_id = next(self._request_ids)
+        await self._ws.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+        return request_id
+
+    async def _subscribe(self, wallet_address: str) -> None:
+        request_id = await self._send(
+            "accountSubscribe", [wallet_address, {"encoding": "base64", "commitment": self.commitment}]
+        )
+        self._pending[request_id] = wallet_address
+
+    async def _seed_balances(self, wallet_addresses: List[str]) -> None:
+        # accountSubscribe присылает только изменения, поэтому начальные балансы запрашиваем один раз по HTTP.
+        # Подписка оформляется до запроса, так что изменения между запросом и подпиской не теряются.
+        data_slice = DataSliceOpts(offset=0, length=0)
+        for chunk in chunked(wallet_addresses, SOLANA_MULTIPLE_ACCOUNTS_LIMIT):
+            pubkeys = [Pubkey.from_string(wallet_address) for wallet_address in chunk]
+            response = await solana_router.call(
+                lambda node_client: node_client.get_multiple_accounts(pubkeys, commitment=self.commitment,
+                                                                      data_slice=data_slice)
+            )
+            for wallet_address, account in zip(chunk, response.value):
+                lamports = account.lamports if account is not None else 0
+                self._update_balance(wallet_address, lamports, response.context.slot)
+
+    async def _seed_balances_safely(self, wallet_addresses: List[str]) -> None:
+        # Без начальных балансов кэш запросит их сам при первом обращении, поэтому ошибку только логируем
+        try:
+            await self._seed_balances(wallet_addresses)
+        except Exception as e:
+            detailed_error_traceback = traceback.format_exc()
+            logger.error(f"Failed to fetch initial Solana balances: {e}\n{detailed_error_traceback}")
+
+    def _update_balance(self, wallet_address: str, lamports: int, slot: int) -> None:
+        if wallet_address not in self._tracked or slot < self._last_slots.get(wallet_address, 0):
+            return
+        self._last_slots[wallet_address] = slot
+        # Пока подписка подтверждена узлом, баланс обновляется уведомлениями и не устаревает. До подтверждения
+        # подписки баланс живет обычное время кэша.
+        ttl = math.inf if wallet_address in self._subscription_ids else None
+        balance_cache.set('solana', wallet_address, lamports / LAMPORT_TO_SOL_RATIO, ttl=ttl)
+
+    def _handle_message(self, message: Dict[str, Any]) -> None:
+        # Ответ на accountSubscribe: запоминаем id подписки
+        if "id" in message:
+            wallet_address = self._pending.pop(message["id"], None)
+            if wallet_address is None:
+                return
+            if "error" in message:
+                logger.error(f"Failed to subscribe to Solana account {wallet_address}: {message['error']}")
+                # Уведомлений по кошельку не будет - баланс снова запрашивается по HTTP
+                balance_cache.invalidate('solana', wallet_address)
+            elif wallet_address in self._tracked:
+                self._subscriptions[message["result"]] = wallet_address
+                self._subscription_ids[wallet_address] = message["result"]
+            return
+
+        # Уведомление об изменении аккаунта
+        if message.get("method") == "accountNotification":
+            params = message["params"]
+            wallet_address = self._subscriptions.get(params["subscription"])
+            if wallet_address is None:
+                return
+            result = params["result"]
+            self._update_balance(wallet_address, result["value"]["lamports"], result["context"]["slot"])
+            # Баланс изменился - значит, появилась новая транзакция
+            transaction_history_cache.invalidate(wallet_address)
+            if self._on_account_change is not None:
+                self._on_account_change(wallet_address)
+            logger.debug(f"Solana account {wallet_address} changed at slot {result['context']['slot']}")
+
+    def _reset_subscriptions(self) -> None:
+        # После разрыва соединения подписки недействительны, а балансы больше не обновляются
+        self._ws = None
+        self._subscriptions.clear()
+        self._subscription_ids.clear()
+        self._pending.clear()
+        self._last_slots.clear()
+        balance_cache.invalidate('solana', *self._tracked)
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self.ws_url, max_size=None) as ws:
+                    self._ws = ws
+                    delay = self.reconnect_delay
+                    logger.info(f"Connected to {self.ws_url}, subscribing to {len(self._tracked)} accounts")
+                    tracked_addresses = list(self._tracked)
+                    for wallet_address in tracked_addresses:
+                        await self._subscribe(wallet_address)
+                    seed_task = asyncio.create_task(self._seed_balances_safely(tracked_addresses))
+                    try:
+                        async for raw_message in ws:
+                            self._handle_message(json.loads(raw_message))
+                    finally:
+                        seed_task.cancel()
+            except asyncio.CancelledError:
+                self._reset_subscriptions()
+                raise
+            except Exception as e:
+                logger.warning(f"Solana WebSocket connection lost: {e!r}, reconnecting in {delay} s")
+            self._reset_subscriptions()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _resync(self, address_loader: Callable[[], Awaitable[Iterable[str]]]) -> None:
+        # Периодически сверяем отслеживаемые адреса с базой данных: новые кошельки подписываются, удаленные - нет
+        while True:
+            try:
+                await self.sync_tracked(await address_loader())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detailed_error_traceback = traceback.format_exc()
+                logger.error(f"Failed to resync Solana account subscriptions: {e}\n{detailed_error_traceback}")
+            await asyncio.sleep(self.resync_interval)
+
+
+# Экземпляр менеджера подписок, запускаемый вместе с ботом
+account_subscription_manager = AccountSubscriptionManager()
@@ -0,0 +1,122 @@
+# solana-webwallet/external_services/transport.py
+
+from typing import List, Optional
+
+import aiohttp
+import httpx
+from solana.rpc.async_api import AsyncClient
+from web3.providers.async_rpc import AsyncHTTPProvider
+
+from config_data.config import (RPC_MAX_CONNECTIONS, RPC_MAX_KEEPALIVE_CONNECTIONS, RPC_KEEPALIVE_EXPIRY, RPC_HTTP2,
+                                timeout_settings)
+from logger_config import logger
+
+# HTTP/2 в httpx доступен только при установленном пакете h2
+try:
+    import h2  # noqa: F401
+    http2_available = True
+except ImportError:
+    http2_available = False
+
+
+class RpcTransport:
+    """
+        Shared HTTP transport of all RPC clients.
+
+        The Solana client and the JSON-RPC batch requests share one pooled httpx client, web3 gets one pooled aiohttp
+        session. Connections are kept alive between requests, so TLS handshakes are paid once per connection instead of
+        once per request.
+
+        Attributes:
+            max_connections (int): The maximum number of open connections.
+            max_keepalive_connections (int): The maximum number of idle connections kept in the pool.
+            keepalive_expiry (float): The time in seconds an idle connection is kept open.
+            http2 (bool): True if the httpx client uses HTTP/2.
+            session (httpx.AsyncClient): The shared httpx client.
+    """
+
+    def __init__(self, max_connections: int = RPC_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = RPC_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = RPC_KEEPALIVE_EXPIRY, http2: bool = RPC_HTTP2) -> None:
+        """
+            Initializes the transport and its httpx client.
+
+            Args:
+                max_connections (int): The maximum number of open connections. Defaults to RPC_MAX_CONNECTIONS.
+                max_keepalive_connections (int): The maximum number of idle connections kept in the pool.
+                    Defaults to RPC_MAX_KEEPALIVE_CONNECTIONS.
+                keepalive_expiry (float): The time in seconds an idle connection is kept open.
+                    Defaults to RPC_KEEPALIVE_EXPIRY.
+                http2 (bool): Whether to use HTTP/2 when the h2 package is installed. Defaults to RPC_HTTP2.
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        if http2 and not http2_available:
+            logger.warning("HTTP/2 is disabled for RPC requests: the h2 package is not installed")
+        self.http2 = http2 and http2_available
+        self.session = httpx.AsyncClient(
+            timeout=timeout_settings,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=self.http2,
+        )
+        # Сессия aiohttp создается при запуске бота: ей нужен работающий цикл событий
+        self.aiohttp_session: Optional[aiohttp.ClientSession] = None
+        self._web3_providers: List[AsyncHTTPProvider] = []
+
+    def attach_solana_client(self, client: AsyncClient) -> AsyncClient:
+        """
+            Makes the Solana client send its requests through the shared httpx client.
+
+            Args:
+                client (AsyncClient): The Solana RPC client.
+
+            Returns:
+                AsyncClient: The same client.
+        """
+        # solana-py не позволяет передать свой HTTP-клиент в конструктор, поэтому заменяем его у провайдера
+        client._provider.session = self.session
+        return client
+
+    def attach_web3_provider(self, provider: AsyncHTTPProvider) -> AsyncHTTPProvider:
+        """
+            Registers the web3 provider to get the shared aiohttp session at startup.
+
+            Args:
+                provider (AsyncHTTPProvider): The web3 HTTP provider.
+
+            Returns:
+                AsyncHTTPProvider: The same provider.
+        """
+        self._web3_providers.append(provider)
+        return provider
+
+    async def startup(self) -> None:
+        """
+            Opens the shared aiohttp session and hands it to the registered web3 providers.
+        """
+        if self.aiohttp_session is None or self.aiohttp_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_expiry)
+            # raise_for_status=True - как у сессии, которую web3 создает по умолчанию
+            self.aiohttp_session = aiohttp.ClientSession(connector=connector, raise_for_status=True)
+        for provider in self._web3_providers:
+            await provider.cache_async_session(self.aiohttp_session)
+        logger.info(f"RPC transport started (max connections: {self.max_connections}, HTTP/2: {self.http2})")
+
+    async def shutdown(self) -> None:
+        """
+            Closes all pooled connections.
+        """
+        await self.session.aclose()
+        if self.aiohttp_session is not None:
+            await self.aiohttp_session.close()
+            self.aiohttp_session = None
+        logger.info("RPC transport stopped")
+
+
+# Общий транспорт для всех RPC-клиентов приложения
+rpc_transport = RpcTransport()
@@ -19,22 +19,16 @@ from keyboards.back_keyboard import back_keyboard
 from keyboards.main_keyboard import main_keyboard
 from lexicon.lexicon_en import LEXICON
 from logger_config import logger
+from services.user_repository import user_repository
 from states.states import FSMWallet
 from utils.validators import is_valid_wallet_name, is_valid_wallet_description
 
 ########### django #########
-from django.contrib.auth import get_user_model
 from applications.wallet.models import Wallet, Blockchain
-from asgiref.sync import sync_to_async
+from utils.db_executor import database_sync_to_async
 
 
-@sync_to_async
-def get_user(telegram_id):
-    User = get_user_model()
-    user = User.objects.filter(telegram_id=telegram_id).first()
-    return user
-
-@sync_to_async
+@database_sync_to_async
 def create_wallet(user, wallet_address, name, description, blockchain):
     print("**** blockchain:", blockchain)
     if blockchain == 'bsc':
@@ -83,11 +77,7 @@ async def process_connect_wallet_address(message: Message, state: FSMContext) ->
             # Проверяем валидность адреса кошелька
             if is_valid_wallet_address(wallet_address):
                 # Обновляем данные состояния с адресом кошелька
-                user = await get_user(telegram_id=message.from_user.id)
-                user_wallets = []
-
-                async for w in Wallet.objects.filter(user=user):
-                    user_wallets.append(w.wallet_address)
+                user_wallets = await user_repository.get_wallet_addresses(telegram_id=message.from_user.id)
 
                 if wallet_address in user_wallets:
                     await message.answer(LEXICON["this_wallet_already_exists"].format(wallet_address=wallet_address))
@@ -107,11 +97,7 @@ async def process_connect_wallet_address(message: Message, state: FSMContext) ->
             # Проверяем валидность адреса кошелька
             if is_valid_bsc_wallet_address(wallet_address):
                 # Обновляем данные состояния с адресом кошелька
-                user = await get_user(telegram_id=message.from_user.id)
-                user_wallets = []
-
-                async for w in Wallet.objects.filter(user=user):
-                    user_wallets.append(w.wallet_address)
+                user_wallets = await user_repository.get_wallet_addresses(telegram_id=message.from_user.id)
 
                 if wallet_address in user_wallets:
                     await message.answer(LEXICON["this_wallet_already_exists"].format(wallet_address=wallet_address))
@@ -218,7 +204,7 @@ async def process_connect_wallet_description(message: Message, state: FSMContext
         # Извлекаем блокчейн из данных
         blockchain = data.get("blockchain")
 
-        user = await get_user(telegram_id=message.from_user.id)
+        user = await user_repository.get_user(telegram_id=message.from_user.id)
 
         wallet = await create_wallet(
             user=user,
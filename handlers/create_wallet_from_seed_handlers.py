@@ -1,6 +1,5 @@
 # solana_wallet_telegram_bot/handlers/create_wallet_handlers.py
 
-import mnemonic
 import traceback
 
 from aiogram import Router
@@ -8,9 +7,6 @@ from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 # from sqlalchemy import select
-from solders.keypair import Keypair
-from web3 import Web3, AsyncWeb3
-from eth_account import Account
 
 # from database.database import get_db
 from config_data.config import CURRENT_BLOCKCHAIN
@@ -18,50 +14,13 @@ from keyboards.back_keyboard import back_keyboard
 from keyboards.main_keyboard import main_keyboard
 from lexicon.lexicon_en import LEXICON
 from logger_config import logger
+from services.hd_account_scanner import derive_account, register_hd_accounts, scan_hd_accounts
+from services.user_repository import user_repository
 from states.states import FSMWallet
+from utils.crypto_executor import crypto_executor
+from utils.key_derivation import mnemonic_to_seed
 from utils.validators import is_valid_wallet_name, is_valid_wallet_description, is_valid_wallet_seed_phrase
 
-########### django #########
-from django.contrib.auth import get_user_model
-from applications.wallet.models import Wallet, Blockchain
-from asgiref.sync import sync_to_async
-
-
-@sync_to_async
-def get_user(telegram_id):
-    User = get_user_model()
-    user = User.objects.filter(telegram_id=telegram_id).first()
-    return user
-
-
-@sync_to_async
-def create_wallet(user, name, description, wallet_address, derivation_path, blockchain):
-    print("****** blockchain:", blockchain)
-    if blockchain == 'bsc':
-        blockchain_choices = Blockchain.BINANCE_SMART_CHAIN
-        user.last_bsc_derivation_path = derivation_path
-        user.save()
-
-    elif blockchain == 'solana':
-        blockchain_choices = Blockchain.SOLANA
-        user.last_solana_derivation_path = derivation_path
-        user.save()
-
-    wallet = Wallet.objects.create(
-        wallet_address=wallet_address,
-        name=name,
-        description=description,
-        blockchain=blockchain_choices,
-        derivation_path=derivation_path,
-    )
-
-    if wallet:
-        wallet.user.set([user])
-
-    return wallet
-
-############################
-
 # Инициализируем роутер уровня модуля
 create_wallet_from_seed_router: Router = Router()
 
@@ -204,87 +163,51 @@ async def process_wallet_description(message: Message, state: FSMContext) -> Non
         seed_phrase = data.get("seed_phrase")
         name = data.get("wallet_name")
         description = data.get("description")
-        index = 0
         blockchain = CURRENT_BLOCKCHAIN
 
-        user = await get_user(telegram_id=message.from_user.id)
-
-        user_wallets = []
-
-        async for w in Wallet.objects.filter(user=user):
-            user_wallets.append(w.wallet_address)
-
-        if blockchain == 'solana':
-            if user.last_solana_derivation_path:
-                derivation_path = user.last_solana_derivation_path
-                list_from_derivation_path = derivation_path.split('/')
-                last_el = list_from_derivation_path[-1]
-                index = int(last_el[0]) + 1
-
+        user = await user_repository.get_user(telegram_id=message.from_user.id)
+        user_wallets = await user_repository.get_wallet_addresses(telegram_id=message.from_user.id)
+
+        # Получение seed из мнемонической фразы (PBKDF2) выполняется в пуле, чтобы не блокировать цикл событий
+        seed = await crypto_executor.run(mnemonic_to_seed, seed_phrase)
+        first_account = await derive_account(seed, blockchain, 0)
+
+        # Находим все использованные аккаунты мнемонической фразы (BIP-44 gap limit)
+        active_accounts = await scan_hd_accounts(seed, blockchain)
+        new_accounts = [account for account in active_accounts if account.wallet_address not in user_wallets]
+
+        if new_accounts:
+            # Регистрируем все найденные аккаунты разом
+            wallets = await register_hd_accounts(user, blockchain, first_account.wallet_address, name, description,
+                                                 new_accounts)
+            await message.answer(
+                LEXICON["wallets_restored_from_seed"].format(
+                    count=len(wallets),
+                    wallets="\n".join(LEXICON["restored_wallet"].format(wallet_name=wallet.name,
+                                                                         wallet_address=wallet.wallet_address,
+                                                                         derivation_path=wallet.derivation_path)
+                                      for wallet in wallets),
+                ))
+        else:
+            # Новых использованных аккаунтов нет - создаем следующий после последнего использованного
+            index = active_accounts[-1].index + 1 if active_accounts else 0
             while True:
-                derivation_path = f"m/44'/501'/0'/{index}'"
-
-                mnemo = mnemonic.Mnemonic("english")
-                seed = mnemo.to_seed(seed_phrase, passphrase="")
-                keypair = Keypair.from_seed_and_derivation_path(seed, derivation_path)
-                wallet_address = str(keypair.pubkey())
-                private_key = keypair.secret().hex()
-
-                if wallet_address not in user_wallets:
-                    break
-                else:
-                    index += 1
-
-        if blockchain == 'bsc':
-            if user.last_bsc_derivation_path:
-                derivation_path = user.last_bsc_derivation_path
-                list_from_derivation_path = derivation_path.split('/')
-                last_el = list_from_derivation_path[-1]
-                index = int(last_el[0]) + 1
-
-            w3 = AsyncWeb3()
-            # The use of the Mnemonic features of Account is disabled by default until its API stabilizes.
-            # To use these features, please enable them by running `Account.enable_unaudited_hdwallet_features()` and try again.
-            Account.enable_unaudited_hdwallet_features()
-            #TODO: BNB 24-word mnemonic and derivation path: https://docs.bnbchain.org/docs/learn/genesis/
-            # we use 12-word
-
-            while True:
-                derivation_path = f"m/44'/60'/0'/0/{index}"
-
-                acct = Account.from_mnemonic(
-                    mnemonic=seed_phrase,
-                    passphrase='',
-                    account_path=derivation_path,
-                )
-
-                wallet_address = acct.address
-                private_key = w3.to_hex(acct.key)
-
-                if wallet_address not in user_wallets:
+                account = await derive_account(seed, blockchain, index)
+                if account.wallet_address not in user_wallets:
                     break
-                else:
-                    index += 1
-
-        wallet = await create_wallet(
-            user=user,
-            name=name,
-            description=description,
-            wallet_address=wallet_address,
-            derivation_path=derivation_path,
-            blockchain=blockchain,
-        )
-
-        if wallet:
-            await state.update_data(sender_address=wallet.wallet_address, sender_private_key=private_key)
-
-        # Если адреса кошелька нет, выводим сообщение об успешном создании и возвращаемся в главное меню
-        await message.answer(
-            LEXICON["wallet_created_successfully"].format(wallet_name=wallet.name,
-                                                          wallet_description=wallet.description,
-                                                          wallet_address=wallet.wallet_address,
-                                                          private_key=private_key,
-                                                          seed_phrase=seed_phrase))
+                index += 1
+
+            wallet, = await register_hd_accounts(user, blockchain, first_account.wallet_address, name, description,
+                                                 [account])
+            await state.update_data(sender_address=wallet.wallet_address, sender_private_key=account.private_key)
+
+            # Если адреса кошелька нет, выводим сообщение об успешном создании и возвращаемся в главное меню
+            await message.answer(
+                LEXICON["wallet_created_successfully"].format(wallet_name=wallet.name,
+                                                              wallet_description=wallet.description,
+                                                              wallet_address=wallet.wallet_address,
+                                                              private_key=account.private_key,
+                                                              seed_phrase=seed_phrase))
         # Очищаем состояние после добавления кошелька
         await state.clear()
         # Отправляем сообщение с предложением продолжить и клавиатурой основного меню
@@ -15,23 +15,17 @@ from keyboards.main_keyboard import main_keyboard
 from lexicon.lexicon_en import LEXICON
 from logger_config import logger
 from states.states import FSMWallet
+from services.user_repository import user_repository
 from utils.validators import is_valid_wallet_name, is_valid_wallet_description
 from external_services.solana.solana import create_solana_wallet, is_valid_wallet_address
 from external_services.binance_smart_chain.bsc import create_bsc_wallet
 
 ########### django #########
-from django.contrib.auth import get_user_model
 from applications.wallet.models import Wallet, HDWallet, Blockchain
-from asgiref.sync import sync_to_async
+from utils.db_executor import database_sync_to_async
 
 
-@sync_to_async
-def get_user(telegram_id):
-    User = get_user_model()
-    user = User.objects.filter(telegram_id=telegram_id).first()
-    return user
-
-@sync_to_async
+@database_sync_to_async
 def create_wallet(user, wallet_address, name, description, derivation_path, blockchain):
     print("****** blockchain:", blockchain)
     if blockchain == 'bsc':
@@ -155,7 +149,7 @@ async def process_wallet_description(message: Message, state: FSMContext) -> Non
         # Извлекаем описание кошелька из данных
         description = data.get("description")
 
-        user = await get_user(telegram_id=message.from_user.id)
+        user = await user_repository.get_user(telegram_id=message.from_user.id)
 
         wallet = None
         # Извлекаем блокчейн из данных
@@ -12,22 +12,15 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from keyboards.main_keyboard import main_keyboard
 from lexicon.lexicon_en import LEXICON
 from logger_config import logger
+from services.user_repository import user_repository
 from states.states import FSMWallet
 
 ########### django #########
-from django.contrib.auth import get_user_model
 from applications.wallet.models import Wallet
-from asgiref.sync import sync_to_async
+from utils.db_executor import database_sync_to_async
 
 
-@sync_to_async
-def get_user(telegram_id):
-    User = get_user_model()
-    user = User.objects.filter(telegram_id=telegram_id).first()
-    return user
-
-
-@sync_to_async
+@database_sync_to_async
 def delete_wallet(user, wallet_address):
     wallet = Wallet.objects.filter(user=user, wallet_address=wallet_address).first()
     number_objects_deleted = wallet.delete()
@@ -84,7 +77,7 @@ async def process_delete_wallet_end(callback: CallbackQuery, state: FSMContext)
     try:
         wallet_address = callback.data.split(":")[1]
 
-        user = await get_user(telegram_id=callback.from_user.id)
+        user = await user_repository.get_user(telegram_id=callback.from_user.id)
 
         number_objects_deleted = await delete_wallet(user=user, wallet_address=wallet_address)
 
@@ -1,94 +1,62 @@
 # solana_wallet_telegram_bot/handlers/transaction_handlers.py
 
-import json
 import asyncio
 import traceback
 from decimal import Decimal
+from typing import Optional, Tuple
 
 from aiogram import Router, F
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 
-from external_services.solana.solana import get_transaction_history
 from keyboards.main_keyboard import main_keyboard
+from keyboards.transfer_transaction_keyboards import get_history_page_keyboard
 from lexicon.lexicon_en import LEXICON
 from logger_config import logger
-from services.wallet_service import format_transaction_message, format_transaction_from_db_message
+from services.history_indexer import history_indexer
+from services.history_sync import sync_wallet_history, get_cached_transaction_page, HISTORY_OLDER, HISTORY_NEWER
+from services.user_repository import user_repository
+from services.wallet_service import format_transaction_from_db_message, format_bsc_transaction_from_db_message
 from states.states import FSMWallet
 from config_data.config import SOLANA_NODE_URL, LAMPORT_TO_SOL_RATIO, CURRENT_BLOCKCHAIN
 
 ########### django #########
-from applications.wallet.models import Wallet, Transaction
-from asgiref.sync import sync_to_async
-
-
-@sync_to_async
-def get_transaction_history_from_db(wallet_address):
-    transaction_history_from_db = []
-    wallet = Wallet.objects.filter(wallet_address=wallet_address).first()
-    if wallet:
-        transaction_history_from_db = wallet.transactions.all().order_by('-transaction_time')
-    return transaction_history_from_db
-
-
-@sync_to_async
-def save_transaction(tr):
-    address_list = []
-    wallets = None
-    tr_dict =  json.loads(tr.to_json())
-
-    transaction_id = tr_dict['transaction']['signatures'][0] or ''
-    sender = tr_dict['transaction']['message']['accountKeys'][0] or ''
-    recipient = tr_dict['transaction']['message']['accountKeys'][1] or ''
-    slot = tr_dict['slot'] or None
-    transaction_time = tr_dict['blockTime'] or None
-    transaction_status = f"{tr_dict['meta']['status'] or ''}"
-    transaction_err = f"{tr_dict['meta']['err']  or ''}"
-    pre_balances = tr_dict['meta']['preBalances'][0] or None
-    post_balances = tr_dict['meta']['postBalances'][0] or None
-
-    if sender:
-        address_list.append(sender)
-
-    if recipient:
-        address_list.append(recipient)
+from applications.wallet.models import Wallet
+############################
 
-    if address_list:
-        wallets = Wallet.objects.filter(wallet_address__in=address_list)
+# Инициализируем роутер уровня модуля
+transaction_router: Router = Router()
 
-    if wallets and transaction_id:
-        transaction_obj = Transaction.objects.filter(transaction_id=transaction_id).first()
 
-        if transaction_obj:
-            # if the transaction exists - update the wallets
-            transaction_obj.wallet.set(wallets)
+async def render_history_page(wallet: Wallet, direction: str = HISTORY_OLDER,
+                              cursor: Optional[Tuple[int, int]] = None) -> Tuple[Optional[str], Optional[InlineKeyboardMarkup]]:
+    """
+        Reads a page of the wallet history and formats its transactions.
 
-        else:
-            try:
-                create_transaction_obj = Transaction.objects.create(
-                    transaction_id =transaction_id,
-                    slot=slot,
-                    transaction_time=transaction_time,
-                    sender=sender,
-                    recipient=recipient,
-                    pre_balances=pre_balances,
-                    post_balances=post_balances,
-                    transaction_status=transaction_status,
-                    transaction_err=transaction_err,
-                )
-                create_transaction_obj.wallet.set(wallets)
-            except Exception as er:
-                print(f'Error create transaction: {er}')
-
-    return None
+        Args:
+            wallet (Wallet): The wallet.
+            direction (str): The navigation direction, HISTORY_OLDER or HISTORY_NEWER. Defaults to HISTORY_OLDER.
+            cursor (Optional[Tuple[int, int]]): The key the page starts after. Defaults to None, the newest page.
 
-############################
+        Returns:
+            Tuple[Optional[str], Optional[InlineKeyboardMarkup]]: The page text and its navigation keyboard,
+                None and None if the history is empty.
+    """
+    # История BSC загружается в базу данных фоновым сканером блоков, запрашивать блокчейн не нужно
+    format_message = format_transaction_from_db_message
+    if CURRENT_BLOCKCHAIN == 'bsc':
+        format_message = format_bsc_transaction_from_db_message
 
+    page = await get_cached_transaction_page(wallet, direction, cursor)
+    if not page.transactions:
+        return None, None
 
-# Инициализируем роутер уровня модуля
-transaction_router: Router = Router()
+    # Форматируются только транзакции видимой страницы
+    transaction_messages = await asyncio.gather(*[format_message(tr) for tr in page.transactions])
+    keyboard = get_history_page_keyboard(wallet.pk, page.newer_cursor, page.older_cursor)
+    return '\n\n'.join(transaction_messages), keyboard
 
 
 @transaction_router.callback_query(F.data.startswith("wallet_address:"),
@@ -105,65 +73,26 @@ async def process_choose_transaction_wallet(callback: CallbackQuery, state: FSMC
             None
     """
     try:
-        transaction_history = []
-        tr_from_db_tasks = []
-        transaction_id_before = None
-        transaction_limit = 5
-        transaction_max_limit = 100
-
         # Извлекаем адрес кошелька из callback_data
         wallet_address = callback.data.split(":")[1]
 
-        tr_history_from_db = await get_transaction_history_from_db(wallet_address)
-        tr_from_db_time_list = [tr.transaction_time async for tr in tr_history_from_db]
-
-        if not tr_from_db_time_list:
-            # если в бд нет трансакций то запросим из блокчейна 100 последних
-            transaction_limit = transaction_max_limit
-
-        while transaction_max_limit > 0:
-            transaction_max_limit -= transaction_limit
-
-            if CURRENT_BLOCKCHAIN == 'bsc':
-                pass
-
-            if CURRENT_BLOCKCHAIN == 'solana':
-                # api.devnet.solana.com выдает ошибку при попытке получить историю трансакций
-                if "api.devnet.solana.com" not in SOLANA_NODE_URL:
-                    # Получаем историю транзакций кошелька по его адресу.
-                    transaction_history += await get_transaction_history(wallet_address, transaction_id_before, transaction_limit)
+        # Историю можно открыть только для своего кошелька
+        user_wallets = await user_repository.get_wallets(telegram_id=callback.from_user.id)
+        wallet = next((wallet for wallet in user_wallets if wallet.wallet_address == wallet_address), None)
 
-                if transaction_history:
+        if wallet is not None and CURRENT_BLOCKCHAIN == 'solana':
+            # api.devnet.solana.com выдает ошибку при попытке получить историю трансакций
+            # История кошелька, которую поддерживает фоновый индексатор, читается из базы данных без обращения к RPC
+            if "api.devnet.solana.com" not in SOLANA_NODE_URL and not history_indexer.is_indexed(wallet_address):
+                # Догружаем из блокчейна только транзакции, появившиеся после последней синхронизации
+                await sync_wallet_history(wallet_address)
 
-                    if transaction_history[-1].block_time in tr_from_db_time_list:
-                        el_index = tr_from_db_time_list.index(transaction_history[-1].block_time)
-                        if (el_index + 1) < len(tr_history_from_db):
-                            tr_from_db_tasks = [format_transaction_from_db_message(tr) for tr in tr_history_from_db[el_index + 1:]]
-                        break
+        # Из базы данных читается только первая страница истории
+        page_text, page_keyboard = (None, None) if wallet is None else await render_history_page(wallet)
 
-                    else:
-                        transaction_id_before = transaction_history[-1].transaction.transaction.signatures[0]
-
-        if transaction_history:
-            for tr in transaction_history:
-                await save_transaction(tr)
-
-        if transaction_history or tr_from_db_tasks:
-
-            # Создаем список задач на форматирование сообщений о транзакциях
-            transaction_tasks = [format_transaction_message(transaction) for transaction in transaction_history]
-
-            # if tr_from_db_tasks:
-            transaction_tasks += tr_from_db_tasks
-
-            # Используем asyncio.gather для параллельной обработки транзакций
-            transaction_messages = await asyncio.gather(*transaction_tasks)
-
-            # Объединяем все сообщения в одну строку с разделителем '\n\n'
-            combined_message = '\n\n'.join(transaction_messages)
-
-            # Отправляем объединенное сообщение
-            await callback.message.answer(combined_message)
+        if page_text:
+            # Отправляем первую страницу; кнопки навигации заменяют ее текст в этом же сообщении
+            await callback.message.answer(page_text, reply_markup=page_keyboard)
         else:
             # Отправляем ответ пользователю с сообщением о пустой истории транзакций
             await callback.answer(LEXICON["empty_history"], show_alert=True, reply_markup=None)
@@ -187,3 +116,42 @@ async def process_choose_transaction_wallet(callback: CallbackQuery, state: FSMC
         await state.set_state(default_state)
 
         await callback.answer()
+
+
+@transaction_router.callback_query(F.data.startswith("tx_page:"))
+async def process_history_page(callback: CallbackQuery) -> None:
+    """
+        Handles the "newer" and "older" buttons of a transaction history page.
+
+        The callback data carries the wallet and the page cursor (tx_page:{wallet_id}:{direction}:{time}:{id}), so
+        the page is read without any stored state, and the history message is edited in place.
+
+        Args:
+            callback (CallbackQuery): The callback query object.
+
+        Returns:
+            None
+    """
+    try:
+        _, wallet_id, direction, transaction_time, transaction_id = callback.data.split(":")
+        wallet_id = int(wallet_id)
+        cursor = (int(transaction_time), int(transaction_id))
+
+        # Кнопку могли переслать или подделать: страница показывается только владельцу кошелька
+        user_wallets = await user_repository.get_wallets(telegram_id=callback.from_user.id)
+        wallet = next((wallet for wallet in user_wallets if wallet.pk == wallet_id), None)
+        if wallet is None or direction not in (HISTORY_OLDER, HISTORY_NEWER):
+            await callback.answer(LEXICON["invalid_wallet_choice"], show_alert=True)
+            return
+
+        page_text, page_keyboard = await render_history_page(wallet, direction, cursor)
+        if not page_text:
+            await callback.answer(LEXICON["empty_history"], show_alert=True)
+            return
+
+        await callback.message.edit_text(page_text, reply_markup=page_keyboard)
+        await callback.answer()
+    except Exception as e:
+        detailed_error_traceback = traceback.format_exc()
+        logger.error(f"Error in process_history_page: {e}\n{detailed_error_traceback}")
+        await callback.answer(LEXICON["server_unavailable"], show_alert=True)
@@ -5,15 +5,11 @@ import traceback
 from decimal import Decimal
 
 import solana.rpc.core
-from aiogram import Router, F
+from aiogram import Bot, Router, F
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 # from sqlalchemy import select
-from mnemonic import Mnemonic
-from solders.keypair import Keypair
-from web3 import Web3, AsyncWeb3
-from eth_account import Account
 
 from config_data.config import LAMPORT_TO_SOL_RATIO, WEI_TO_BNB_RATIO, CURRENT_BLOCKCHAIN
 # from database.database import get_db
@@ -21,49 +17,73 @@ from external_services.solana.solana import (
     is_valid_wallet_address,
     is_valid_private_key,
     is_valid_amount,
-    get_sol_balance,
-    http_client,
-    transfer_token,
+    solana_router,
     get_wallet_address_from_private_key,
 )
 from external_services.binance_smart_chain.bsc import (
     is_valid_bsc_wallet_address,
     is_valid_bsc_private_key,
-    get_bnb_balance,
-    bsc_client,
-    bsc_transfer_token,
+    bsc_router,
     get_bsc_wallet_address_from_private_key,
 )
+from external_services.cache import balance_cache
 from keyboards.back_keyboard import back_keyboard
 from keyboards.main_keyboard import main_keyboard
 from lexicon.lexicon_en import LEXICON
 from logger_config import logger
+from services.confirmation_tracker import TrackedTransfer, TRANSFER_CONFIRMED, TRANSFER_FAILED, TRANSFER_EXPIRED
+from services.derivation_discovery import resolve_wallet_from_seed
+from services.transfer_outbox import submit_transfer
 from states.states import FSMWallet
 from utils.validators import is_valid_wallet_seed_phrase
 
 ########### django #########
 from applications.wallet.models import Wallet
-from asgiref.sync import sync_to_async
+from utils.db_executor import database_sync_to_async
 
 
-@sync_to_async
+@database_sync_to_async
 def get_wallet(wallet_address):
     wallet = Wallet.objects.filter(wallet_address=wallet_address).first()
     return wallet
 
-
-@sync_to_async
-def update_wallet(wallet_address, solana_derivation_path):
-    wallet = Wallet.objects.filter(wallet_address=wallet_address).first()
-    wallet.solana_derivation_path = solana_derivation_path
-    wallet.save()
-    return wallet
-
 ############################
 
 # Инициализируем роутер уровня модуля
 transfer_router: Router = Router()
-w3 = AsyncWeb3()
+
+# Сообщения о результате перевода для каждого блокчейна
+TRANSFER_RESULT_MESSAGES = {
+    'solana': {
+        TRANSFER_CONFIRMED: LEXICON["transfer_successful"],
+        TRANSFER_FAILED: LEXICON["transfer_not_successful"],
+        TRANSFER_EXPIRED: LEXICON["transfer_expired"],
+    },
+    'bsc': {
+        TRANSFER_CONFIRMED: LEXICON["transfer_successful_bsc"],
+        TRANSFER_FAILED: LEXICON["transfer_not_successful_bsc"],
+        TRANSFER_EXPIRED: LEXICON["transfer_expired_bsc"],
+    },
+}
+
+
+async def notify_transfer_result(bot: Bot, transfer: TrackedTransfer, result: str) -> None:
+    """
+        Sends the user the result of a transfer tracked by the confirmation tracker.
+
+        Args:
+            bot (Bot): The bot instance.
+            transfer (TrackedTransfer): The finished transfer.
+            result (str): TRANSFER_CONFIRMED, TRANSFER_FAILED or TRANSFER_EXPIRED.
+
+        Returns:
+            None
+    """
+    result_message = TRANSFER_RESULT_MESSAGES[transfer.blockchain][result]
+    await bot.send_message(transfer.chat_id, result_message.format(amount=transfer.amount,
+                                                                   recipient=transfer.recipient_address,
+                                                                   transaction_id=transfer.transaction_id))
+
 
 @transfer_router.callback_query(F.data.startswith("wallet_address:"),
                                 StateFilter(FSMWallet.transfer_choose_sender_wallet))
@@ -132,25 +152,13 @@ async def process_transfer_sender_private_key(message: Message, state: FSMContex
         if blockchain == 'solana':
             if seed_phrase:
                 if is_valid_wallet_seed_phrase(seed_phrase):
-                    mnemo = Mnemonic("english")
-                    seed = mnemo.to_seed(seed_phrase, passphrase="")
-                    if derivation_path:
-                        keypair = Keypair.from_seed_and_derivation_path(seed, derivation_path)
-                        private_key = keypair.secret().hex()
+                    # Путь деривации кошелька ищется один раз и сохраняется, следующие переводы его не ищут
+                    resolved = await resolve_wallet_from_seed(seed_phrase, sender_address, blockchain, derivation_path)
+                    if resolved:
+                        _, private_key = resolved
                     else:
-                        for i in range(100):
-                            derivation_path = f"m/44'/501'/0'/{i}'"
-                            i += 1
-                            keypair = Keypair.from_seed_and_derivation_path(seed, derivation_path)
-                            address = str(keypair.pubkey())
-                            if address == sender_address:
-                                private_key = keypair.secret().hex()
-                                await update_wallet(sender_address, derivation_path, blockchain)
-                                break
-
-                        if not private_key:
-                            logger.error("Could not get the private_key from this seed phrase")
-                            return None
+                        logger.error("Could not get the private_key from this seed phrase")
+                        return None
 
                 else:
                     sent_message = await message.answer(LEXICON["invalid_seed_phrase"], reply_markup=None)
@@ -195,33 +203,13 @@ async def process_transfer_sender_private_key(message: Message, state: FSMContex
         if blockchain == 'bsc':
             if seed_phrase:
                 if is_valid_wallet_seed_phrase(seed_phrase):
-                    if derivation_path:
-                        acct_from_mnemonic = Account.from_mnemonic(
-                            mnemonic=seed_phrase,
-                            passphrase='',
-                            account_path=derivation_path,
-                        )
-
+                    # Путь деривации кошелька ищется один раз и сохраняется, следующие переводы его не ищут
+                    resolved = await resolve_wallet_from_seed(seed_phrase, sender_address, blockchain, derivation_path)
+                    if resolved:
+                        _, private_key = resolved
                     else:
-                        for i in range(100):
-                            derivation_path = f"m/44'/60'/0'/0/{i}"
-                            i += 1
-                            acct_from_mnemonic = Account.from_mnemonic(
-                                mnemonic=seed_phrase,
-                                passphrase='',
-                                account_path=derivation_path,
-                            )
-
-                            address = acct_from_mnemonic.address
-
-                            if address == sender_address:
-                                private_key = w3.to_hex(acct_from_mnemonic.key)
-                                await update_wallet(sender_address, derivation_path, blockchain)
-                                break
-
-                        if not private_key:
-                            logger.error("Could not get the private_key from this seed phrase")
-                            return None
+                        logger.error("Could not get the private_key from this seed phrase")
+                        return None
 
                 else:
                     sent_message = await message.answer(LEXICON["invalid_seed_phrase"], reply_markup=None)
@@ -373,20 +361,24 @@ async def process_transfer_amount(message: Message, state: FSMContext) -> None:
         try:
             if blockchain == 'solana':
                 # Пытаемся получить текущий баланс отправителя.
-                balance = await get_sol_balance(sender_address, http_client)
+                # Баланс используется для проверки суммы перевода, поэтому устаревшее значение из кэша не подходит
+                balance = await balance_cache.get_balance(blockchain, sender_address, allow_stale=False)
                 # Запрашиваем минимальный баланс для аренды освобождения.
                 # Аргумент функции - размер данных в байтах, для которых требуется выделить место в памяти.
-                min_balance_resp = (await http_client.get_minimum_balance_for_rent_exemption(1)).value
+                min_balance_resp = (await solana_router.call(
+                    lambda node_client: node_client.get_minimum_balance_for_rent_exemption(1)
+                )).value
                 # Извлекаем значение минимального баланса из ответа. Min balance: 897840lamports/1000000000 = 0.00089784 Sol
                 min_balance = min_balance_resp / LAMPORT_TO_SOL_RATIO
                 logger.debug(f"Balance: {balance}, Min balance: {min_balance}")
 
             elif blockchain == 'bsc':
                 # Пытаемся получить текущий баланс отправителя.
-                balance = await get_bnb_balance(sender_address, bsc_client)
+                # Баланс используется для проверки суммы перевода, поэтому устаревшее значение из кэша не подходит
+                balance = await balance_cache.get_balance(blockchain, sender_address, allow_stale=False)
                 print('****** bsc balance: ', balance)
                 # Запрашиваем кол-во Wei за единицу газа
-                gas_price = await bsc_client.eth.gas_price
+                gas_price = await bsc_router.call(lambda node_client: node_client.eth.gas_price)
                 print('****** bsc gas_price: ', gas_price)
                 min_balance = gas_price * 2 / WEI_TO_BNB_RATIO
                 logger.debug(f"Blockchain: {blockchain}, Balance: {balance}, Min balance: {min_balance}")
@@ -417,38 +409,24 @@ async def process_transfer_amount(message: Message, state: FSMContext) -> None:
         print(f'**** balance={balance}, amount={amount}, min_balance={min_balance}')
         if balance >= amount + min_balance:
             if blockchain == 'solana':
-                # Выполняем перевод токенов.
-                result = await transfer_token(sender_address,
-                                              sender_private_key,
-                                              recipient_address,
-                                              amount,
-                                              http_client)
-                # Если перевод выполнен успешно, отправляем сообщение об успешном переводе.
-                if result:
-                    # formatted_amount = '{:.6f}'.format(amount)
-                    formatted_amount = '{:.6f}'.format(Decimal(str(amount)))
-                    await message.answer(
-                        LEXICON["transfer_successful"].format(amount=formatted_amount, recipient=recipient_address))
-                # Если перевод не выполнен успешно, отправляем сообщение о неудаче.
-                else:
-                    await message.answer(
-                        LEXICON["transfer_not_successful"].format(amount=amount, recipient=recipient_address))
-
+                # formatted_amount = '{:.6f}'.format(amount)
+                formatted_amount = '{:.6f}'.format(Decimal(str(amount)))
+                submitted_message = LEXICON["transfer_submitted"]
             elif blockchain == 'bsc':
-                result = await bsc_transfer_token(sender_address,
-                                              sender_private_key,
-                                              recipient_address,
-                                              amount,
-                                              bsc_client)
-
-                # Если перевод выполнен успешно, отправляем сообщение об успешном переводе.
-                if result:
-                    await message.answer(
-                        LEXICON["transfer_successful_bsc"].format(amount=amount, recipient=recipient_address))
-                                # Если перевод не выполнен успешно, отправляем сообщение о неудаче.
-                else:
-                    await message.answer(
-                        LEXICON["transfer_not_successful_bsc"].format(amount=amount, recipient=recipient_address))
+                formatted_amount = str(amount)
+                submitted_message = LEXICON["transfer_submitted_bsc"]
+
+            # Выполняем перевод токенов. Подписанная транзакция сохраняется до отправки, перевод возвращается сразу
+            # после отправки, а подтверждение ожидает трекер, который уведомит пользователя о результате
+            transaction_id = await submit_transfer(blockchain,
+                                                   message.chat.id,
+                                                   sender_address,
+                                                   sender_private_key,
+                                                   recipient_address,
+                                                   amount,
+                                                   formatted_amount)
+            await message.answer(submitted_message.format(amount=formatted_amount, recipient=recipient_address,
+                                                          transaction_id=transaction_id))
         # Если баланс отправителя недостаточен для перевода (включая минимальный баланс).
         else:
             # Отправляем пользователю сообщение о недостаточном балансе и запрос на ввод суммы для перевода.
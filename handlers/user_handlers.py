@@ -19,10 +19,10 @@ from config_data.config import SOLANA_NODE_URL, BINANCE_NODE_URL, CURRENT_BLOCKC
 
 ########### django #########
 from django.contrib.auth import get_user_model
-from asgiref.sync import sync_to_async
+from utils.db_executor import database_sync_to_async
 
 
-@sync_to_async
+@database_sync_to_async
 def update_or_create_user(telegram_id, defaults):
     User = get_user_model()
     user, created = User.objects.update_or_create(telegram_id=telegram_id, defaults=defaults)
@@ -1,21 +1,15 @@
 # solana_wallet_telegram_bot/keyboards/transfer_transaction_keyboards.py
 
-import time
-from typing import List, Dict
+from typing import List, Optional, Tuple
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from config_data.config import TRANSACTION_HISTORY_CACHE_DURATION, CURRENT_BLOCKCHAIN
-from external_services.solana.solana import get_sol_balance, http_client
-from external_services.binance_smart_chain.bsc import get_bnb_balance, bsc_client
+from config_data.config import CURRENT_BLOCKCHAIN
+from external_services.cache import balance_cache
 from lexicon.lexicon_en import LEXICON
+from services.history_sync import HISTORY_NEWER, HISTORY_OLDER
 from applications.wallet.models import Wallet
 
-# Создание пустого словаря для кэширования балансов кошельков
-wallet_balances_cache: Dict[str, float] = {}
-# Инициализация времени последнего обновления кэша
-cache_last_updated: float = 0.0
-
 
 async def get_wallet_keyboard(user_wallets: List[Wallet]) -> InlineKeyboardMarkup:
     """
@@ -27,35 +21,20 @@ async def get_wallet_keyboard(user_wallets: List[Wallet]) -> InlineKeyboardMarku
         Returns:
             InlineKeyboardMarkup: The keyboard with wallet buttons.
     """
-    global wallet_balances_cache, cache_last_updated
-
-    # Получаем текущее время
-    current_time = time.time()
-
-    # Проверяем, нужно ли обновить кэш:
-    # Если прошло больше времени, чем TRANSACTION_HISTORY_CACHE_DURATION с момента последнего обновления кэша,
-    # или кэш пустой, то обновляем его
-    if (current_time - cache_last_updated > TRANSACTION_HISTORY_CACHE_DURATION) or not wallet_balances_cache:
-        # Формируем список адресов кошельков пользователя
-        wallet_addresses = [wallet.wallet_address for wallet in user_wallets]
-        # Получаем балансы кошельков асинхронно
-        blockchain = CURRENT_BLOCKCHAIN
-        if blockchain == 'solana':
-            balances = await get_sol_balance(wallet_addresses, http_client)
-        if blockchain == 'bsc':
-            balances = await get_bnb_balance(wallet_addresses, bsc_client)
-        # Создаем словарь с парами "адрес кошелька - баланс" и обновляем кэш балансов
-        wallet_balances_cache = dict(zip(wallet_addresses, balances))
-        # Обновляем время последнего обновления кэша
-        cache_last_updated = current_time
+    # Формируем список адресов кошельков пользователя
+    wallet_addresses = [wallet.wallet_address for wallet in user_wallets]
+    # Получаем балансы кошельков из кэша: из блокчейна запрашиваются только отсутствующие балансы,
+    # устаревшие показываются сразу и обновляются в фоне
+    balances = await balance_cache.get_balances(CURRENT_BLOCKCHAIN, wallet_addresses)
+    wallet_balances = dict(zip(wallet_addresses, balances))
 
     wallet_buttons = []  # Пустой список кнопок
     count = 1  # Инициализация счетчика
 
     # Итерация по кошелькам пользователя
     for wallet in user_wallets:
-        # Получаем баланс из кэша
-        balance = wallet_balances_cache.get(wallet.wallet_address)
+        # Получаем баланс кошелька
+        balance = wallet_balances.get(wallet.wallet_address)
 
         # Форматируем информацию о кошельке с использованием шаблона из лексикона
         wallet_info = LEXICON["wallet_info_template"].format(
@@ -95,3 +74,53 @@ async def get_wallet_keyboard(user_wallets: List[Wallet]) -> InlineKeyboardMarku
 
     # Возвращаем сформированную клавиатуру
     return wallet_keyboard
+
+
+def history_page_callback_data(wallet_id: int, direction: str, cursor: Tuple[int, int]) -> str:
+    """
+        Builds the callback data of a history navigation button: tx_page:{wallet_id}:{direction}:{time}:{id}.
+
+        Args:
+            wallet_id (int): The primary key of the wallet.
+            direction (str): The navigation direction, HISTORY_OLDER or HISTORY_NEWER.
+            cursor (Tuple[int, int]): The (transaction_time, transaction id) key the page starts after.
+
+        Returns:
+            str: The callback data, well under the 64-byte limit of Telegram.
+    """
+    transaction_time, transaction_id = cursor
+    return f"tx_page:{wallet_id}:{direction}:{transaction_time}:{transaction_id}"
+
+
+def get_history_page_keyboard(wallet_id: int, newer_cursor: Optional[Tuple[int, int]],
+                              older_cursor: Optional[Tuple[int, int]]) -> Optional[InlineKeyboardMarkup]:
+    """
+        Function for creating the navigation keyboard of a transaction history page.
+
+        Args:
+            wallet_id (int): The primary key of the wallet.
+            newer_cursor (Optional[Tuple[int, int]]): The key of the first transaction of the page, None on the
+                newest page.
+            older_cursor (Optional[Tuple[int, int]]): The key of the last transaction of the page, None on the
+                oldest page.
+
+        Returns:
+            Optional[InlineKeyboardMarkup]: The keyboard with the "newer" and "older" buttons, None if the history
+                fits in one page.
+    """
+    # Курсор страницы передается в callback_data, поэтому обработчику не нужно хранить состояние просмотра
+    navigation_buttons = []
+    if newer_cursor is not None:
+        navigation_buttons.append(InlineKeyboardButton(
+            text=LEXICON["button_history_newer"],
+            callback_data=history_page_callback_data(wallet_id, HISTORY_NEWER, newer_cursor),
+        ))
+    if older_cursor is not None:
+        navigation_buttons.append(InlineKeyboardButton(
+            text=LEXICON["button_history_older"],
+            callback_data=history_page_callback_data(wallet_id, HISTORY_OLDER, older_cursor),
+        ))
+
+    if not navigation_buttons:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[navigation_buttons])
@@ -65,6 +65,8 @@ CREATE_WALLET_MESSAGE = {
                                    "<b><i>Wallet address:</i> {wallet_address}</b>\n"
                                    "<b><i>Private key:</i> {private_key}</b>\n"
                                    "<b><i>Seed phrase:</i> {seed_phrase}</b>\n",
+    "wallets_restored_from_seed": "🎉 <b>{count} used wallet(s) restored from the seed phrase!</b>\n\n{wallets}",
+    "restored_wallet": "<b><i>{wallet_name}:</i> {wallet_address}</b> <i>({derivation_path})</i>",
     "invalid_wallet_name": "❌ <b>Invalid wallet name entered.</b>\n"
                            "Please enter a valid name for your wallet.",
     "invalid_wallet_description": "❌ <b>Invalid wallet description entered.</b>\n"
@@ -106,6 +108,14 @@ TOKEN_TRANSFER_TRANSACTION_MESSAGE = {
     "transfer_successful_bsc": "<b>✅ Transfer of {amount} BNB to\n\n<i>{recipient}</i>\n\nsuccessful.</b>",
     "transfer_not_successful": "<b>❌ Failed to transfer {amount} SOL to\n\n<i>{recipient}.</i></b>",
     "transfer_not_successful_bsc": "<b>❌ Failed to transfer {amount} BNB to\n\n<i>{recipient}.</i></b>",
+    "transfer_submitted": "<b>⏳ Transfer of {amount} SOL to\n\n<i>{recipient}</i>\n\nsubmitted.</b>\n\n"
+                          "Transaction: <code>{transaction_id}</code>\n<i>You will be notified when it is confirmed.</i>",
+    "transfer_submitted_bsc": "<b>⏳ Transfer of {amount} BNB to\n\n<i>{recipient}</i>\n\nsubmitted.</b>\n\n"
+                              "Transaction: <code>{transaction_id}</code>\n<i>You will be notified when it is confirmed.</i>",
+    "transfer_expired": "<b>⌛ Transfer of {amount} SOL to\n\n<i>{recipient}</i>\n\nwas not confirmed in time.</b>\n\n"
+                        "Check transaction <code>{transaction_id}</code> before trying again.",
+    "transfer_expired_bsc": "<b>⌛ Transfer of {amount} BNB to\n\n<i>{recipient}</i>\n\nwas not confirmed in time.</b>\n\n"
+                            "Check transaction <code>{transaction_id}</code> before trying again.",
     "insufficient_balance": "<b>❌ Insufficient funds in your wallet for this transfer.</b>",
     "insufficient_balance_recipient": "<b>❌ The recipient's balance\nshould be at least 0.00089784 Sol.</b>",
     "insufficient_balance_recipient_bsc": "<b>❌ The recipient's balance\nshould be at least 0.00089784 Sol.</b>",
@@ -122,11 +132,17 @@ TOKEN_TRANSFER_TRANSACTION_MESSAGE = {
     "invalid_private_key": "<b>❌ Invalid private key.</b>",
     "invalid_seed_phrase": "<b>❌ Invalid seed phrase.</b>",
     "empty_history": "😔 Transaction history is empty.",
+    "button_history_newer": "⬅️ Newer",
+    "button_history_older": "Older ➡️",
     "server_unavailable": "The server is currently unavailable. Please try again later.",
     "transaction_info": "<b>💼 Transaction:</b> {transaction_id}:\n"
                         "<b>📲 Sender:</b> {sender}\n"
                         "<b>📬 Recipient:</b> {recipient}\n"
-                        "<b>💰 Amount:</b> {amount_in_sol} SOL"
+                        "<b>💰 Amount:</b> {amount_in_sol} SOL",
+    "transaction_info_bsc": "<b>💼 Transaction:</b> {transaction_id}:\n"
+                            "<b>📲 Sender:</b> {sender}\n"
+                            "<b>📬 Recipient:</b> {recipient}\n"
+                            "<b>💰 Amount:</b> {amount_in_bnb} BNB"
 }
 
 # Сообщения для удаления кошелька
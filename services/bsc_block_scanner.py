@@ -0,0 +1,241 @@
+# solana-webwallet/services/bsc_block_scanner.py
+
+import asyncio
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from web3 import Web3
+
+from config_data.config import (BSC_CONFIRMATIONS, BSC_BLOCK_TIME, BSC_SCAN_MAX_BLOCKS_PER_PASS,
+                                BSC_SCANNER_ADDRESS_REFRESH_INTERVAL)
+from external_services.binance_smart_chain.bsc import bsc_router, get_block_number, get_full_blocks
+from external_services.cache import balance_cache
+from logger_config import logger
+from services.history_sync import store_parsed_transactions
+
+########### django #########
+from django.db import transaction as db_transaction
+from applications.wallet.models import Blockchain, BlockCursor, Wallet
+from utils.db_executor import database_sync_to_async
+
+
+@database_sync_to_async
+def get_wallet_addresses_after(blockchain, after_pk) -> List[Tuple[int, str]]:
+    # Выборка по первичному ключу читает только новые строки индекса, а не всю таблицу кошельков
+    return list(Wallet.objects.filter(blockchain=blockchain, pk__gt=after_pk).order_by('pk')
+                .values_list('pk', 'wallet_address'))
+
+
+@database_sync_to_async
+def get_block_cursor(blockchain) -> Optional[int]:
+    return BlockCursor.objects.filter(blockchain=blockchain).values_list('block_number', flat=True).first()
+
+
+@database_sync_to_async
+def save_scanned_blocks(blockchain, parsed_transactions, block_number):
+    # Транзакции и курсор сохраняются атомарно: после перезапуска сканер продолжит с первого необработанного блока
+    with db_transaction.atomic():
+        stored = store_parsed_transactions(parsed_transactions)
+        BlockCursor.objects.update_or_create(blockchain=blockchain, defaults={'block_number': block_number})
+    return stored
+
+############################
+
+
+class BscBlockScanner:
+    """
+        Background scanner that stores the BSC transactions of tracked wallets.
+
+        Blocks are fetched with their full transactions in batched eth_getBlockByNumber requests. The sender and
+        recipient of every transaction are looked up in an in-memory index of all BSC wallet addresses, so the cost
+        of matching does not depend on the number of tracked wallets. Before every pass the wallets added since the
+        previous one (primary key above the last seen one, including bulk_create) are loaded into the index, so a
+        wallet added while the cursor moves on is matched from the next scanned block. Every
+        address_refresh_interval seconds the index is reloaded in full to drop deleted wallets. Only blocks at least
+        BSC_CONFIRMATIONS deep are scanned, so transactions of blocks dropped by a reorganization are never stored.
+        The number of the last scanned block is kept in BlockCursor and the scan resumes from it after a restart.
+
+        Attributes:
+            confirmations (int): The confirmation depth of scanned blocks.
+            block_time (float): The pause in seconds after the scanner has caught up with the chain.
+            max_blocks_per_pass (int): The maximum number of blocks scanned in one pass.
+            address_refresh_interval (float): The interval in seconds between full reloads of the address index.
+    """
+
+    def __init__(self, confirmations: int = BSC_CONFIRMATIONS, block_time: float = BSC_BLOCK_TIME,
+                 max_blocks_per_pass: int = BSC_SCAN_MAX_BLOCKS_PER_PASS,
+                 address_refresh_interval: float = BSC_SCANNER_ADDRESS_REFRESH_INTERVAL) -> None:
+        """
+            Initializes the scanner.
+
+            Args:
+                confirmations (int): The confirmation depth of scanned blocks. Defaults to BSC_CONFIRMATIONS.
+                block_time (float): The pause in seconds after catching up with the chain. Defaults to BSC_BLOCK_TIME.
+                max_blocks_per_pass (int): The maximum number of blocks scanned in one pass.
+                    Defaults to BSC_SCAN_MAX_BLOCKS_PER_PASS.
+                address_refresh_interval (float): The interval in seconds between full reloads of the address index.
+                    Defaults to BSC_SCANNER_ADDRESS_REFRESH_INTERVAL.
+        """
+        self.confirmations = confirmations
+        self.block_time = block_time
+        self.max_blocks_per_pass = max_blocks_per_pass
+        self.address_refresh_interval = address_refresh_interval
+        # Адрес в нижнем регистре -> адрес в том виде, в котором он хранится в базе данных
+        self._addresses: Dict[str, str] = {}
+        # Наибольший первичный ключ кошелька в индексе и момент последней полной загрузки
+        self._last_wallet_pk = 0
+        self._addresses_loaded_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        """
+            Returns True if the scanner background task is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    async def refresh_addresses(self) -> None:
+        """
+            Reloads the index of tracked addresses from the database.
+        """
+        wallets = await get_wallet_addresses_after(Blockchain.BINANCE_SMART_CHAIN, 0)
+        self._addresses = {wallet_address.lower(): wallet_address for _, wallet_address in wallets}
+        self._last_wallet_pk = wallets[-1][0] if wallets else 0
+        self._addresses_loaded_at = time.monotonic()
+
+    async def load_new_addresses(self) -> int:
+        """
+            Adds the wallets created since the last load to the index of tracked addresses.
+
+            Returns:
+                int: The number of added wallets.
+        """
+        wallets = await get_wallet_addresses_after(Blockchain.BINANCE_SMART_CHAIN, self._last_wallet_pk)
+        for _, wallet_address in wallets:
+            self._addresses[wallet_address.lower()] = wallet_address
+        if wallets:
+            self._last_wallet_pk = wallets[-1][0]
+        return len(wallets)
+
+    def match_transactions(self, blocks: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+            Selects the transactions of tracked wallets from the blocks.
+
+            Args:
+                blocks (List[Dict[str, Any]]): The raw JSON-RPC blocks with full transactions.
+
+            Returns:
+                Dict[str, Dict[str, Any]]: The Transaction fields keyed by transaction hash.
+        """
+        parsed_transactions = {}
+        addresses = self._addresses
+        for block in blocks:
+            block_number = int(block['number'], 16)
+            block_time = int(block['timestamp'], 16)
+            for tx in block['transactions']:
+                sender = addresses.get(tx['from'].lower())
+                recipient = addresses.get(tx['to'].lower()) if tx.get('to') else None
+                if sender is None and recipient is None:
+                    continue
+                parsed_transactions[tx['hash']] = {
+                    'transaction_id': tx['hash'],
+                    'sender': sender or Web3.to_checksum_address(tx['from']),
+                    # Транзакция создания контракта не имеет получателя
+                    'recipient': recipient or (Web3.to_checksum_address(tx['to']) if tx.get('to') else ''),
+                    'slot': block_number,
+                    'transaction_time': block_time,
+                    'value': int(tx['value'], 16),
+                }
+        return parsed_transactions
+
+    async def run_pass(self) -> int:
+        """
+            Scans the next range of confirmed blocks.
+
+            Returns:
+                int: The number of scanned blocks, 0 if the scanner has caught up with the chain.
+        """
+        # Индекс обновляется до номера блока: транзакции кошелька, добавленного позже, попадут в следующие проходы.
+        # Кошельки создаются и через bulk_create, без сигналов, поэтому новые строки читаются из базы перед каждым
+        # проходом, а полная перезагрузка нужна только для удаленных кошельков
+        if self._addresses_loaded_at is None or \
+                time.monotonic() - self._addresses_loaded_at > self.address_refresh_interval:
+            await self.refresh_addresses()
+        else:
+            await self.load_new_addresses()
+
+        safe_block_number = await get_block_number() - self.confirmations
+        cursor = await get_block_cursor(Blockchain.BINANCE_SMART_CHAIN)
+        if cursor is None:
+            # Первый запуск: начинаем с текущего подтвержденного блока, без загрузки всей истории цепи
+            await save_scanned_blocks(Blockchain.BINANCE_SMART_CHAIN, {}, safe_block_number)
+            logger.info(f"BSC block scanner starts from block {safe_block_number}")
+            return 0
+        if cursor >= safe_block_number:
+            return 0
+
+        block_numbers = list(range(cursor + 1, min(safe_block_number, cursor + self.max_blocks_per_pass) + 1))
+        blocks = await bsc_router.call(lambda node_client: get_full_blocks(block_numbers, node_client))
+
+        # Узел может еще не знать последние блоки - обрабатываем только непрерывную последовательность
+        known_blocks = []
+        for block in blocks:
+            if block is None:
+                break
+            known_blocks.append(block)
+        if not known_blocks:
+            return 0
+
+        parsed_transactions = self.match_transactions(known_blocks)
+        last_block_number = int(known_blocks[-1]['number'], 16)
+        stored = await save_scanned_blocks(Blockchain.BINANCE_SMART_CHAIN, parsed_transactions, last_block_number)
+
+        if parsed_transactions:
+            # Балансы кошельков, участвовавших в транзакциях, изменились
+            wallet_addresses = {address for tr_fields in parsed_transactions.values()
+                                for address in (tr_fields['sender'], tr_fields['recipient'])
+                                if address.lower() in self._addresses}
+            balance_cache.invalidate('bsc', *wallet_addresses)
+
+        logger.debug(f"BSC blocks {block_numbers[0]}-{last_block_number} scanned, {stored} transactions stored")
+        return len(known_blocks)
+
+    def start(self) -> None:
+        """
+            Starts the scanner background task in the running event loop.
+        """
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+            logger.info("BSC block scanner started")
+
+    async def stop(self) -> None:
+        """
+            Stops the scanner background task and waits for it to finish.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("BSC block scanner stopped")
+
+    async def _run(self) -> None:
+        # Пока сканер отстает от цепи, проходы выполняются без пауз
+        while True:
+            try:
+                if await self.run_pass():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detailed_error_traceback = traceback.format_exc()
+                logger.error(f"BSC block scanner pass failed: {e}\n{detailed_error_traceback}")
+            await asyncio.sleep(self.block_time)
+
+
+# Экземпляр сканера, запускаемый вместе с ботом
+bsc_block_scanner = BscBlockScanner()
@@ -0,0 +1,233 @@
+# solana-webwallet/services/confirmation_tracker.py
+
+import asyncio
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+from solders.transaction_status import TransactionConfirmationStatus
+
+from config_data.config import CONFIRMATION_POLL_INTERVAL, CONFIRMATION_TIMEOUT
+from external_services.binance_smart_chain.bsc import get_known_transactions, get_receipt_statuses
+from external_services.cache import balance_cache
+from external_services.solana.solana import blockhash_provider, get_signature_statuses
+from logger_config import logger
+from services.history_indexer import history_indexer
+
+########### django #########
+from applications.wallet.models import PendingTransfer
+from utils.db_executor import database_sync_to_async
+
+
+@database_sync_to_async
+def save_transfer_result(transaction_id, result):
+    PendingTransfer.objects.filter(transaction_id=transaction_id).update(transfer_status=result)
+
+############################
+
+# Результаты перевода, которые получает функция уведомления, совпадают со статусами записи в PendingTransfer
+TRANSFER_CONFIRMED = PendingTransfer.TransferStatus.CONFIRMED.value
+TRANSFER_FAILED = PendingTransfer.TransferStatus.FAILED.value
+TRANSFER_EXPIRED = PendingTransfer.TransferStatus.EXPIRED.value
+
+
+class TrackedTransfer(NamedTuple):
+    """
+        Submitted transfer awaiting confirmation.
+    """
+    blockchain: str
+    # Подпись транзакции Solana или хэш транзакции BSC
+    transaction_id: str
+    chat_id: int
+    sender_address: str
+    recipient_address: str
+    amount: str
+    # Момент отправки, для восстановленного после перезапуска перевода - момент восстановления
+    submitted_at: float
+    # Перевод восстановлен из PendingTransfer после перезапуска: его статус мог уйти из недавнего кэша узла
+    recovered: bool = False
+    # Высота блока, после которой транзакция Solana уже не может попасть в блок
+    last_valid_block_height: Optional[int] = None
+
+
+# Функция уведомления пользователя: получает перевод и его результат
+TransferNotifier = Callable[[TrackedTransfer, str], Awaitable[None]]
+
+
+class ConfirmationTracker:
+    """
+        Background service that waits for the confirmation of submitted transfers.
+
+        Transfer handlers return right after a node accepts the transaction and register it here. Every tick the
+        tracker polls all pending transfers at once: one getSignatureStatuses call per SOLANA_SIGNATURE_STATUSES_LIMIT
+        Solana signatures and batched eth_getTransactionReceipt calls for BSC hashes, so hundreds of in-flight
+        transfers cost a few RPC calls per tick. A Solana transfer that is not found after the block height passed the
+        lastValidBlockHeight of its blockhash is expired at once. Other transfers expire after timeout seconds, except
+        BSC transactions that a node still holds in its mempool: they can still be included in a block. A confirmed,
+        failed or expired transfer is removed, its result is saved in the transfer outbox (PendingTransfer) and the
+        notifier tells the user about it. The task sleeps while nothing is pending.
+
+        Attributes:
+            poll_interval (float): The interval in seconds between status polls.
+            timeout (float): The time in seconds after which an unconfirmed transfer is reported as expired.
+    """
+
+    def __init__(self, poll_interval: float = CONFIRMATION_POLL_INTERVAL,
+                 timeout: float = CONFIRMATION_TIMEOUT) -> None:
+        """
+            Initializes the tracker.
+
+            Args:
+                poll_interval (float): The interval in seconds between status polls.
+                    Defaults to CONFIRMATION_POLL_INTERVAL.
+                timeout (float): The time in seconds after which an unconfirmed transfer is reported as expired.
+                    Defaults to CONFIRMATION_TIMEOUT.
+        """
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        # Ожидающие подтверждения переводы по идентификатору транзакции
+        self._pending: Dict[str, TrackedTransfer] = {}
+        self._notifier: Optional[TransferNotifier] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        """
+            Returns True if the tracker background task is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending_count(self) -> int:
+        """
+            Returns the number of transfers awaiting confirmation.
+        """
+        return len(self._pending)
+
+    def track(self, transfer: TrackedTransfer) -> None:
+        """
+            Registers a submitted transfer.
+
+            Args:
+                transfer (TrackedTransfer): The transfer.
+        """
+        self._pending[transfer.transaction_id] = transfer
+        self._wakeup.set()
+
+    async def poll(self) -> int:
+        """
+            Polls the statuses of all pending transfers once and reports the finished ones.
+
+            Returns:
+                int: The number of finished transfers.
+        """
+        pending = list(self._pending.values())
+        solana_transfers = [transfer for transfer in pending if transfer.blockchain == 'solana']
+        bsc_transfers = [transfer for transfer in pending if transfer.blockchain == 'bsc']
+
+        results: Dict[str, str] = {}
+        if solana_transfers:
+            # Высота блока берется до запроса статусов: транзакция, не найденная после того, как высота блока
+            # превысила предел ее блокхэша, уже не попадет в блок
+            expired = {transfer.transaction_id for transfer in solana_transfers
+                       if blockhash_provider.is_expired(transfer.last_valid_block_height)}
+            statuses = await get_signature_statuses(
+                [transfer.transaction_id for transfer in solana_transfers],
+                search_transaction_history=any(transfer.recovered for transfer in solana_transfers),
+            )
+            for transfer, status in zip(solana_transfers, statuses):
+                if status is None:
+                    if transfer.transaction_id in expired:
+                        results[transfer.transaction_id] = TRANSFER_EXPIRED
+                    continue
+                if status.err is not None:
+                    results[transfer.transaction_id] = TRANSFER_FAILED
+                elif status.confirmation_status in (TransactionConfirmationStatus.Confirmed,
+                                                    TransactionConfirmationStatus.Finalized):
+                    results[transfer.transaction_id] = TRANSFER_CONFIRMED
+
+        if bsc_transfers:
+            statuses = await get_receipt_statuses([transfer.transaction_id for transfer in bsc_transfers])
+            for transfer, status in zip(bsc_transfers, statuses):
+                if status is not None:
+                    results[transfer.transaction_id] = TRANSFER_CONFIRMED if status else TRANSFER_FAILED
+
+        now = time.time()
+        timed_out = [transfer for transfer in pending
+                     if transfer.transaction_id not in results and now - transfer.submitted_at > self.timeout]
+        timed_out_bsc = [transfer for transfer in timed_out if transfer.blockchain == 'bsc']
+        # Транзакция BSC без квитанции, которую узел еще знает, ждет включения в блок - она не устарела
+        known = await get_known_transactions([transfer.transaction_id for transfer in timed_out_bsc])
+        still_pending = {transfer.transaction_id for transfer, is_known in zip(timed_out_bsc, known) if is_known}
+        for transfer in timed_out:
+            if transfer.transaction_id not in still_pending:
+                results[transfer.transaction_id] = TRANSFER_EXPIRED
+
+        for transaction_id, result in results.items():
+            await self._finish(self._pending.pop(transaction_id), result)
+        return len(results)
+
+    async def _finish(self, transfer: TrackedTransfer, result: str) -> None:
+        # Балансы, запрошенные до подтверждения, могли не учитывать перевод
+        balance_cache.invalidate(transfer.blockchain, transfer.sender_address, transfer.recipient_address)
+        # В сохраненной истории обоих кошельков перевода еще нет - до следующего прохода индексатора ее догрузит
+        # обработчик истории
+        history_indexer.mark_stale(transfer.sender_address, transfer.recipient_address)
+        logger.info(f"Transfer {transfer.transaction_id} {result}")
+        # Результат сохраняется до уведомления: после перезапуска перевод не будет отслеживаться повторно
+        await save_transfer_result(transfer.transaction_id, result)
+        if self._notifier is None:
+            return
+        try:
+            await self._notifier(transfer, result)
+        except Exception as e:
+            # Ошибка отправки уведомления не должна останавливать отслеживание остальных переводов
+            detailed_error_traceback = traceback.format_exc()
+            logger.error(f"Failed to notify about transfer {transfer.transaction_id}: {e}\n{detailed_error_traceback}")
+
+    def start(self, notifier: TransferNotifier) -> None:
+        """
+            Starts the tracker background task in the running event loop.
+
+            Args:
+                notifier (TransferNotifier): The coroutine function that tells the user about a finished transfer.
+        """
+        self._notifier = notifier
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Confirmation tracker started")
+
+    async def stop(self) -> None:
+        """
+            Stops the tracker background task and waits for it to finish.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Confirmation tracker stopped")
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                # Нет ожидающих переводов - ждем регистрации нового без опроса узлов
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detailed_error_traceback = traceback.format_exc()
+                logger.error(f"Confirmation tracker poll failed: {e}\n{detailed_error_traceback}")
+            await asyncio.sleep(self.poll_interval)
+
+
+# Общий трекер подтверждений переводов
+confirmation_tracker = ConfirmationTracker()
+
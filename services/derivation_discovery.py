@@ -0,0 +1,151 @@
+# solana-webwallet/services/derivation_discovery.py
+
+import asyncio
+from typing import Callable, Dict, Optional, Tuple
+
+from config_data.config import (SOLANA_DERIVATION_PATH_TEMPLATE, BSC_DERIVATION_PATH_TEMPLATE,
+                                DERIVATION_DISCOVERY_MAX_INDEX, DERIVATION_DISCOVERY_CHUNK_SIZE)
+from logger_config import logger
+from utils.crypto_executor import crypto_executor
+from utils.key_derivation import (mnemonic_to_seed, solana_wallet_from_seed, bsc_wallet_from_seed, derivation_index,
+                                  find_derivation_path)
+
+########### django #########
+from django.db import transaction as db_transaction
+from applications.wallet.models import Wallet, HDWallet
+from utils.db_executor import database_sync_to_async
+
+
+@database_sync_to_async
+def save_derivation_path(wallet_address, derivation_path, first_address):
+    # Путь деривации сохраняется в кошельке, а HD-кошелек (определяется адресом нулевого пути) запоминает последний
+    # использованный путь, поэтому повторный поиск для этого адреса не нужен
+    with db_transaction.atomic():
+        wallet = Wallet.objects.select_for_update().filter(wallet_address=wallet_address).first()
+        if wallet is None:
+            return None
+
+        hd_wallet = wallet.hd_wallet
+        if hd_wallet is None or hd_wallet.first_address != first_address:
+            hd_wallet, _ = HDWallet.objects.get_or_create(
+                first_address=first_address,
+                defaults={'name': wallet.name, 'blockchain': wallet.blockchain},
+            )
+            hd_wallet.user.add(*wallet.user.all())
+
+        last_index = derivation_index(hd_wallet.last_derivation_path)
+        if last_index is None or derivation_index(derivation_path) > last_index:
+            hd_wallet.last_derivation_path = derivation_path
+            hd_wallet.save(update_fields=['last_derivation_path', 'modified'])
+
+        wallet.derivation_path = derivation_path
+        wallet.hd_wallet = hd_wallet
+        wallet.save(update_fields=['derivation_path', 'hd_wallet', 'modified'])
+    return wallet
+
+############################
+
+
+# Функция деривации и шаблон пути BIP-44 для каждого блокчейна
+DERIVATION_SCHEMES: Dict[str, Tuple[Callable[[bytes, str], Tuple[str, str]], str]] = {
+    'solana': (solana_wallet_from_seed, SOLANA_DERIVATION_PATH_TEMPLATE),
+    'bsc': (bsc_wallet_from_seed, BSC_DERIVATION_PATH_TEMPLATE),
+}
+
+
+async def derive_wallet(seed: bytes, blockchain: str, derivation_path: str) -> Tuple[str, str]:
+    """
+        Derives the wallet of the derivation path in the crypto executor.
+
+        Args:
+            seed (bytes): The BIP-39 seed.
+            blockchain (str): The blockchain, 'solana' or 'bsc'.
+            derivation_path (str): The derivation path.
+
+        Returns:
+            Tuple[str, str]: The wallet address and the private key.
+    """
+    derive, _ = DERIVATION_SCHEMES[blockchain]
+    return await crypto_executor.run(derive, seed, derivation_path)
+
+
+async def discover_derivation_path(seed: bytes, wallet_address: str, blockchain: str,
+                                   max_index: int = DERIVATION_DISCOVERY_MAX_INDEX,
+                                   chunk_size: int = DERIVATION_DISCOVERY_CHUNK_SIZE) -> Optional[Tuple[str, str]]:
+    """
+        Finds the BIP-44 derivation path of the wallet address.
+
+        The indexes are split into chunks that are searched in parallel in the crypto executor, one wave of chunks
+        per pool worker at a time. As soon as a chunk finds the address, the chunks that have not started yet are
+        cancelled and no further waves are submitted.
+
+        Args:
+            seed (bytes): The BIP-39 seed.
+            wallet_address (str): The wallet address to find.
+            blockchain (str): The blockchain, 'solana' or 'bsc'.
+            max_index (int): The number of indexes to try. Defaults to DERIVATION_DISCOVERY_MAX_INDEX.
+            chunk_size (int): The number of indexes searched by one executor job.
+                Defaults to DERIVATION_DISCOVERY_CHUNK_SIZE.
+
+        Returns:
+            Optional[Tuple[str, str]]: The derivation path and the private key of the wallet, None if not found.
+    """
+    derive, path_template = DERIVATION_SCHEMES[blockchain]
+    chunk_starts = list(range(0, max_index, chunk_size))
+    wave_size = crypto_executor.workers
+
+    for wave_start in range(0, len(chunk_starts), wave_size):
+        jobs = [
+            asyncio.ensure_future(crypto_executor.run(find_derivation_path, derive, seed, wallet_address,
+                                                      path_template, start, min(start + chunk_size, max_index)))
+            for start in chunk_starts[wave_start:wave_start + wave_size]
+        ]
+        try:
+            for job in asyncio.as_completed(jobs):
+                found = await job
+                if found is not None:
+                    return found
+        finally:
+            # Ранняя остановка: задачи, еще не начавшие выполнение, снимаются с очереди пула
+            for job in jobs:
+                job.cancel()
+
+    return None
+
+
+async def resolve_wallet_from_seed(seed_phrase: str, wallet_address: str, blockchain: str,
+                                   derivation_path: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """
+        Returns the derivation path and the private key of the wallet derived from the seed phrase.
+
+        If the derivation path is known, the wallet is derived directly. Otherwise the path is discovered and saved
+        in the wallet and its HD wallet, so the next transfers from this wallet do not search again.
+
+        Args:
+            seed_phrase (str): The mnemonic phrase.
+            wallet_address (str): The wallet address.
+            blockchain (str): The blockchain, 'solana' or 'bsc'.
+            derivation_path (Optional[str]): The stored derivation path of the wallet, if any.
+
+        Returns:
+            Optional[Tuple[str, str]]: The derivation path and the private key, None if the seed phrase does not
+                derive the wallet address.
+    """
+    # Seed вычисляется один раз (2048 раундов PBKDF2) и используется для всех путей деривации
+    seed = await crypto_executor.run(mnemonic_to_seed, seed_phrase)
+
+    if derivation_path:
+        address, private_key = await derive_wallet(seed, blockchain, derivation_path)
+        if address == wallet_address:
+            return derivation_path, private_key
+
+    found = await discover_derivation_path(seed, wallet_address, blockchain)
+    if found is None:
+        return None
+
+    derivation_path, private_key = found
+    _, path_template = DERIVATION_SCHEMES[blockchain]
+    first_address, _ = await derive_wallet(seed, blockchain, path_template.format(index=0))
+    await save_derivation_path(wallet_address, derivation_path, first_address)
+    logger.info(f"Derivation path {derivation_path} of {wallet_address} discovered and saved")
+    return derivation_path, private_key
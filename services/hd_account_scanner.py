@@ -0,0 +1,186 @@
+# solana-webwallet/services/hd_account_scanner.py
+
+import asyncio
+from typing import List, NamedTuple, Optional
+
+from config_data.config import HD_GAP_LIMIT, HD_SCAN_MAX_ACCOUNTS
+from external_services.binance_smart_chain.bsc import get_bnb_balance, get_transaction_counts
+from external_services.solana.solana import get_sol_balance, has_transaction_history
+from logger_config import logger
+from services.derivation_discovery import DERIVATION_SCHEMES
+from services.user_repository import user_repository
+from utils.crypto_executor import crypto_executor
+from utils.key_derivation import derivation_index, derive_wallets
+
+########### django #########
+from django.db import transaction as db_transaction
+from applications.wallet.models import Wallet, HDWallet, Blockchain
+from utils.db_executor import database_sync_to_async
+
+
+@database_sync_to_async
+def register_hd_accounts(user, blockchain, first_address, name, description, accounts):
+    # Все аккаунты HD-кошелька регистрируются в одной транзакции: кошельки и связи с пользователем
+    # создаются пакетными вставками
+    accounts = sorted(accounts, key=lambda account: account.index)
+    with db_transaction.atomic():
+        hd_wallet, _ = HDWallet.objects.get_or_create(
+            first_address=first_address,
+            defaults={'name': name, 'blockchain': blockchain},
+        )
+        hd_wallet.user.add(user)
+
+        wallet_addresses = [account.wallet_address for account in accounts]
+        existing_addresses = set(
+            Wallet.objects.filter(wallet_address__in=wallet_addresses).values_list('wallet_address', flat=True)
+        )
+        Wallet.objects.bulk_create([
+            Wallet(
+                wallet_address=account.wallet_address,
+                name=name if len(accounts) == 1 else f"{name} #{account.index}",
+                description=description,
+                blockchain=blockchain,
+                derivation_path=account.derivation_path,
+                hd_wallet=hd_wallet,
+            )
+            for account in accounts if account.wallet_address not in existing_addresses
+        ])
+        # Ранее подключенные по адресу кошельки получают путь деривации и привязку к HD-кошельку
+        for account in accounts:
+            if account.wallet_address in existing_addresses:
+                Wallet.objects.filter(wallet_address=account.wallet_address, hd_wallet__isnull=True).update(
+                    derivation_path=account.derivation_path, hd_wallet=hd_wallet,
+                )
+
+        wallets = {wallet.wallet_address: wallet for wallet in Wallet.objects.filter(wallet_address__in=wallet_addresses)}
+        through_model = Wallet.user.through
+        through_model.objects.bulk_create([
+            through_model(**{Wallet.user.field.m2m_field_name(): wallet, Wallet.user.field.m2m_reverse_field_name(): user})
+            for wallet in wallets.values()
+        ], ignore_conflicts=True)
+
+        last_derivation_path = accounts[-1].derivation_path
+        last_index = derivation_index(hd_wallet.last_derivation_path)
+        if last_index is None or accounts[-1].index > last_index:
+            hd_wallet.last_derivation_path = last_derivation_path
+            hd_wallet.save(update_fields=['last_derivation_path', 'modified'])
+
+        user_path_field = {
+            Blockchain.BINANCE_SMART_CHAIN: 'last_bsc_derivation_path',
+            Blockchain.SOLANA: 'last_solana_derivation_path',
+        }.get(blockchain)
+        if user_path_field:
+            user_last_index = derivation_index(getattr(user, user_path_field))
+            if user_last_index is None or accounts[-1].index > user_last_index:
+                setattr(user, user_path_field, last_derivation_path)
+                user.save(update_fields=[user_path_field])
+
+        # bulk_create и update не отправляют сигналы моделей, поэтому кэш пользователей сбрасываем явно
+        user_repository.invalidate_user(user)
+        user_repository.invalidate_wallets(wallet.pk for wallet in wallets.values())
+
+    return [wallets[account.wallet_address] for account in accounts]
+
+############################
+
+
+class HDAccount(NamedTuple):
+    """
+        Account of an HD wallet derived from a seed phrase.
+    """
+    index: int
+    derivation_path: str
+    wallet_address: str
+    private_key: str
+
+
+async def check_activity(wallet_addresses: List[str], blockchain: str) -> List[bool]:
+    """
+        Checks which wallets have been used: hold a balance or have transactions.
+
+        Args:
+            wallet_addresses (List[str]): The wallet addresses.
+            blockchain (str): The blockchain, 'solana' or 'bsc'.
+
+        Returns:
+            List[bool]: True for the used wallets, in the same order as the addresses.
+    """
+    if blockchain == 'solana':
+        balances = await get_sol_balance(wallet_addresses)
+        # История запрашивается только для адресов без баланса: аккаунт с балансом уже считается использованным
+        unfunded_addresses = [address for address, balance in zip(wallet_addresses, balances) if not balance]
+        history = dict(zip(unfunded_addresses, await has_transaction_history(unfunded_addresses)))
+        return [bool(balance) or history.get(address, False) for address, balance in zip(wallet_addresses, balances)]
+
+    # Счетчик транзакций (nonce) учитывает только отправленные транзакции, полученные средства видны по балансу
+    balances, transaction_counts = await asyncio.gather(
+        get_bnb_balance(wallet_addresses), get_transaction_counts(wallet_addresses)
+    )
+    return [balance > 0 or count > 0 for balance, count in zip(balances, transaction_counts)]
+
+
+async def scan_hd_accounts(seed: bytes, blockchain: str, gap_limit: int = HD_GAP_LIMIT,
+                           max_accounts: int = HD_SCAN_MAX_ACCOUNTS) -> List[HDAccount]:
+    """
+        Finds the used accounts of an HD wallet with the BIP-44 gap limit.
+
+        The addresses are derived in batches of gap_limit addresses in the crypto executor, and every batch is
+        checked with batched balance and transaction RPC requests. The next batch is derived while the current one
+        is being checked. The scan stops after gap_limit consecutive unused addresses.
+
+        Args:
+            seed (bytes): The BIP-39 seed.
+            blockchain (str): The blockchain, 'solana' or 'bsc'.
+            gap_limit (int): The number of consecutive unused addresses that ends the scan. Defaults to HD_GAP_LIMIT.
+            max_accounts (int): The maximum number of addresses to check. Defaults to HD_SCAN_MAX_ACCOUNTS.
+
+        Returns:
+            List[HDAccount]: The used accounts ordered by index.
+    """
+    derive, path_template = DERIVATION_SCHEMES[blockchain]
+
+    def derive_batch(start: int) -> Optional[asyncio.Future]:
+        if start >= max_accounts:
+            return None
+        return asyncio.ensure_future(crypto_executor.run(derive_wallets, derive, seed, path_template,
+                                                         start, min(start + gap_limit, max_accounts)))
+
+    active_accounts = []
+    gap = 0
+    next_batch = derive_batch(0)
+    try:
+        while next_batch is not None and gap < gap_limit:
+            batch = [HDAccount(*wallet) for wallet in await next_batch]
+            next_batch = derive_batch(batch[-1].index + 1)
+            activity = await check_activity([account.wallet_address for account in batch], blockchain)
+            for account, is_active in zip(batch, activity):
+                if is_active:
+                    active_accounts.append(account)
+                    gap = 0
+                else:
+                    gap += 1
+                    if gap >= gap_limit:
+                        break
+    finally:
+        if next_batch is not None:
+            next_batch.cancel()
+
+    logger.info(f"HD scan found {len(active_accounts)} used {blockchain} accounts")
+    return active_accounts
+
+
+async def derive_account(seed: bytes, blockchain: str, index: int) -> HDAccount:
+    """
+        Derives the account of the index.
+
+        Args:
+            seed (bytes): The BIP-39 seed.
+            blockchain (str): The blockchain, 'solana' or 'bsc'.
+            index (int): The account index.
+
+        Returns:
+            HDAccount: The account.
+    """
+    derive, path_template = DERIVATION_SCHEMES[blockchain]
+    wallet, = await crypto_executor.run(derive_wallets, derive, seed, path_template, index, index + 1)
+    return HDAccount(*wallet)
@@ -0,0 +1,159 @@
+# solana-webwallet/services/history_indexer.py
+
+import asyncio
+import traceback
+from typing import Optional, Set
+
+from config_data.config import (SOLANA_NODE_URL, HISTORY_INDEXER_WORKERS, HISTORY_INDEXER_INTERVAL,
+                                HISTORY_INDEXER_RATE_LIMIT)
+from logger_config import logger
+from services.history_sync import get_wallet_addresses, sync_wallet_history
+from utils.rate_limiter import RateLimiter
+
+########### django #########
+from applications.wallet.models import Blockchain
+
+############################
+
+
+class HistoryIndexer:
+    """
+        Background worker that pre-ingests the transaction history of every stored Solana wallet.
+
+        Each pass walks all Solana wallets and syncs their history into the Transaction table with
+        sync_wallet_history. The per-wallet high-water mark (Wallet.last_signature) is the resumable cursor:
+        after a restart every wallet continues from its last synced transaction.
+
+        Attributes:
+            workers (int): The number of wallets synced concurrently.
+            interval (float): The pause between two passes in seconds.
+            rate_limiter (RateLimiter): The limiter of wallet syncs per second.
+    """
+
+    def __init__(self, workers: int = HISTORY_INDEXER_WORKERS, interval: float = HISTORY_INDEXER_INTERVAL,
+                 rate_limit: float = HISTORY_INDEXER_RATE_LIMIT) -> None:
+        """
+            Initializes the indexer.
+
+            Args:
+                workers (int): The number of wallets synced concurrently. Defaults to HISTORY_INDEXER_WORKERS.
+                interval (float): The pause between passes in seconds. Defaults to HISTORY_INDEXER_INTERVAL.
+                rate_limit (float): The maximum number of wallet syncs per second.
+                    Defaults to HISTORY_INDEXER_RATE_LIMIT.
+        """
+        self.workers = workers
+        self.interval = interval
+        self.rate_limiter = RateLimiter(rate_limit)
+        self._task: Optional[asyncio.Task] = None
+        # Адреса кошельков, история которых уже загружена индексатором в текущем процессе
+        self._indexed_addresses: Set[str] = set()
+        # Адреса, которые синхронизируются сейчас, и те из них, что получили новую транзакцию во время синхронизации:
+        # такая синхронизация могла ее не застать и не делает историю кошелька актуальной
+        self._syncing_addresses: Set[str] = set()
+        self._changed_while_syncing: Set[str] = set()
+
+    @property
+    def is_running(self) -> bool:
+        """
+            Returns True if the indexer background task is running.
+        """
+        return self._task is not None and not self._task.done()
+
+    def is_indexed(self, wallet_address: str) -> bool:
+        """
+            Checks whether the wallet history is kept up to date by the running indexer.
+
+            Args:
+                wallet_address (str): The wallet address.
+
+            Returns:
+                bool: True if the stored history of the wallet can be served without RPC calls.
+        """
+        return self.is_running and wallet_address in self._indexed_addresses
+
+    def mark_stale(self, *wallet_addresses: str) -> None:
+        """
+            Marks the stored history of the wallets as outdated, for example after a transfer or an account change.
+
+            Until the next indexer pass syncs them again, the history handler syncs these wallets itself.
+
+            Args:
+                *wallet_addresses (str): The wallet addresses with new transactions.
+        """
+        for wallet_address in wallet_addresses:
+            self._indexed_addresses.discard(wallet_address)
+            if wallet_address in self._syncing_addresses:
+                self._changed_while_syncing.add(wallet_address)
+
+    def start(self) -> None:
+        """
+            Starts the indexer background task in the running event loop.
+        """
+        # api.devnet.solana.com выдает ошибку при попытке получить историю трансакций
+        if "api.devnet.solana.com" in SOLANA_NODE_URL:
+            logger.warning("History indexer is disabled: the Solana node does not serve transaction history")
+            return
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"History indexer started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """
+            Stops the indexer background task and waits for it to finish.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("History indexer stopped")
+
+    async def run_pass(self) -> None:
+        """
+            Syncs the history of every stored Solana wallet once.
+        """
+        wallet_addresses = await get_wallet_addresses(Blockchain.SOLANA)
+        queue: asyncio.Queue = asyncio.Queue()
+        for wallet_address in wallet_addresses:
+            queue.put_nowait(wallet_address)
+
+        await asyncio.gather(*[self._worker(queue) for _ in range(min(self.workers, len(wallet_addresses)))])
+        logger.debug(f"History indexer pass finished for {len(wallet_addresses)} wallets")
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        # Воркер забирает кошельки из общей очереди, пока она не опустеет
+        while not queue.empty():
+            wallet_address = queue.get_nowait()
+            await self.rate_limiter.acquire()
+            self._syncing_addresses.add(wallet_address)
+            try:
+                synced = await sync_wallet_history(wallet_address) is not None
+            finally:
+                self._syncing_addresses.discard(wallet_address)
+            changed = wallet_address in self._changed_while_syncing
+            self._changed_while_syncing.discard(wallet_address)
+            if synced and not changed:
+                self._indexed_addresses.add(wallet_address)
+            else:
+                # Синхронизация не удалась или не застала новую транзакцию - до следующего прохода история кошелька
+                # догружается из блокчейна обработчиком истории
+                self._indexed_addresses.discard(wallet_address)
+
+    async def _run(self) -> None:
+        # Основной цикл индексатора: проход по всем кошелькам, затем пауза
+        while True:
+            try:
+                await self.run_pass()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detailed_error_traceback = traceback.format_exc()
+                logger.error(f"History indexer pass failed: {e}\n{detailed_error_traceback}")
+            await asyncio.sleep(self.interval)
+
+
+# Экземпляр индексатора, запускаемый вместе с ботом
+history_indexer = HistoryIndexer()
@@ -0,0 +1,319 @@
+# solana-webwallet/services/history_sync.py
+
+import json
+import traceback
+from typing import List, NamedTuple, Optional, Tuple
+
+from config_data.config import TRANSACTION_BACKFILL_LIMIT, HISTORY_PAGE_SIZE, TRANSACTION_HISTORY_HEAD_CACHE_DURATION
+from external_services.cache import transaction_history_cache
+from external_services.solana.solana import get_signatures_until, get_transactions, http_client
+from logger_config import logger
+
+# Направления постраничного вывода истории: к более старым и к более новым транзакциям
+HISTORY_OLDER = 'o'
+HISTORY_NEWER = 'n'
+
+########### django #########
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from applications.wallet.models import Wallet, Transaction, WalletTransaction
+from utils.db_executor import database_sync_to_async
+
+
+@database_sync_to_async
+def get_wallet(wallet_address):
+    wallet = Wallet.objects.filter(wallet_address=wallet_address).first()
+    return wallet
+
+
+@database_sync_to_async
+def get_wallet_addresses(blockchain) -> List[str]:
+    return list(Wallet.objects.filter(blockchain=blockchain).values_list('wallet_address', flat=True))
+
+
+@database_sync_to_async
+def update_wallet_sync_mark(wallet_address, last_signature, last_slot):
+    Wallet.objects.filter(wallet_address=wallet_address).update(last_signature=last_signature, last_slot=last_slot)
+
+
+def fetch_transaction_links(wallet_id, direction, cursor, limit):
+    links = WalletTransaction.objects.filter(wallet_id=wallet_id).select_related('transaction')
+    if direction == HISTORY_NEWER:
+        if cursor is not None:
+            transaction_time, transaction_id = cursor
+            # Условие по transaction_time__gte позволяет начать чтение индекса сразу с позиции курсора
+            links = links.filter(transaction_time__gte=transaction_time).filter(
+                Q(transaction_time__gt=transaction_time)
+                | Q(transaction_time=transaction_time, transaction_id__gt=transaction_id)
+            )
+        return list(links.order_by('transaction_time', 'transaction_id')[:limit])
+
+    if cursor is not None:
+        transaction_time, transaction_id = cursor
+        links = links.filter(transaction_time__lte=transaction_time).filter(
+            Q(transaction_time__lt=transaction_time)
+            | Q(transaction_time=transaction_time, transaction_id__lt=transaction_id)
+        )
+    return list(links.order_by('-transaction_time', '-transaction_id')[:limit])
+
+
+@database_sync_to_async
+def get_transaction_page(wallet_id, direction=HISTORY_OLDER, cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """
+        Returns a page of the wallet history, newest transactions first.
+
+        Keyset pagination over (transaction_time, transaction id): a page is read from the
+        (wallet, transaction_time, transaction) index starting at the cursor, so every page costs one query of
+        page_size + 1 rows whatever the length of the history. The extra row tells whether there is a next page.
+
+        Args:
+            wallet_id (int): The primary key of the wallet.
+            direction (str): HISTORY_OLDER for the transactions before the cursor, HISTORY_NEWER for those after it.
+                Defaults to HISTORY_OLDER.
+            cursor (Optional[Tuple[int, int]]): The (transaction_time, transaction id) key of the last transaction
+                of the previous page. Defaults to None, the newest page.
+            page_size (int): The number of transactions in a page. Defaults to HISTORY_PAGE_SIZE.
+
+        Returns:
+            HistoryPage: The transactions of the page and the cursors of the neighbouring pages.
+    """
+    links = fetch_transaction_links(wallet_id, direction, cursor, page_size + 1)
+    has_more = len(links) > page_size
+    links = links[:page_size]
+
+    if direction == HISTORY_NEWER:
+        if not has_more:
+            # Достигнуто начало истории: показываем первую полную страницу
+            links = fetch_transaction_links(wallet_id, HISTORY_OLDER, None, page_size + 1)
+            has_older = len(links) > page_size
+            links = links[:page_size]
+            has_newer = False
+        else:
+            links.reverse()
+            has_older = True
+            has_newer = True
+    else:
+        has_older = has_more
+        has_newer = cursor is not None
+
+    return HistoryPage(
+        transactions=[link.transaction for link in links],
+        newer_cursor=(links[0].transaction_time, links[0].transaction_id) if links and has_newer else None,
+        older_cursor=(links[-1].transaction_time, links[-1].transaction_id) if links and has_older else None,
+    )
+
+############################
+
+
+class HistoryPage(NamedTuple):
+    """
+        Page of the wallet transaction history.
+    """
+    transactions: List[Transaction]
+    # Ключ (transaction_time, transaction id) первой транзакции страницы, None на первой странице
+    newer_cursor: Optional[Tuple[int, int]]
+    # Ключ (transaction_time, transaction id) последней транзакции страницы, None на последней странице
+    older_cursor: Optional[Tuple[int, int]]
+
+
+async def get_cached_transaction_page(wallet: Wallet, direction: str = HISTORY_OLDER,
+                                      cursor: Optional[Tuple[int, int]] = None,
+                                      page_size: int = HISTORY_PAGE_SIZE) -> HistoryPage:
+    """
+        Returns a page of the wallet history from transaction_history_cache, reading it with get_transaction_page
+        on a miss.
+
+        The newest page lives TRANSACTION_HISTORY_HEAD_CACHE_DURATION seconds, other pages use the cache TTL. The
+        pages of a wallet are dropped when its new transactions are stored, so repeat views and page navigation
+        are served from memory.
+
+        Args:
+            wallet (Wallet): The wallet.
+            direction (str): HISTORY_OLDER or HISTORY_NEWER. Defaults to HISTORY_OLDER.
+            cursor (Optional[Tuple[int, int]]): The key the page starts after. Defaults to None, the newest page.
+            page_size (int): The number of transactions in a page. Defaults to HISTORY_PAGE_SIZE.
+
+        Returns:
+            HistoryPage: The page.
+    """
+    return await transaction_history_cache.get_page(
+        wallet.wallet_address,
+        (direction, cursor, page_size),
+        lambda: get_transaction_page(wallet.pk, direction, cursor, page_size),
+        ttl=TRANSACTION_HISTORY_HEAD_CACHE_DURATION if cursor is None else None,
+    )
+
+
+def parse_transaction(tr):
+    tr_dict = json.loads(tr.to_json())
+
+    return {
+        'transaction_id': tr_dict['transaction']['signatures'][0] or '',
+        'sender': tr_dict['transaction']['message']['accountKeys'][0] or '',
+        'recipient': tr_dict['transaction']['message']['accountKeys'][1] or '',
+        'slot': tr_dict['slot'] or None,
+        'transaction_time': tr_dict['blockTime'] or None,
+        'transaction_status': f"{tr_dict['meta']['status'] or ''}",
+        'transaction_err': f"{tr_dict['meta']['err'] or ''}",
+        'pre_balances': tr_dict['meta']['preBalances'][0] or None,
+        'post_balances': tr_dict['meta']['postBalances'][0] or None,
+    }
+
+
+@database_sync_to_async
+def save_transactions(transactions):
+    """
+        Stores a list of fetched Solana transactions in a single database transaction.
+
+        Args:
+            transactions (list): The transactions returned by the Solana RPC client.
+
+        Returns:
+            int: The number of transactions linked to the known wallets.
+    """
+    # Разбираем транзакции один раз, дубликаты по подписи отбрасываем
+    parsed_transactions = {}
+    for tr in transactions:
+        if tr is None:
+            continue
+        tr_fields = parse_transaction(tr)
+        if tr_fields['transaction_id']:
+            parsed_transactions[tr_fields['transaction_id']] = tr_fields
+
+    return store_parsed_transactions(parsed_transactions)
+
+
+@database_sync_to_async
+def save_parsed_transactions(parsed_transactions):
+    return store_parsed_transactions(parsed_transactions)
+
+
+def store_parsed_transactions(parsed_transactions):
+    """
+        Stores parsed transactions and links them to the wallets of their sender and recipient.
+
+        Runs a fixed number of queries whatever the number of transactions: one prefetch of the related wallets,
+        one bulk insert of the transactions, one lookup of their ids and one bulk insert of the wallet links.
+        Transactions that are already stored only get the missing wallet links. The links carry a copy of the
+        transaction time for the per-wallet history index. The cached history pages of the linked wallets are
+        dropped once the database transaction commits.
+
+        Args:
+            parsed_transactions (dict): Transaction fields keyed by transaction id.
+
+        Returns:
+            int: The number of transactions linked to the known wallets.
+    """
+    if not parsed_transactions:
+        return 0
+
+    address_set = set()
+    for tr_fields in parsed_transactions.values():
+        address_set.update(address for address in (tr_fields['sender'], tr_fields['recipient']) if address)
+
+    with db_transaction.atomic():
+        # Один запрос на все кошельки, участвующие в транзакциях
+        wallet_ids = dict(
+            Wallet.objects.filter(wallet_address__in=address_set).values_list('wallet_address', 'id')
+        )
+
+        # Сохраняем только транзакции, связанные с кошельками из базы данных
+        links = {
+            transaction_id: [wallet_ids[address] for address in {tr_fields['sender'], tr_fields['recipient']}
+                             if address in wallet_ids]
+            for transaction_id, tr_fields in parsed_transactions.items()
+        }
+        links = {transaction_id: ids for transaction_id, ids in links.items() if ids}
+        if not links:
+            return 0
+
+        Transaction.objects.bulk_create(
+            [Transaction(**parsed_transactions[transaction_id]) for transaction_id in links],
+            ignore_conflicts=True,
+        )
+
+        # bulk_create с ignore_conflicts не возвращает первичные ключи - получаем их одним запросом
+        stored_transactions = {
+            transaction_id: (pk, transaction_time)
+            for transaction_id, pk, transaction_time in Transaction.objects.filter(
+                transaction_id__in=links.keys()
+            ).values_list('transaction_id', 'id', 'transaction_time')
+        }
+
+        WalletTransaction.objects.bulk_create(
+            [
+                WalletTransaction(
+                    transaction_id=stored_transactions[transaction_id][0],
+                    wallet_id=wallet_id,
+                    # Неизвестное время заменяется нулем: ключ постраничного вывода не должен содержать NULL
+                    transaction_time=stored_transactions[transaction_id][1] or 0,
+                )
+                for transaction_id, ids in links.items()
+                for wallet_id in ids
+            ],
+            ignore_conflicts=True,
+        )
+
+        # Страницы истории сбрасываются после фиксации: если сохранение идет внутри внешней транзакции (сканер блоков),
+        # до ее фиксации читатели видят прежнюю историю
+        linked_addresses = [address for address, wallet_id in wallet_ids.items()
+                            if any(wallet_id in ids for ids in links.values())]
+        db_transaction.on_commit(lambda: transaction_history_cache.invalidate(*linked_addresses))
+
+    return len(links)
+
+############################
+
+
+async def sync_wallet_history(wallet_address: str) -> Optional[int]:
+    """
+        Fetches the Solana transactions that are newer than the wallet high-water mark and stores them.
+
+        The wallet keeps the newest synced signature and slot (Wallet.last_signature and Wallet.last_slot). Only
+        signatures after that mark are requested, so a wallet without new activity costs a single RPC call
+        whatever the depth of its history. A wallet that was never synced gets its latest
+        TRANSACTION_BACKFILL_LIMIT transactions.
+
+        Args:
+            wallet_address (str): The Solana wallet address.
+
+        Returns:
+            Optional[int]: The number of new transactions fetched from the blockchain, None if the sync failed.
+    """
+    try:
+        wallet = await get_wallet(wallet_address)
+        if wallet is None:
+            return 0
+
+        # Без отметки синхронизации загружаем только последние транзакции, иначе - все после отметки
+        if wallet.last_signature:
+            signature_statuses = await get_signatures_until(wallet_address, wallet.last_signature, None, http_client)
+        else:
+            signature_statuses = await get_signatures_until(wallet_address, None, TRANSACTION_BACKFILL_LIMIT,
+                                                            http_client)
+
+        if not signature_statuses:
+            return 0
+
+        transactions = await get_transactions([status.signature for status in signature_statuses], http_client)
+
+        await save_transactions(transactions)
+
+        # Сдвигаем отметку на самую новую подпись, но не дальше пропущенной транзакции:
+        # все, что новее отметки, будет запрошено снова при следующей синхронизации
+        mark_index = 0
+        for i, transaction in enumerate(transactions):
+            if transaction is None:
+                mark_index = i + 1
+
+        if mark_index < len(signature_statuses):
+            mark = signature_statuses[mark_index]
+            await update_wallet_sync_mark(wallet_address, str(mark.signature), mark.slot)
+
+        logger.debug(f"Synced {len(signature_statuses)} new transactions for wallet {wallet_address}")
+        return len(signature_statuses)
+
+    except Exception as e:
+        detailed_error_traceback = traceback.format_exc()
+        logger.error(f"Failed to sync transaction history for wallet {wallet_address}: {e}\n{detailed_error_traceback}")
+        return None
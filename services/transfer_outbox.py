@@ -0,0 +1,168 @@
+# solana-webwallet/services/transfer_outbox.py
+
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, Union
+
+from external_services.binance_smart_chain.bsc import SignedBscTransfer, bsc_send_raw_transaction, bsc_transfer_token
+from external_services.rpc_router import is_connection_error, is_read_failover_error
+from external_services.solana.solana import SignedTransfer, blockhash_provider, send_raw_transaction, transfer_token
+from logger_config import logger
+from services.confirmation_tracker import confirmation_tracker, TrackedTransfer
+
+########### django #########
+from applications.wallet.models import PendingTransfer
+from utils.db_executor import database_sync_to_async
+
+
+@database_sync_to_async
+def create_pending_transfer(**fields):
+    return PendingTransfer.objects.create(**fields)
+
+
+@database_sync_to_async
+def set_transfer_status(transaction_id, transfer_status):
+    PendingTransfer.objects.filter(transaction_id=transaction_id).update(transfer_status=transfer_status)
+
+
+@database_sync_to_async
+def get_unfinished_transfers():
+    return list(PendingTransfer.objects.filter(
+        transfer_status__in=[PendingTransfer.TransferStatus.SIGNED, PendingTransfer.TransferStatus.SUBMITTED]
+    ))
+
+############################
+
+
+# Функции перевода и повторной отправки подписанной транзакции для каждого блокчейна
+TRANSFER_FUNCTIONS: Dict[str, Callable[..., Awaitable[str]]] = {
+    'solana': transfer_token,
+    'bsc': bsc_transfer_token,
+}
+BROADCAST_FUNCTIONS: Dict[str, Callable[[str], Awaitable[str]]] = {
+    'solana': send_raw_transaction,
+    'bsc': bsc_send_raw_transaction,
+}
+
+
+def is_delivery_unknown(error: BaseException) -> bool:
+    """
+        Checks whether a failed send could still have reached the node.
+
+        Args:
+            error (BaseException): The exception raised by the send.
+
+        Returns:
+            bool: True for timeouts and network errors after the connection was established.
+    """
+    return is_read_failover_error(error) and not is_connection_error(error)
+
+
+def tracked_transfer(pending_transfer: PendingTransfer, recovered: bool = False) -> TrackedTransfer:
+    # Время ожидания восстановленного перевода отсчитывается заново: бот мог быть остановлен дольше этого времени,
+    # а транзакция все это время могла ждать в мемпуле
+    submitted_at = time.time() if recovered else pending_transfer.created.timestamp()
+    return TrackedTransfer(
+        blockchain=pending_transfer.blockchain,
+        transaction_id=pending_transfer.transaction_id,
+        chat_id=pending_transfer.chat_id,
+        sender_address=pending_transfer.sender,
+        recipient_address=pending_transfer.recipient,
+        amount=pending_transfer.amount,
+        submitted_at=submitted_at,
+        recovered=recovered,
+        last_valid_block_height=pending_transfer.last_valid_block_height,
+    )
+
+
+async def submit_transfer(blockchain: str, chat_id: int, sender_address: str, sender_private_key: str,
+                          recipient_address: str, amount: float, display_amount: str) -> str:
+    """
+        Signs a transfer, records it in the outbox, sends it and hands it to the confirmation tracker.
+
+        The signed transaction is saved in PendingTransfer before it is sent, so a restart at any point leaves
+        enough to finish the transfer: recover_pending_transfers() sends it again or resumes tracking it.
+
+        Args:
+            blockchain (str): The blockchain, 'solana' or 'bsc'.
+            chat_id (int): The Telegram chat notified about the result.
+            sender_address (str): Sender's address.
+            sender_private_key (str): Sender's private key.
+            recipient_address (str): Recipient's address.
+            amount (float): Amount of tokens to transfer.
+            display_amount (str): The amount as shown to the user.
+
+        Raises:
+            ValueError: If any of the provided addresses is invalid or the private key is invalid.
+            Exception: The error of the send. If the transaction could have reached the node, it is still tracked.
+
+        Returns:
+            str: The Solana signature or BSC hash of the submitted transaction.
+    """
+    records = []
+
+    async def record(signed_transfer: Union[SignedTransfer, SignedBscTransfer]) -> None:
+        records.append(await create_pending_transfer(
+            blockchain=blockchain,
+            chat_id=chat_id,
+            sender=sender_address,
+            recipient=recipient_address,
+            amount=display_amount,
+            **signed_transfer._asdict(),
+        ))
+
+    try:
+        transaction_id = await TRANSFER_FUNCTIONS[blockchain](sender_address, sender_private_key, recipient_address,
+                                                              amount, on_signed=record)
+    except Exception as error:
+        if records:
+            if is_delivery_unknown(error):
+                # Узел мог принять транзакцию: ее результат сообщит трекер, запись остается в статусе signed
+                confirmation_tracker.track(tracked_transfer(records[0]))
+            else:
+                await set_transfer_status(records[0].transaction_id, PendingTransfer.TransferStatus.FAILED)
+        raise
+
+    await set_transfer_status(transaction_id, PendingTransfer.TransferStatus.SUBMITTED)
+    confirmation_tracker.track(tracked_transfer(records[0]))
+    return transaction_id
+
+
+async def recover_pending_transfers() -> int:
+    """
+        Resumes the transfers left unfinished by the previous run of the bot.
+
+        Transfers that were signed but possibly not sent are sent again: the signed transaction keeps its signature
+        or hash and nonce, so it is executed at most once. Solana transactions whose blockhash has expired are not
+        sent again. All unfinished transfers are handed to the confirmation tracker, which notifies the users about
+        their results.
+
+        Returns:
+            int: The number of resumed transfers.
+    """
+    pending_transfers = await get_unfinished_transfers()
+    if any(pending_transfer.last_valid_block_height is not None for pending_transfer in pending_transfers):
+        try:
+            # Текущая высота блока показывает, какие транзакции Solana уже устарели
+            await blockhash_provider.get_blockhash()
+        except Exception as e:
+            logger.warning(f"Failed to get the Solana block height: {e}")
+
+    for pending_transfer in pending_transfers:
+        # Транзакцию с устаревшим блокхэшем узел отклонит: трекер найдет ее, если она была отправлена, или отметит
+        # перевод устаревшим
+        if (pending_transfer.transfer_status == PendingTransfer.TransferStatus.SIGNED
+                and not blockhash_provider.is_expired(pending_transfer.last_valid_block_height)):
+            try:
+                await BROADCAST_FUNCTIONS[pending_transfer.blockchain](pending_transfer.raw_transaction)
+                await set_transfer_status(pending_transfer.transaction_id, PendingTransfer.TransferStatus.SUBMITTED)
+            except Exception as e:
+                # Транзакция уже могла быть обработана или устареть - ее статус определит трекер
+                detailed_error_traceback = traceback.format_exc()
+                logger.warning(f"Failed to resend transfer {pending_transfer.transaction_id}: {e}\n"
+                               f"{detailed_error_traceback}")
+        confirmation_tracker.track(tracked_transfer(pending_transfer, recovered=True))
+
+    if pending_transfers:
+        logger.info(f"Resumed tracking of {len(pending_transfers)} unfinished transfers")
+    return len(pending_transfers)
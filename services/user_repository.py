@@ -0,0 +1,167 @@
+# solana-webwallet/services/user_repository.py
+
+from typing import Hashable, Iterable, List, Optional
+
+from config_data.config import USER_CACHE_TTL, USER_CACHE_MAX_ENTRIES
+from utils.cache import TTLLRUCache
+
+########### django #########
+from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+from applications.wallet.models import Wallet
+from utils.db_executor import database_sync_to_async
+
+User = get_user_model()
+
+
+@database_sync_to_async
+def load_user(telegram_id):
+    return User.objects.filter(telegram_id=telegram_id).first()
+
+
+@database_sync_to_async
+def load_user_wallets(user):
+    return list(Wallet.objects.filter(user=user))
+
+############################
+
+
+def telegram_tag(telegram_id: int) -> Hashable:
+    return 'telegram_id', telegram_id
+
+
+def user_tag(user_id: int) -> Hashable:
+    return 'user', user_id
+
+
+def wallet_tag(wallet_id: int) -> Hashable:
+    return 'wallet', wallet_id
+
+
+class UserRepository:
+    """
+        Read-through cache of users and their wallet lists keyed by Telegram id.
+
+        Entries are tagged with the primary keys of the user and of every listed wallet, so the model signals in
+        applications/*/signals.py can drop exactly the entries a change affects. Invalidation happens immediately
+        and once more when the surrounding database transaction commits, so a reader cannot put back data that
+        a transaction in progress is about to change. Writes that bypass signals (bulk_create, QuerySet.update)
+        must call the invalidate methods themselves.
+
+        Signals fire only in the process that makes the change. Edits made in another process, such as the Django
+        admin served by manage.py runserver, are not seen by the bot's cache: such entries are refreshed only when
+        their TTL (USER_CACHE_TTL) expires.
+
+        Attributes:
+            cache (TTLLRUCache): The cache of users and wallet lists.
+    """
+
+    def __init__(self, max_entries: int = USER_CACHE_MAX_ENTRIES, ttl: float = USER_CACHE_TTL) -> None:
+        """
+            Initializes the repository.
+
+            Args:
+                max_entries (int): The maximum number of cached entries. Defaults to USER_CACHE_MAX_ENTRIES.
+                ttl (float): The time to live of an entry in seconds, a safety net for missed invalidations.
+                    Defaults to USER_CACHE_TTL.
+        """
+        self.cache = TTLLRUCache(max_entries=max_entries, ttl=ttl)
+        # Счетчик инвалидаций: результат запроса, во время которого данные изменились, не кэшируется
+        self._generation = 0
+
+    async def get_user(self, telegram_id: int) -> Optional[User]:
+        """
+            Returns the user with the Telegram id.
+
+            Args:
+                telegram_id (int): The Telegram id of the user.
+
+            Returns:
+                Optional[User]: The user, None if the user is not registered.
+        """
+        key = ('user', telegram_id)
+        user = self.cache.get(key)
+        if user is None:
+            generation = self._generation
+            user = await load_user(telegram_id)
+            # Отсутствующий пользователь не кэшируется: он появится сразу после /start
+            if user is not None and generation == self._generation:
+                self.cache.set(key, user, tags=[telegram_tag(telegram_id), user_tag(user.pk)])
+        return user
+
+    async def get_wallets(self, telegram_id: int, blockchain: Optional[str] = None) -> List[Wallet]:
+        """
+            Returns the wallets of the user with the Telegram id.
+
+            Args:
+                telegram_id (int): The Telegram id of the user.
+                blockchain (Optional[str]): The blockchain to filter the wallets by. Defaults to all blockchains.
+
+            Returns:
+                List[Wallet]: The wallets of the user, empty if the user is not registered.
+        """
+        key = ('wallets', telegram_id)
+        wallets = self.cache.get(key)
+        if wallets is None:
+            generation = self._generation
+            user = await self.get_user(telegram_id)
+            if user is None:
+                return []
+            wallets = await load_user_wallets(user)
+            if generation == self._generation:
+                self.cache.set(key, wallets,
+                               tags=[telegram_tag(telegram_id), user_tag(user.pk), *(wallet_tag(wallet.pk) for wallet in wallets)])
+        # Возвращаем копию списка: закэшированный список общий для всех обработчиков
+        return [wallet for wallet in wallets if blockchain is None or wallet.blockchain == blockchain]
+
+    async def get_wallet_addresses(self, telegram_id: int, blockchain: Optional[str] = None) -> List[str]:
+        """
+            Returns the wallet addresses of the user with the Telegram id.
+
+            Args:
+                telegram_id (int): The Telegram id of the user.
+                blockchain (Optional[str]): The blockchain to filter the wallets by. Defaults to all blockchains.
+
+            Returns:
+                List[str]: The wallet addresses of the user.
+        """
+        return [wallet.wallet_address for wallet in await self.get_wallets(telegram_id, blockchain)]
+
+    def invalidate(self, tags: Iterable[Hashable]) -> None:
+        """
+            Drops the entries labelled with any of the tags, now and after the current transaction commits.
+
+            Args:
+                tags (Iterable[Hashable]): The telegram_tag(), user_tag() and wallet_tag() values.
+        """
+        tags = list(tags)
+
+        def drop() -> None:
+            self._generation += 1
+            for tag in tags:
+                self.cache.invalidate_tag(tag)
+
+        drop()
+        db_transaction.on_commit(drop)
+
+    def invalidate_user(self, user: User) -> None:
+        """
+            Drops the cached user and wallet list of the user.
+
+            Args:
+                user (User): The user.
+        """
+        self.invalidate([telegram_tag(user.telegram_id), user_tag(user.pk)])
+
+    def invalidate_wallets(self, wallet_ids: Iterable[int]) -> None:
+        """
+            Drops the cached wallet lists containing any of the wallets.
+
+            Args:
+                wallet_ids (Iterable[int]): The primary keys of the wallets.
+        """
+        self.invalidate(wallet_tag(wallet_id) for wallet_id in wallet_ids)
+
+
+# Общий кэш пользователей и их кошельков
+user_repository = UserRepository()
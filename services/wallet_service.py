@@ -8,29 +8,22 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
 # from sqlalchemy import select
 
-from config_data.config import LAMPORT_TO_SOL_RATIO, CURRENT_BLOCKCHAIN
+from config_data.config import LAMPORT_TO_SOL_RATIO, WEI_TO_BNB_RATIO, CURRENT_BLOCKCHAIN
 # from database.database import get_db
-from external_services.solana.solana import get_sol_balance, http_client
-from external_services.binance_smart_chain.bsc import get_bnb_balance, bsc_client
+from external_services.cache import balance_cache
 from keyboards.main_keyboard import main_keyboard
 from keyboards.transfer_transaction_keyboards import get_wallet_keyboard
 from lexicon.lexicon_en import LEXICON
 from logger_config import logger
+from services.user_repository import user_repository
 from states.states import FSMWallet
 
 ########### django #########
 from django.contrib.auth import get_user_model
 from applications.wallet.models import Wallet, Blockchain
-from asgiref.sync import sync_to_async
 
 User = get_user_model()
 
-@sync_to_async
-def get_user(telegram_id):
-    # DjangoUser = get_user_model()
-    user = User.objects.filter(telegram_id=telegram_id).first()
-    return user
-
 ############################
 
 
@@ -47,7 +40,7 @@ async def retrieve_user_wallets(callback: CallbackQuery) -> Tuple[Optional[User]
     user = None  # Инициализация переменной для пользователя
     user_wallets = []  # Инициализация переменной для списка кошельков пользователя
 
-    user = await get_user(telegram_id=callback.from_user.id)
+    user = await user_repository.get_user(telegram_id=callback.from_user.id)
 
     blockchain = CURRENT_BLOCKCHAIN
     if blockchain == 'bsc':
@@ -56,9 +49,8 @@ async def retrieve_user_wallets(callback: CallbackQuery) -> Tuple[Optional[User]
         blockchain_choices = Blockchain.SOLANA
 
     if user:
-
-        async for w in Wallet.objects.filter(user=user, blockchain=blockchain_choices):
-            user_wallets.append(w)
+        user_wallets = await user_repository.get_wallets(telegram_id=callback.from_user.id,
+                                                         blockchain=blockchain_choices)
 
     # Возвращаем пользователя и его кошельки
     return user, user_wallets
@@ -106,14 +98,13 @@ async def process_wallets_command(callback: CallbackQuery, state: FSMContext, ac
         # Проверяем, есть ли пользователь и у него есть ли кошельки
         if user and user_wallets:
             if action == "balance":
+                # Получаем балансы всех кошельков одним пакетным запросом
+                wallet_addresses = [wallet.wallet_address for wallet in user_wallets]
+                # Пользователь явно запросил баланс - устаревшие значения из кэша не показываем
+                balances = await balance_cache.get_balances(CURRENT_BLOCKCHAIN, wallet_addresses, allow_stale=False)
+
                 # Если пользователь запрашивает баланс, отправляем информацию о каждом кошельке
-                for i, wallet in enumerate(user_wallets):
-                    # Получаем баланс кошелька
-                    blockchain = CURRENT_BLOCKCHAIN
-                    if blockchain == 'solana':
-                        balance = await get_sol_balance(wallet.wallet_address, http_client)
-                    elif blockchain == 'bsc':
-                        balance = await get_bnb_balance(wallet.wallet_address, bsc_client)
+                for i, (wallet, balance) in enumerate(zip(user_wallets, balances)):
                     # Форматируем текст сообщения с информацией о кошельке
                     message_text = LEXICON['wallet_info_template'].format(
                         number=i + 1,
@@ -222,3 +213,28 @@ async def format_transaction_from_db_message(transaction: Dict) -> str:
     )
     # Возвращаем отформатированное сообщение о транзакции
     return tr_message
+
+
+async def format_bsc_transaction_from_db_message(transaction: Dict) -> str:
+    """
+       Formats the BSC transaction message.
+
+       Args:
+           transaction (dict): Transaction data.
+
+       Returns:
+           str: Formatted transaction message.
+    """
+    # Расчет суммы в BNB из wei
+    amount_in_bnb = Decimal(transaction.value or 0) / WEI_TO_BNB_RATIO
+    # Форматирование суммы в BNB с шестью десятичными знаками
+    formatted_amount = '{:.6f}'.format(amount_in_bnb)
+    # Форматирование сообщения о транзакции с использованием лексикона
+    tr_message = LEXICON["transaction_info_bsc"].format(
+        transaction_id='{}...{}'.format(transaction.transaction_id[:6], transaction.transaction_id[-4:]),
+        sender='{}...{}'.format(transaction.sender[:6], transaction.sender[-4:]),
+        recipient='{}...{}'.format(transaction.recipient[:6], transaction.recipient[-4:]),
+        amount_in_bnb=formatted_amount
+    )
+    # Возвращаем отформатированное сообщение о транзакции
+    return tr_message
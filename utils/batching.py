@@ -0,0 +1,25 @@
+# solana-webwallet/utils/batching.py
+
+from typing import List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def chunked(items: Sequence[T], size: int) -> List[List[T]]:
+    """
+        Splits a sequence into consecutive chunks of at most `size` elements.
+
+        Args:
+            items (Sequence[T]): The sequence to split.
+            size (int): The maximum number of elements in one chunk.
+
+        Returns:
+            List[List[T]]: The list of chunks, preserving the order of the original elements.
+
+        Raises:
+            ValueError: If the chunk size is not a positive number.
+    """
+    if size <= 0:
+        raise ValueError("Chunk size must be a positive number.")
+    # Нарезаем последовательность на срезы фиксированной длины, последний срез может быть короче
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
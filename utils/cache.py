@@ -0,0 +1,189 @@
+# solana-webwallet/utils/cache.py
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+
+
+class TTLLRUCache:
+    """
+        In-memory cache with LRU eviction, per-entry TTL and an approximate memory cap.
+
+        Entries can be labelled with tags (for example, a wallet address) so that every entry related to a tag can
+        be invalidated at once. All operations are protected by a lock, so the cache can also be used from threads
+        running Django ORM code.
+
+        Attributes:
+            max_entries (int): The maximum number of entries kept in the cache.
+            ttl (float): The default time to live of an entry in seconds.
+            max_bytes (Optional[int]): The approximate memory limit in bytes, None disables the limit.
+            sizeof (Callable[[Any], int]): The function estimating the size of a cached value in bytes.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+            Initializes the cache.
+
+            Args:
+                max_entries (int): The maximum number of entries kept in the cache.
+                ttl (float): The default time to live of an entry in seconds.
+                max_bytes (Optional[int]): The approximate memory limit in bytes. Defaults to None (no limit).
+                sizeof (Optional[Callable[[Any], int]]): The function estimating the size of a value in bytes.
+                    Defaults to sys.getsizeof.
+                clock (Callable[[], float]): The monotonic clock used for expiration. Defaults to time.monotonic.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or sys.getsizeof
+        self._clock = clock
+        self._lock = threading.RLock()
+        # Ключ -> (значение, время истечения, размер в байтах, теги). Порядок словаря - порядок использования (LRU).
+        self._entries: OrderedDict = OrderedDict()
+        # Тег -> множество ключей, помеченных этим тегом
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+            Returns the cached value for the key and marks it as recently used.
+
+            Args:
+                key (Hashable): The cache key.
+                default (Any): The value returned on a cache miss. Defaults to None.
+
+            Returns:
+                Any: The cached value or default if the key is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _, _ = entry
+            if expires_at <= self._clock():
+                # Запись устарела - удаляем ее и считаем промахом
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Iterable[Hashable] = ()) -> None:
+        """
+            Stores the value in the cache, evicting the least recently used entries if the limits are exceeded.
+
+            Args:
+                key (Hashable): The cache key.
+                value (Any): The value to store.
+                ttl (Optional[float]): The time to live in seconds. Defaults to the cache TTL.
+                tags (Iterable[Hashable]): The tags used for group invalidation.
+        """
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            # Значение, которое больше всего лимита памяти, не кэшируем
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            tags = frozenset(tags)
+            expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (value, expires_at, size, tags)
+            self._size_bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._evict()
+
+    def delete(self, key: Hashable) -> bool:
+        """
+            Removes the key from the cache.
+
+            Args:
+                key (Hashable): The cache key.
+
+            Returns:
+                bool: True if the key was present in the cache, False otherwise.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """
+            Removes all entries labelled with the tag.
+
+            Args:
+                tag (Hashable): The tag to invalidate.
+
+            Returns:
+                int: The number of removed entries.
+        """
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """
+            Removes all entries from the cache. Statistics are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Returns the cache statistics.
+
+            Returns:
+                Dict[str, Any]: The number of entries, approximate size, hits, misses, evictions, hit and miss rates.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "miss_rate": self.misses / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > self._clock()
+
+    def _remove(self, key: Hashable) -> None:
+        # Удаляет запись и ее связи с тегами. Вызывается под блокировкой.
+        _, _, size, tags = self._entries.pop(key)
+        self._size_bytes -= size
+        for tag in tags:
+            tagged_keys = self._tags.get(tag)
+            if tagged_keys is not None:
+                tagged_keys.discard(key)
+                if not tagged_keys:
+                    del self._tags[tag]
+
+    def _evict(self) -> None:
+        # Вытесняет самые давно использованные записи, пока кэш не уложится в лимиты. Вызывается под блокировкой.
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_bytes is not None and self._size_bytes > self.max_bytes)):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
@@ -0,0 +1,164 @@
+# solana-webwallet/utils/crypto_executor.py
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from config_data.config import CRYPTO_EXECUTOR_KIND, CRYPTO_EXECUTOR_WORKERS, CRYPTO_EXECUTOR_SLOW_JOB
+from logger_config import logger
+
+T = TypeVar("T")
+
+
+def _timed_call(fn: Callable[..., T], args: Tuple[Any, ...]) -> Tuple[float, T]:
+    # Выполняется в потоке или процессе пула: возвращаем время начала выполнения, чтобы отделить ожидание в очереди
+    # от самого вычисления. time.time() согласовано между процессами, в отличие от time.monotonic().
+    started_at = time.time()
+    return started_at, fn(*args)
+
+
+class CryptoExecutor:
+    """
+        Runs CPU-bound cryptographic functions (mnemonic-to-seed, key derivation) outside the event loop.
+
+        The functions run in a thread or process pool. hashlib and the solders bindings release the GIL, so a thread
+        pool is enough to keep the event loop responsive; a process pool also lets several derivations use several
+        cores. Functions passed to a process pool and their arguments must be picklable, so they should be
+        module-level functions such as those in utils.key_derivation. The pool is created on first use.
+
+        Attributes:
+            kind (str): The pool type, "thread" or "process".
+            workers (int): The number of pool workers.
+            slow_job (float): The time in seconds after which a job is logged as slow.
+            submitted (int): The number of submitted jobs.
+            completed (int): The number of finished jobs, including failed ones.
+            failed (int): The number of jobs that raised an exception.
+    """
+
+    def __init__(self, kind: str = CRYPTO_EXECUTOR_KIND, workers: int = CRYPTO_EXECUTOR_WORKERS,
+                 slow_job: float = CRYPTO_EXECUTOR_SLOW_JOB) -> None:
+        """
+            Initializes the executor.
+
+            Args:
+                kind (str): The pool type, "thread" or "process". Defaults to CRYPTO_EXECUTOR_KIND.
+                workers (int): The number of pool workers. Defaults to CRYPTO_EXECUTOR_WORKERS.
+                slow_job (float): The time in seconds after which a job is logged as slow.
+                    Defaults to CRYPTO_EXECUTOR_SLOW_JOB.
+
+            Raises:
+                ValueError: If the pool type is unknown or the number of workers is not positive.
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown crypto executor kind: {kind}")
+        if workers <= 0:
+            raise ValueError("The number of workers must be a positive number.")
+        self.kind = kind
+        self.workers = workers
+        self.slow_job = slow_job
+        self._executor: Optional[Executor] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_wait = 0.0
+        self._max_run = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        """
+            Returns the number of submitted jobs that have not finished yet.
+        """
+        return self.submitted - self.completed
+
+    @property
+    def queue_depth(self) -> int:
+        """
+            Returns the number of jobs waiting for a free worker.
+        """
+        return max(0, self.in_flight - self.workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crypto")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+            Runs the function in the pool and returns its result.
+
+            Args:
+                fn (Callable[..., T]): The function to run.
+                *args (Any): The positional arguments of the function.
+
+            Returns:
+                T: The result of the function.
+
+            Raises:
+                Exception: The exception raised by the function.
+        """
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self.submitted += 1
+        try:
+            started_at, result = await loop.run_in_executor(self._get_executor(), _timed_call, fn, args)
+        except BaseException:
+            self.completed += 1
+            self.failed += 1
+            raise
+        finished_at = time.time()
+        self.completed += 1
+
+        wait_time = max(0.0, started_at - submitted_at)
+        run_time = max(0.0, finished_at - started_at)
+        self._total_wait += wait_time
+        self._total_run += run_time
+        self._max_wait = max(self._max_wait, wait_time)
+        self._max_run = max(self._max_run, run_time)
+        if wait_time + run_time > self.slow_job:
+            logger.warning(f"Slow crypto job {getattr(fn, '__name__', fn)}: waited {wait_time:.3f} s, "
+                           f"ran {run_time:.3f} s, {self.queue_depth} jobs queued")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Returns the pool statistics.
+
+            Returns:
+                Dict[str, Any]: The pool type and size, job counters, queue depth, average and maximum time
+                    in seconds that jobs spent in the queue and running.
+        """
+        succeeded = self.completed - self.failed
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "avg_wait": self._total_wait / succeeded if succeeded else 0.0,
+            "max_wait": self._max_wait,
+            "avg_run": self._total_run / succeeded if succeeded else 0.0,
+            "max_run": self._max_run,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+            Shuts the pool down. The next job creates a new pool.
+
+            Args:
+                wait (bool): Whether to wait for running jobs to finish. Defaults to True.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Общий пул для вычислений с мнемоническими фразами и ключами
+crypto_executor = CryptoExecutor()
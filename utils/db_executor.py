@@ -0,0 +1,162 @@
+# solana-webwallet/utils/db_executor.py
+
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from config_data.config import DB_EXECUTOR_WORKERS
+
+T = TypeVar("T")
+
+
+class DatabaseExecutor:
+    """
+        Runs synchronous Django ORM code on a bounded thread pool.
+
+        Plain sync_to_async runs every call on one shared thread (thread_sensitive=True), so the ORM work of all
+        users is executed strictly one call at a time. This executor runs the calls on a pool of threads instead.
+        Django connections are per thread, so every pool thread keeps its own connection and reuses it for up to
+        CONN_MAX_AGE seconds; close_old_connections() around every call drops expired and broken connections.
+
+        A decorated function must do all of its database work inside the call, including opening and committing
+        transactions with transaction.atomic(), and must return evaluated data rather than lazy querysets.
+
+        Attributes:
+            workers (int): The number of pool threads.
+            submitted (int): The number of submitted calls.
+            completed (int): The number of finished calls, including failed ones.
+            failed (int): The number of calls that raised an exception.
+    """
+
+    def __init__(self, workers: int = DB_EXECUTOR_WORKERS) -> None:
+        """
+            Initializes the executor.
+
+            Args:
+                workers (int): The number of pool threads. Defaults to DB_EXECUTOR_WORKERS.
+
+            Raises:
+                ValueError: If the number of workers is not positive.
+        """
+        if workers <= 0:
+            raise ValueError("The number of workers must be a positive number.")
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Счетчики изменяются из потоков пула, поэтому защищены блокировкой
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._busy = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+            Returns the thread pool, creating it on first use.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db")
+        return self._executor
+
+    def wrap(self, fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+        """
+            Turns a synchronous ORM function into a coroutine function running on the pool.
+
+            Args:
+                fn (Callable[..., T]): The synchronous function.
+
+            Returns:
+                Callable[..., Awaitable[T]]: The coroutine function with the same arguments.
+        """
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with self._lock:
+                self.submitted += 1
+            runner = sync_to_async(self._call, thread_sensitive=False, executor=self.executor)
+            return await runner(fn, time.monotonic(), *args, **kwargs)
+
+        return wrapper
+
+    def _call(self, fn: Callable[..., T], submitted_at: float, *args: Any, **kwargs: Any) -> T:
+        started_at = time.monotonic()
+        with self._lock:
+            self._busy += 1
+            wait_time = started_at - submitted_at
+            self._total_wait += wait_time
+            self._max_wait = max(self._max_wait, wait_time)
+        failed = False
+        # Закрываем соединения потока, у которых истек CONN_MAX_AGE или которые оборвались
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._busy -= 1
+                self.completed += 1
+                self.failed += failed
+                self._total_run += time.monotonic() - started_at
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Returns the pool statistics.
+
+            Returns:
+                Dict[str, Any]: The pool size, busy threads and utilization, calls waiting for a thread, call counters,
+                    the average and maximum wait for a thread and the average run time in seconds.
+        """
+        with self._lock:
+            started = self.completed + self._busy
+            return {
+                "workers": self.workers,
+                "busy": self._busy,
+                "utilization": self._busy / self.workers,
+                "queue_depth": self.submitted - started,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait": self._total_wait / started if started else 0.0,
+                "max_wait": self._max_wait,
+                "avg_run": self._total_run / self.completed if self.completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+            Shuts the pool down. The next call creates a new pool.
+
+            Args:
+                wait (bool): Whether to wait for running calls to finish. Defaults to True.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Общий пул потоков для работы с базой данных
+db_executor = DatabaseExecutor()
+
+
+def database_sync_to_async(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """
+        Decorator running a synchronous ORM function on the shared database pool.
+
+        Use it instead of @sync_to_async for functions that access the database.
+
+        Args:
+            fn (Callable[..., T]): The synchronous function.
+
+        Returns:
+            Callable[..., Awaitable[T]]: The coroutine function with the same arguments.
+    """
+    return db_executor.wrap(fn)
@@ -0,0 +1,173 @@
+# solana-webwallet/utils/key_derivation.py
+
+from typing import Callable, List, Optional, Tuple
+
+import mnemonic
+from eth_account import Account
+from eth_account.hdaccount import key_from_seed
+from solders.keypair import Keypair
+
+# Функции модуля выполняются в пуле CryptoExecutor, в том числе в дочерних процессах, поэтому они определены на уровне
+# модуля (сериализуются через pickle) и принимают и возвращают только строки и байты.
+
+# The use of the Mnemonic features of Account is disabled by default until its API stabilizes.
+# Включаем их при импорте модуля, чтобы они были доступны и в процессах пула.
+Account.enable_unaudited_hdwallet_features()
+
+
+def mnemonic_to_seed(seed_phrase: str, passphrase: str = "") -> bytes:
+    """
+        Converts a BIP-39 mnemonic to the seed (2048 rounds of PBKDF2-HMAC-SHA512).
+
+        Args:
+            seed_phrase (str): The mnemonic phrase.
+            passphrase (str): The optional BIP-39 passphrase. Defaults to "".
+
+        Returns:
+            bytes: The 64-byte seed.
+    """
+    return mnemonic.Mnemonic("english").to_seed(seed_phrase, passphrase=passphrase)
+
+
+def solana_wallet_from_seed(seed: bytes, derivation_path: str) -> Tuple[str, str]:
+    """
+        Derives the Solana wallet of the derivation path from the seed.
+
+        Args:
+            seed (bytes): The BIP-39 seed.
+            derivation_path (str): The derivation path, for example "m/44'/501'/0'/0'".
+
+        Returns:
+            Tuple[str, str]: The wallet address and the hex-encoded private key.
+    """
+    keypair = Keypair.from_seed_and_derivation_path(seed, derivation_path)
+    return str(keypair.pubkey()), keypair.secret().hex()
+
+
+def bsc_wallet_from_seed(seed: bytes, derivation_path: str) -> Tuple[str, str]:
+    """
+        Derives the BSC wallet of the derivation path from the seed (BIP-32).
+
+        Args:
+            seed (bytes): The BIP-39 seed.
+            derivation_path (str): The derivation path, for example "m/44'/60'/0'/0/0".
+
+        Returns:
+            Tuple[str, str]: The checksum wallet address and the 0x-prefixed hex-encoded private key.
+    """
+    acct = Account.from_key(key_from_seed(seed, derivation_path))
+    return acct.address, '0x' + bytes(acct.key).hex()
+
+
+def bsc_wallet_from_mnemonic(seed_phrase: str, derivation_path: str) -> Tuple[str, str]:
+    """
+        Derives the BSC wallet of the derivation path from the mnemonic.
+
+        Args:
+            seed_phrase (str): The mnemonic phrase.
+            derivation_path (str): The derivation path, for example "m/44'/60'/0'/0/0".
+
+        Returns:
+            Tuple[str, str]: The checksum wallet address and the 0x-prefixed hex-encoded private key.
+    """
+    return bsc_wallet_from_seed(mnemonic_to_seed(seed_phrase), derivation_path)
+
+
+def derivation_index(derivation_path: str) -> Optional[int]:
+    """
+        Returns the index of the last level of the derivation path.
+
+        Args:
+            derivation_path (str): The derivation path, for example "m/44'/501'/0'/12'".
+
+        Returns:
+            Optional[int]: The index, for example 12, or None if the path is empty or malformed.
+    """
+    try:
+        return int(derivation_path.rsplit('/', 1)[-1].rstrip("'"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def find_derivation_path(derive: Callable[[bytes, str], Tuple[str, str]], seed: bytes, wallet_address: str,
+                         path_template: str, start: int, stop: int) -> Optional[Tuple[str, str]]:
+    """
+        Searches the derivation paths with indexes from start to stop for the wallet address.
+
+        Args:
+            derive (Callable[[bytes, str], Tuple[str, str]]): The derivation function of the blockchain,
+                solana_wallet_from_seed or bsc_wallet_from_seed.
+            seed (bytes): The BIP-39 seed.
+            wallet_address (str): The wallet address to find.
+            path_template (str): The derivation path with an {index} placeholder.
+            start (int): The first index to try.
+            stop (int): The index after the last one to try.
+
+        Returns:
+            Optional[Tuple[str, str]]: The derivation path and the private key of the wallet, None if not found.
+    """
+    for index in range(start, stop):
+        derivation_path = path_template.format(index=index)
+        address, private_key = derive(seed, derivation_path)
+        if address == wallet_address:
+            return derivation_path, private_key
+    return None
+
+
+def generate_solana_wallet(derivation_path: str) -> Tuple[str, str, str]:
+    """
+        Generates a new 12-word mnemonic and derives the Solana wallet of the derivation path from it.
+
+        Args:
+            derivation_path (str): The derivation path.
+
+        Returns:
+            Tuple[str, str, str]: The wallet address, the hex-encoded private key and the mnemonic.
+    """
+    words = mnemonic.Mnemonic("english").generate(strength=128)  # strength=128 for 12 words, strength=256 for 24 words
+    wallet_address, private_key = solana_wallet_from_seed(mnemonic_to_seed(words), derivation_path)
+    return wallet_address, private_key, words
+
+
+def generate_bsc_wallet(derivation_path: str) -> Tuple[str, str, str]:
+    """
+        Generates a new 12-word mnemonic and derives the BSC wallet of the derivation path from it.
+
+        Args:
+            derivation_path (str): The derivation path.
+
+        Returns:
+            Tuple[str, str, str]: The checksum wallet address, the 0x-prefixed hex-encoded private key and the mnemonic.
+    """
+    #TODO: BNB 24-word mnemonic and derivation path: https://docs.bnbchain.org/docs/learn/genesis/
+    # we use 12-word
+    acct, words = Account.create_with_mnemonic(
+        passphrase='',
+        num_words=12,
+        language='english',
+        account_path=derivation_path,
+    )
+    return acct.address, '0x' + bytes(acct.key).hex(), words
+
+
+def derive_wallets(derive: Callable[[bytes, str], Tuple[str, str]], seed: bytes, path_template: str,
+                   start: int, stop: int) -> List[Tuple[int, str, str, str]]:
+    """
+        Derives the wallets of the derivation paths with indexes from start to stop.
+
+        Args:
+            derive (Callable[[bytes, str], Tuple[str, str]]): The derivation function of the blockchain.
+            seed (bytes): The BIP-39 seed.
+            path_template (str): The derivation path with an {index} placeholder.
+            start (int): The first index.
+            stop (int): The index after the last one.
+
+        Returns:
+            List[Tuple[int, str, str, str]]: The index, the derivation path, the address and the private key
+                of every wallet.
+    """
+    wallets = []
+    for index in range(start, stop):
+        derivation_path = path_template.format(index=index)
+        wallets.append((index, derivation_path, *derive(seed, derivation_path)))
+    return wallets
@@ -0,0 +1,42 @@
+# solana-webwallet/utils/rate_limiter.py
+
+import asyncio
+
+
+class RateLimiter:
+    """
+        Asynchronous rate limiter spreading operations evenly in time.
+
+        Attributes:
+            rate (float): The maximum number of operations per second.
+    """
+
+    def __init__(self, rate: float) -> None:
+        """
+            Initializes the rate limiter.
+
+            Args:
+                rate (float): The maximum number of operations per second.
+
+            Raises:
+                ValueError: If the rate is not a positive number.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be a positive number.")
+        self.rate = rate
+        self._interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+            Waits until the next operation is allowed.
+        """
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            # Ждем наступления следующего разрешенного момента времени
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+                now = loop.time()
+            self._next_slot = max(now, self._next_slot) + self._interval
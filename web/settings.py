@@ -80,6 +80,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Бот обращается к базе из пула потоков: каждый поток держит свое соединение и переиспользует его
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Сколько секунд ждать освобождения блокировки SQLite при одновременной записи из нескольких потоков
+            'timeout': 20,
+        },
     }
 }
 